@@ -0,0 +1,214 @@
+"""
+Pipeline incremental de analytics dos chatbots
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .hll import HyperLogLog
+from .models import ChatbotAnalytics, ChatbotAnalyticsHourly, ChatbotAnalyticsDaily
+
+
+logger = logging.getLogger(__name__)
+
+SESSION_STARTED = 'session_started'
+MESSAGE = 'message'
+SESSION_COMPLETED = 'session_completed'
+SESSION_ABANDONED = 'session_abandoned'
+
+DEFAULTS = {
+    'ENABLED': True,
+    'MAX_EVENTS': 1000,
+    'FLUSH_INTERVAL': 5.0,
+}
+
+
+class _Delta:
+    """Incrementos acumulados para um chatbot/período entre dois flushes"""
+    __slots__ = ('conversations', 'messages', 'completed', 'abandoned', 'users')
+
+    def __init__(self):
+        self.conversations = 0
+        self.messages = 0
+        self.completed = 0
+        self.abandoned = 0
+        self.users = set()
+
+    def add(self, event_type, user_id, count):
+        if event_type == SESSION_STARTED:
+            self.conversations += count
+        elif event_type == MESSAGE:
+            self.messages += count
+        elif event_type == SESSION_COMPLETED:
+            self.completed += count
+        elif event_type == SESSION_ABANDONED:
+            self.abandoned += count
+        if user_id is not None:
+            self.users.add(user_id)
+
+    def merge(self, other):
+        self.conversations += other.conversations
+        self.messages += other.messages
+        self.completed += other.completed
+        self.abandoned += other.abandoned
+        self.users |= other.users
+
+
+class AnalyticsAggregator:
+    """
+    Acumula eventos de sessão/mensagem em memória e aplica os incrementos
+    em ChatbotAnalytics e nos rollups por hora e por dia.
+
+    Cada flush custa algumas queries por chatbot/período tocado,
+    independente de quantos eventos foram registrados.
+    """
+
+    def __init__(self, max_events=1000, flush_interval=5.0, background=True):
+        self.max_events = max_events
+        self.flush_interval = flush_interval
+        # Sem thread de fundo, quem usa o agregador chama flush() explicitamente
+        self.background = background
+
+        self._hourly = {}
+        self._events = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def record(self, chatbot_id, event_type, user_id=None, count=1, timestamp=None):
+        """Registra um evento (ou `count` eventos iguais) de um chatbot"""
+        self.record_many([(chatbot_id, event_type, user_id, count, timestamp)])
+
+    def record_many(self, events):
+        """Registra eventos no formato (chatbot_id, tipo, user_id, count, timestamp)"""
+        now = timezone.now()
+        with self._lock:
+            for chatbot_id, event_type, user_id, count, timestamp in events:
+                bucket = (timestamp or now).replace(minute=0, second=0, microsecond=0)
+                delta = self._hourly.get((chatbot_id, bucket))
+                if delta is None:
+                    delta = self._hourly[(chatbot_id, bucket)] = _Delta()
+                delta.add(event_type, user_id, count)
+                self._events += 1
+            full = self._events >= self.max_events
+            if self.background:
+                self._ensure_thread()
+
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        """Aplica no banco os incrementos acumulados"""
+        with self._flush_lock:
+            with self._lock:
+                hourly, self._hourly = self._hourly, {}
+                self._events = 0
+            if not hourly:
+                return
+
+            totals = {}
+            daily = {}
+            for (chatbot_id, bucket), delta in hourly.items():
+                totals.setdefault(chatbot_id, _Delta()).merge(delta)
+                day = timezone.localtime(bucket).date()
+                daily.setdefault((chatbot_id, day), _Delta()).merge(delta)
+
+            with transaction.atomic():
+                for chatbot_id, delta in totals.items():
+                    self._apply_totals(chatbot_id, delta)
+                for (chatbot_id, bucket), delta in hourly.items():
+                    self._apply_rollup(ChatbotAnalyticsHourly, chatbot_id, {'bucket': bucket}, delta)
+                for (chatbot_id, day), delta in daily.items():
+                    self._apply_rollup(ChatbotAnalyticsDaily, chatbot_id, {'day': day}, delta)
+
+    def close(self):
+        """Para a thread de flush e aplica o restante (chamado no atexit)"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.flush_interval * 2)
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Falha ao gravar analytics pendentes no desligamento')
+
+    def _apply_totals(self, chatbot_id, delta):
+        analytics, _ = ChatbotAnalytics.objects.select_for_update().get_or_create(chatbot_id=chatbot_id)
+        analytics.total_conversations += delta.conversations
+        analytics.total_messages += delta.messages
+        analytics.completed_conversations += delta.completed
+        analytics.abandoned_conversations += delta.abandoned
+        analytics.unique_users_sketch, analytics.unique_users = _merge_users(
+            analytics.unique_users_sketch, delta.users
+        )
+        analytics.refresh_metrics()
+        analytics.save()
+
+    def _apply_rollup(self, model, chatbot_id, period, delta):
+        rollup, _ = model.objects.select_for_update().get_or_create(chatbot_id=chatbot_id, **period)
+        rollup.conversations += delta.conversations
+        rollup.messages += delta.messages
+        rollup.completed += delta.completed
+        rollup.abandoned += delta.abandoned
+        rollup.unique_users_sketch, rollup.unique_users = _merge_users(rollup.unique_users_sketch, delta.users)
+        rollup.save()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='chatbot-analytics', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if not self._events:
+                continue
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Falha ao gravar lote de analytics')
+            finally:
+                close_old_connections()
+
+
+def _merge_users(sketch_bytes, users):
+    sketch = HyperLogLog.from_bytes(sketch_bytes)
+    for user_id in users:
+        sketch.add(user_id)
+    return sketch.to_bytes(), sketch.count()
+
+
+_aggregator = None
+_aggregator_lock = threading.Lock()
+
+
+def get_aggregator():
+    """Agregador compartilhado do processo, ou None se desabilitado nas settings"""
+    global _aggregator
+    config = {**DEFAULTS, **getattr(settings, 'CHATBOT_ANALYTICS', {})}
+    if not config['ENABLED']:
+        return None
+
+    if _aggregator is None:
+        with _aggregator_lock:
+            if _aggregator is None:
+                _aggregator = AnalyticsAggregator(
+                    max_events=config['MAX_EVENTS'],
+                    flush_interval=config['FLUSH_INTERVAL'],
+                )
+                atexit.register(_aggregator.close)
+    return _aggregator
+
+
+def record_events(events):
+    """Envia eventos ao agregador, se habilitado"""
+    aggregator = get_aggregator()
+    if aggregator is not None and events:
+        aggregator.record_many(events)
@@ -0,0 +1,56 @@
+"""
+HyperLogLog para contagem aproximada de usuários únicos
+"""
+import hashlib
+import math
+
+
+class HyperLogLog:
+    """
+    Sketch HyperLogLog com 2^precision registradores de 1 byte.
+
+    Com a precisão padrão (12) ocupa 4 KB e tem erro padrão de ~1,6%.
+    """
+    __slots__ = ('precision', 'registers')
+
+    def __init__(self, precision=12, registers=None):
+        self.precision = precision
+        size = 1 << precision
+        if registers and len(registers) == size:
+            self.registers = bytearray(registers)
+        else:
+            self.registers = bytearray(size)
+
+    @classmethod
+    def from_bytes(cls, data, precision=12):
+        return cls(precision, bytes(data) if data else None)
+
+    def to_bytes(self):
+        return bytes(self.registers)
+
+    def add(self, value):
+        digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+        hashed = int.from_bytes(digest, 'big')
+        index = hashed >> (64 - self.precision)
+        remaining = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remaining.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        registers = self.registers
+        for index, rank in enumerate(other.registers):
+            if rank > registers[index]:
+                registers[index] = rank
+        return self
+
+    def count(self):
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / sum(2.0 ** -rank for rank in self.registers)
+
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * size and zeros:
+            # Correção para cardinalidades pequenas (linear counting)
+            estimate = size * math.log(size / zeros)
+        return int(round(estimate))
@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.chatbots.analytics import (
+    AnalyticsAggregator, MESSAGE, SESSION_ABANDONED, SESSION_COMPLETED, SESSION_STARTED,
+)
+from apps.chatbots.models import ChatbotAnalytics, ChatbotAnalyticsHourly, ChatbotAnalyticsDaily
+from apps.executions.models import ChatSession
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os analytics e rollups dos chatbots a partir das sessões gravadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chatbot', help='ID de um chatbot específico')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        sessions = ChatSession.objects.all()
+        analytics = ChatbotAnalytics.objects.all()
+        hourly = ChatbotAnalyticsHourly.objects.all()
+        daily = ChatbotAnalyticsDaily.objects.all()
+        if options['chatbot']:
+            sessions = sessions.filter(chatbot_id=options['chatbot'])
+            analytics = analytics.filter(chatbot_id=options['chatbot'])
+            hourly = hourly.filter(chatbot_id=options['chatbot'])
+            daily = daily.filter(chatbot_id=options['chatbot'])
+
+        with transaction.atomic():
+            hourly.delete()
+            daily.delete()
+            analytics.update(
+                total_conversations=0,
+                total_messages=0,
+                unique_users=0,
+                completed_conversations=0,
+                abandoned_conversations=0,
+                avg_conversation_length=0.0,
+                completion_rate=0.0,
+                unique_users_sketch=b'',
+            )
+
+        # Agregador próprio, sem thread de fundo: os lotes são gravados aqui
+        aggregator = AnalyticsAggregator(background=False)
+        batch_size = options['batch_size']
+        events = []
+        total = 0
+        rows = sessions.values_list('chatbot_id', 'user_id', 'status', 'message_count', 'start_time')
+        for chatbot_id, user_id, status, message_count, start_time in rows.iterator(chunk_size=batch_size):
+            events.append((chatbot_id, SESSION_STARTED, user_id, 1, start_time))
+            if message_count:
+                events.append((chatbot_id, MESSAGE, user_id, message_count, start_time))
+            if status == 'completed':
+                events.append((chatbot_id, SESSION_COMPLETED, user_id, 1, start_time))
+            elif status == 'abandoned':
+                events.append((chatbot_id, SESSION_ABANDONED, user_id, 1, start_time))
+            total += 1
+
+            if len(events) >= batch_size:
+                aggregator.record_many(events)
+                aggregator.flush()
+                events = []
+        aggregator.record_many(events)
+        aggregator.flush()
+
+        self.stdout.write(self.style.SUCCESS(f'Analytics recalculados a partir de {total} sessões.'))
+
@@ -0,0 +1,69 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbots', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatbotanalytics',
+            name='abandoned_conversations',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='chatbotanalytics',
+            name='completed_conversations',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='chatbotanalytics',
+            name='unique_users_sketch',
+            field=models.BinaryField(default=bytes),
+        ),
+        migrations.CreateModel(
+            name='ChatbotAnalyticsHourly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('conversations', models.PositiveIntegerField(default=0)),
+                ('messages', models.PositiveIntegerField(default=0)),
+                ('completed', models.PositiveIntegerField(default=0)),
+                ('abandoned', models.PositiveIntegerField(default=0)),
+                ('unique_users', models.PositiveIntegerField(default=0)),
+                ('unique_users_sketch', models.BinaryField(default=bytes)),
+                ('bucket', models.DateTimeField()),
+                ('chatbot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='chatbots.chatbot')),
+            ],
+            options={
+                'verbose_name': 'Analytics por Hora',
+                'verbose_name_plural': 'Analytics por Hora',
+                'ordering': ['-bucket'],
+                'unique_together': {('chatbot', 'bucket')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ChatbotAnalyticsDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('conversations', models.PositiveIntegerField(default=0)),
+                ('messages', models.PositiveIntegerField(default=0)),
+                ('completed', models.PositiveIntegerField(default=0)),
+                ('abandoned', models.PositiveIntegerField(default=0)),
+                ('unique_users', models.PositiveIntegerField(default=0)),
+                ('unique_users_sketch', models.BinaryField(default=bytes)),
+                ('day', models.DateField()),
+                ('chatbot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='chatbots.chatbot')),
+            ],
+            options={
+                'verbose_name': 'Analytics por Dia',
+                'verbose_name_plural': 'Analytics por Dia',
+                'ordering': ['-day'],
+                'unique_together': {('chatbot', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbots', '0003_chatbot_published_artifact'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatbot',
+            name='retention_days',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Retenção (dias)'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbots', '0004_chatbot_retention_days'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatbot',
+            name='abandon_after_minutes',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Abandono (minutos)'),
+        ),
+    ]
@@ -6,6 +6,9 @@ from django.contrib.auth.models import User
 from django.utils import timezone
 import uuid
 
+# Registra os sinais que avançam a versão do snapshot público
+from . import snapshot  # noqa: F401
+
 
 class Chatbot(models.Model):
     """
@@ -35,11 +38,29 @@ class Chatbot(models.Model):
     # Configurações de comportamento
     settings = models.JSONField(default=dict, blank=True)
     
+    # Dias que as sessões ficam guardadas após a última atividade
+    # (vazio usa EXECUTION_RETENTION['DEFAULT_DAYS'])
+    retention_days = models.PositiveIntegerField(null=True, blank=True, verbose_name="Retenção (dias)")
+    
+    # Minutos sem atividade até a sessão ser marcada como abandonada
+    # (vazio usa SESSION_ABANDONMENT['DEFAULT_MINUTES'])
+    abandon_after_minutes = models.PositiveIntegerField(null=True, blank=True, verbose_name="Abandono (minutos)")
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     published_at = models.DateTimeField(null=True, blank=True)
     
+    # Artefato imutável do fluxo principal servido pelo runtime público
+    published_artifact = models.ForeignKey(
+        'flows.PublishedFlowArtifact',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='+',
+    )
+    
     class Meta:
         verbose_name = "Chatbot"
         verbose_name_plural = "Chatbots"
@@ -49,7 +70,11 @@ class Chatbot(models.Model):
         return self.name
     
     def publish(self):
-        """Publica o chatbot"""
+        """Publica o chatbot, congelando o fluxo principal em um artefato"""
+        from apps.flows.artifacts import build_artifact
+        
+        main_flow = self.flows.filter(is_main_flow=True, is_active=True).first()
+        self.published_artifact = build_artifact(main_flow) if main_flow else None
         self.is_published = True
         self.published_at = timezone.now()
         self.save()
@@ -58,6 +83,7 @@ class Chatbot(models.Model):
         """Despublica o chatbot"""
         self.is_published = False
         self.published_at = None
+        self.published_artifact = None
         self.save()
 
 
@@ -99,11 +125,16 @@ class ChatbotAnalytics(models.Model):
     total_conversations = models.PositiveIntegerField(default=0)
     total_messages = models.PositiveIntegerField(default=0)
     unique_users = models.PositiveIntegerField(default=0)
+    completed_conversations = models.PositiveIntegerField(default=0)
+    abandoned_conversations = models.PositiveIntegerField(default=0)
     
     # Métricas de engajamento
     avg_conversation_length = models.FloatField(default=0.0)
     completion_rate = models.FloatField(default=0.0)  # Porcentagem que chegou ao fim
     
+    # Sketch HyperLogLog dos usuários únicos
+    unique_users_sketch = models.BinaryField(default=bytes, editable=False)
+    
     # Timestamps
     last_updated = models.DateTimeField(auto_now=True)
     
@@ -112,4 +143,63 @@ class ChatbotAnalytics(models.Model):
         verbose_name_plural = "Analytics dos Chatbots"
     
     def __str__(self):
-        return f"Analytics: {self.chatbot.name}" 
\ No newline at end of file
+        return f"Analytics: {self.chatbot.name}"
+    
+    def refresh_metrics(self):
+        """Recalcula as métricas derivadas a partir dos contadores"""
+        if self.total_conversations:
+            self.avg_conversation_length = self.total_messages / self.total_conversations
+            self.completion_rate = self.completed_conversations * 100.0 / self.total_conversations
+        else:
+            self.avg_conversation_length = 0.0
+            self.completion_rate = 0.0
+
+
+class AnalyticsRollup(models.Model):
+    """
+    Base dos agregados de analytics por período
+    """
+    chatbot = models.ForeignKey(Chatbot, on_delete=models.CASCADE, related_name='+')
+    
+    # Contadores do período
+    conversations = models.PositiveIntegerField(default=0)
+    messages = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    abandoned = models.PositiveIntegerField(default=0)
+    unique_users = models.PositiveIntegerField(default=0)
+    unique_users_sketch = models.BinaryField(default=bytes, editable=False)
+    
+    class Meta:
+        abstract = True
+
+
+class ChatbotAnalyticsHourly(AnalyticsRollup):
+    """
+    Analytics agregados por hora
+    """
+    bucket = models.DateTimeField()  # Início da hora
+    
+    class Meta:
+        verbose_name = "Analytics por Hora"
+        verbose_name_plural = "Analytics por Hora"
+        ordering = ['-bucket']
+        unique_together = ['chatbot', 'bucket']
+    
+    def __str__(self):
+        return f"{self.chatbot_id} - {self.bucket:%Y-%m-%d %H}h"
+
+
+class ChatbotAnalyticsDaily(AnalyticsRollup):
+    """
+    Analytics agregados por dia
+    """
+    day = models.DateField()
+    
+    class Meta:
+        verbose_name = "Analytics por Dia"
+        verbose_name_plural = "Analytics por Dia"
+        ordering = ['-day']
+        unique_together = ['chatbot', 'day']
+    
+    def __str__(self):
+        return f"{self.chatbot_id} - {self.day}" 
\ No newline at end of file
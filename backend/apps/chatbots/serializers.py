@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Chatbot, ChatbotVersion, ChatbotAnalytics
+from .models import Chatbot, ChatbotVersion, ChatbotAnalytics, ChatbotAnalyticsHourly, ChatbotAnalyticsDaily
 
 
 class ChatbotSerializer(serializers.ModelSerializer):
@@ -14,16 +14,22 @@ class ChatbotSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'name', 'description', 'owner', 'owner_name',
             'theme', 'primary_color', 'is_published', 'is_active',
-            'settings', 'created_at', 'updated_at', 'published_at',
+            'settings', 'retention_days', 'abandon_after_minutes', 'created_at', 'updated_at', 'published_at',
             'flows_count', 'latest_version'
         ]
         read_only_fields = ('id', 'owner', 'created_at', 'updated_at', 'published_at')
     
     def get_flows_count(self, obj):
+        # Anotado no queryset da listagem; demais ações fazem a contagem
+        if hasattr(obj, 'flows_count'):
+            return obj.flows_count
         return obj.flows.count()
     
     def get_latest_version(self, obj):
-        latest = obj.versions.first()
+        if hasattr(obj, 'latest_versions'):
+            latest = obj.latest_versions[0] if obj.latest_versions else None
+        else:
+            latest = obj.versions.first()
         if latest:
             return {
                 'version_number': latest.version_number,
@@ -55,7 +61,7 @@ class ChatbotUpdateSerializer(serializers.ModelSerializer):
         model = Chatbot
         fields = [
             'name', 'description', 'theme', 'primary_color', 
-            'is_active', 'settings'
+            'is_active', 'settings', 'retention_days', 'abandon_after_minutes'
         ]
 
 
@@ -90,11 +96,28 @@ class ChatbotAnalyticsSerializer(serializers.ModelSerializer):
         model = ChatbotAnalytics
         fields = [
             'total_conversations', 'total_messages', 'unique_users',
+            'completed_conversations', 'abandoned_conversations',
             'avg_conversation_length', 'completion_rate', 'last_updated'
         ]
         read_only_fields = ('last_updated',)
 
 
+class ChatbotAnalyticsHourlySerializer(serializers.ModelSerializer):
+    """Serializer para analytics por hora"""
+    
+    class Meta:
+        model = ChatbotAnalyticsHourly
+        fields = ['bucket', 'conversations', 'messages', 'completed', 'abandoned', 'unique_users']
+
+
+class ChatbotAnalyticsDailySerializer(serializers.ModelSerializer):
+    """Serializer para analytics por dia"""
+    
+    class Meta:
+        model = ChatbotAnalyticsDaily
+        fields = ['day', 'conversations', 'messages', 'completed', 'abandoned', 'unique_users']
+
+
 class ChatbotDetailSerializer(serializers.ModelSerializer):
     """Serializer detalhado para um chatbot específico"""
     owner_name = serializers.CharField(source='owner.username', read_only=True)
@@ -114,7 +137,8 @@ class ChatbotDetailSerializer(serializers.ModelSerializer):
     
     def get_flows(self, obj):
         from apps.flows.serializers import FlowSerializer
-        return FlowSerializer(obj.flows.all(), many=True, context=self.context).data
+        flows = obj.flows.select_related('chatbot', 'created_by').prefetch_related('variables')
+        return FlowSerializer(flows, many=True, context=self.context).data
     
     def get_recent_versions(self, obj):
         recent = obj.versions.all()[:5]
@@ -142,6 +166,11 @@ class ChatbotPublishSerializer(serializers.Serializer):
                 raise serializers.ValidationError(
                     "Fluxo principal deve ter pelo menos um nó para publicação."
                 )
+            
+            # O artefato publicado precisa de um grafo válido
+            errors = main_flow.validate_flow()
+            if errors:
+                raise serializers.ValidationError(errors)
         
         return attrs
 
@@ -0,0 +1,67 @@
+"""
+Cache do snapshot público dos chatbots publicados
+
+A chave inclui a versão do chatbot (published_at/updated_at), lida do banco
+a cada requisição pela chave primária. Qualquer alteração gera uma chave nova,
+então o snapshot nunca fica velho, mesmo se CACHES for um cache por processo
+(LocMemCache): as entradas antigas só deixam de ser usadas e expiram pelo timeout.
+"""
+import hashlib
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+
+SNAPSHOT_KEY_PREFIX = 'published_chatbot'
+
+
+def published_version(chatbot_id):
+    """Versão vigente do chatbot publicado e ativo, ou None"""
+    Chatbot = apps.get_model('chatbots', 'Chatbot')
+    row = Chatbot.objects.filter(id=chatbot_id, is_published=True, is_active=True).values_list(
+        'published_at', 'updated_at'
+    ).first()
+    return _version(*row) if row else None
+
+
+def _version(published_at, updated_at):
+    return ':'.join(str(value.timestamp() if value else 0) for value in (published_at, updated_at))
+
+
+def snapshot_key(chatbot_id, version):
+    return f'{SNAPSHOT_KEY_PREFIX}:{chatbot_id}:{version}'
+
+
+def get_published_snapshot(chatbot_id, version):
+    """Retorna {'etag', 'body'} do snapshot em cache dessa versão, ou None"""
+    return cache.get(snapshot_key(chatbot_id, version))
+
+
+def store_published_snapshot(chatbot, body):
+    """
+    Guarda o JSON já renderizado do chatbot publicado.
+
+    O ETag combina a versão publicada (published_at/updated_at) com o hash do
+    conteúdo, então muda sempre que o snapshot muda.
+    """
+    version = _version(chatbot.published_at, chatbot.updated_at)
+    digest = hashlib.sha256(f'{chatbot.pk}|{version}'.encode() + b'\n' + body).hexdigest()[:32]
+    snapshot = {'etag': f'"{digest}"', 'body': body}
+    cache.set(snapshot_key(chatbot.pk, version), snapshot, settings.PUBLIC_CHATBOT_CACHE_TIMEOUT)
+    return snapshot
+
+
+def _touch_chatbot(sender, instance, **kwargs):
+    # update(): avança a versão sem disparar os sinais do Chatbot
+    Chatbot = apps.get_model('chatbots', 'Chatbot')
+    Chatbot.objects.filter(pk=instance.chatbot_id).update(updated_at=timezone.now())
+
+
+# Alterações no próprio chatbot (inclusive publish/unpublish) já mudam
+# updated_at; fluxos e versões também mudam o conteúdo servido pela view pública
+for _sender in ('flows.Flow', 'chatbots.ChatbotVersion'):
+    post_save.connect(_touch_chatbot, sender=_sender, dispatch_uid=f'published_snapshot_{_sender}_save')
+    post_delete.connect(_touch_chatbot, sender=_sender, dispatch_uid=f'published_snapshot_{_sender}_delete')
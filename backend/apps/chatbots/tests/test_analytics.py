@@ -0,0 +1,89 @@
+"""
+Testes do agregador incremental de analytics
+"""
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ..analytics import MESSAGE, SESSION_COMPLETED, SESSION_STARTED, AnalyticsAggregator
+from ..hll import HyperLogLog
+from ..models import Chatbot, ChatbotAnalytics, ChatbotAnalyticsDaily, ChatbotAnalyticsHourly
+
+
+class AnalyticsAggregatorTests(TestCase):
+
+    def setUp(self):
+        owner = User.objects.create(username='analytics')
+        self.chatbot = Chatbot.objects.create(name='Bot', owner=owner)
+        self.aggregator = AnalyticsAggregator(background=False)
+
+    def test_flush_applies_totals_and_rollups(self):
+        bucket = timezone.now().replace(minute=0, second=0, microsecond=0)
+        self.aggregator.record_many([
+            (self.chatbot.pk, SESSION_STARTED, 'ana', 1, bucket),
+            (self.chatbot.pk, MESSAGE, 'ana', 3, bucket),
+            (self.chatbot.pk, SESSION_STARTED, 'bia', 1, bucket - timedelta(hours=1)),
+            (self.chatbot.pk, MESSAGE, 'bia', 1, bucket - timedelta(hours=1)),
+            (self.chatbot.pk, SESSION_COMPLETED, 'bia', 1, bucket - timedelta(hours=1)),
+        ])
+
+        self.aggregator.flush()
+
+        analytics = ChatbotAnalytics.objects.get(chatbot=self.chatbot)
+        self.assertEqual(analytics.total_conversations, 2)
+        self.assertEqual(analytics.total_messages, 4)
+        self.assertEqual(analytics.completed_conversations, 1)
+        self.assertEqual(analytics.unique_users, 2)
+        self.assertEqual(analytics.avg_conversation_length, 2.0)
+        self.assertEqual(analytics.completion_rate, 50.0)
+
+        hourly = ChatbotAnalyticsHourly.objects.get(chatbot=self.chatbot, bucket=bucket)
+        self.assertEqual((hourly.conversations, hourly.messages, hourly.unique_users), (1, 3, 1))
+        self.assertEqual(ChatbotAnalyticsHourly.objects.filter(chatbot=self.chatbot).count(), 2)
+        self.assertEqual(
+            sum(ChatbotAnalyticsDaily.objects.filter(chatbot=self.chatbot).values_list('conversations', flat=True)), 2
+        )
+
+    def test_flushes_accumulate_without_double_counting_users(self):
+        self.aggregator.record(self.chatbot.pk, SESSION_STARTED, 'ana')
+        self.aggregator.flush()
+        self.aggregator.record(self.chatbot.pk, SESSION_STARTED, 'ana')
+        self.aggregator.flush()
+
+        analytics = ChatbotAnalytics.objects.get(chatbot=self.chatbot)
+        self.assertEqual(analytics.total_conversations, 2)
+        self.assertEqual(analytics.unique_users, 1)
+
+    def test_flush_cost_does_not_grow_with_events(self):
+        self.aggregator.record(self.chatbot.pk, MESSAGE, 'ana')
+        self.aggregator.flush()
+
+        def queries(events):
+            for i in range(events):
+                self.aggregator.record(self.chatbot.pk, MESSAGE, f'user-{i}')
+            with CaptureQueriesContext(connection) as context:
+                self.aggregator.flush()
+            return len(context)
+
+        self.assertEqual(queries(1), queries(200))
+
+    def test_empty_flush_runs_no_queries(self):
+        with self.assertNumQueries(0):
+            self.aggregator.flush()
+
+
+class HyperLogLogTests(TestCase):
+
+    def test_estimate_and_serialization(self):
+        sketch = HyperLogLog()
+        for i in range(5000):
+            sketch.add(f'user-{i}')
+            sketch.add(f'user-{i}')
+
+        restored = HyperLogLog.from_bytes(sketch.to_bytes())
+
+        self.assertAlmostEqual(restored.count(), 5000, delta=5000 * 0.05)
@@ -0,0 +1,98 @@
+"""
+Testes das listagens da API
+"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.executions.models import ChatSession, ChatMessage, ExecutionLog, UserInput, WebhookEvent
+from apps.flows import compiler
+from apps.flows.models import Flow, FlowExecution, FlowMessage
+from apps.integrations.models import Integration, IntegrationLog
+from ..models import Chatbot, ChatbotVersion
+
+
+def seed_list_data(user, size):
+    """Cria `size` linhas relacionadas em cada endpoint de listagem do usuário"""
+    for i in range(size):
+        chatbot = Chatbot.objects.create(name=f'Query Count Bot {i}', owner=user)
+        flow = Flow.objects.create(chatbot=chatbot, name='Fluxo', is_main_flow=True, created_by=user)
+        for number in (1, 2):
+            ChatbotVersion.objects.create(
+                chatbot=chatbot, version_number=number, name=f'v{number}',
+                flow_data={}, settings_data={}, created_by=user
+            )
+
+        execution = FlowExecution.objects.create(flow=flow, user_id=f'user-{i}')
+        FlowMessage.objects.create(execution=execution, node_id='n', message_type='bot', content={})
+
+        session = ChatSession.objects.create(chatbot=chatbot, flow=flow, user_id=f'user-{i}')
+        message = ChatMessage.objects.create(session=session, message_type='user', content={})
+        ExecutionLog.objects.create(session=session, node_id='n', component_type='message', status='completed')
+        UserInput.objects.create(
+            session=session, message=message, input_type='text', raw_value='x', processed_value='x'
+        )
+        WebhookEvent.objects.create(session=session, event_type='teste', webhook_url='https://example.com', payload={})
+
+        integration = Integration.objects.create(name=f'Integração {i}', type='webhook', owner=user)
+        integration.chatbots.add(chatbot)
+        IntegrationLog.objects.create(integration=integration, action='teste', message='ok')
+
+    return chatbot, flow, integration
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ListQueryCountTests(TestCase):
+    """As listagens fazem um número fixo de queries, independente do número de linhas"""
+
+    def setUp(self):
+        self.user = User.objects.create(username='querycount')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.addCleanup(cache.clear)
+
+    def endpoints(self, chatbot, flow, integration):
+        return [
+            '/api/chatbots/',
+            f'/api/chatbots/{chatbot.id}/',
+            f'/api/chatbots/{chatbot.id}/versions/',
+            f'/api/chatbots/{chatbot.id}/flows/',
+            f'/api/chatbots/{chatbot.id}/flows/{flow.id}/executions/',
+            '/api/flows/templates/',
+            '/api/components/templates/',
+            '/api/components/instances/',
+            '/api/components/connections/',
+            '/api/components/variables/',
+            '/api/executions/sessions/',
+            '/api/executions/messages/',
+            '/api/executions/logs/',
+            '/api/executions/webhooks/',
+            '/api/executions/inputs/',
+            '/api/integrations/',
+            f'/api/integrations/{integration.id}/logs/',
+        ]
+
+    def count_queries(self, url):
+        # Processo frio: nem o cache do Django nem o dos fluxos compilados ajudam
+        cache.clear()
+        compiler._cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(context.captured_queries)
+
+    def test_list_query_counts(self):
+        objects = seed_list_data(self.user, 2)
+        before = {url: self.count_queries(url) for url in self.endpoints(*objects)}
+
+        seed_list_data(self.user, 5)
+        chatbot = objects[0]
+        for i in range(3):
+            Flow.objects.create(chatbot=chatbot, name=f'Extra {i}', created_by=self.user)
+
+        for url, expected in before.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), expected)
@@ -0,0 +1,65 @@
+"""
+Testes do snapshot público dos chatbots publicados
+"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.flows.models import Flow
+from ..models import Chatbot
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class PublicChatbotSnapshotTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        owner = User.objects.create(username='snapshot')
+        self.chatbot = Chatbot.objects.create(name='Bot público', owner=owner)
+        self.flow = Flow.objects.create(
+            chatbot=self.chatbot, name='Principal', is_main_flow=True,
+            nodes=[{'id': 'start', 'type': 'start', 'data': {}}], edges=[], created_by=owner
+        )
+        self.chatbot.publish()
+        self.client = APIClient()
+        self.url = f'/api/chatbots/public/{self.chatbot.pk}/'
+
+    def test_cached_snapshot_costs_one_query(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json()['name'], 'Bot público')
+
+        with self.assertNumQueries(1):
+            second = self.client.get(self.url)
+
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_flow_save_changes_snapshot(self):
+        etag = self.client.get(self.url)['ETag']
+
+        self.flow.name = 'Renomeado'
+        self.flow.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['flows'][0]['name'], 'Renomeado')
+
+    def test_unpublished_chatbot_is_not_served(self):
+        self.client.get(self.url)
+
+        Chatbot.objects.get(pk=self.chatbot.pk).unpublish()
+
+        with self.assertLogs('django.request', 'WARNING'):
+            self.assertEqual(self.client.get(self.url).status_code, 404)
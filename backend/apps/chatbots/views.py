@@ -1,12 +1,19 @@
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import action
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 from django.db import transaction
+from django.db.models import Count, Prefetch, Window, F
+from django.db.models.functions import RowNumber
+from django.http import Http404, HttpResponse, HttpResponseNotModified
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from datetime import timedelta
 from drf_spectacular.utils import extend_schema
 
-from .models import Chatbot, ChatbotVersion, ChatbotAnalytics
+from .models import Chatbot, ChatbotVersion, ChatbotAnalytics, ChatbotAnalyticsHourly, ChatbotAnalyticsDaily
+from .snapshot import get_published_snapshot, published_version, store_published_snapshot
 from .serializers import (
     ChatbotSerializer,
     ChatbotCreateSerializer,
@@ -14,6 +21,8 @@ from .serializers import (
     ChatbotDetailSerializer,
     ChatbotVersionSerializer,
     ChatbotAnalyticsSerializer,
+    ChatbotAnalyticsHourlySerializer,
+    ChatbotAnalyticsDailySerializer,
     ChatbotPublishSerializer,
     ChatbotCloneSerializer,
 )
@@ -24,7 +33,18 @@ class ChatbotViewSet(ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Chatbot.objects.filter(owner=self.request.user).order_by('-updated_at')
+        queryset = Chatbot.objects.filter(owner=self.request.user).order_by('-updated_at')
+        if self.action == 'list':
+            # Contagens e última versão em consultas fixas, independentes do tamanho da página
+            latest_versions = ChatbotVersion.objects.annotate(
+                position=Window(RowNumber(), partition_by=F('chatbot_id'), order_by=F('version_number').desc())
+            ).filter(position=1)
+            queryset = queryset.select_related('owner').annotate(
+                flows_count=Count('flows')
+            ).prefetch_related(
+                Prefetch('versions', queryset=latest_versions, to_attr='latest_versions')
+            )
+        return queryset
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -158,6 +178,9 @@ class ChatbotViewSet(ModelViewSet):
                         new_chatbot.analytics.total_conversations = original_analytics.total_conversations
                         new_chatbot.analytics.total_messages = original_analytics.total_messages
                         new_chatbot.analytics.unique_users = original_analytics.unique_users
+                        new_chatbot.analytics.unique_users_sketch = original_analytics.unique_users_sketch
+                        new_chatbot.analytics.completed_conversations = original_analytics.completed_conversations
+                        new_chatbot.analytics.abandoned_conversations = original_analytics.abandoned_conversations
                         new_chatbot.analytics.avg_conversation_length = original_analytics.avg_conversation_length
                         new_chatbot.analytics.completion_rate = original_analytics.completion_rate
                         new_chatbot.analytics.save()
@@ -181,6 +204,44 @@ class ChatbotViewSet(ModelViewSet):
         
         serializer = ChatbotAnalyticsSerializer(analytics)
         return Response(serializer.data)
+    
+    @action(detail=True, methods=['get'])
+    @extend_schema(
+        summary="Linha do tempo de analytics",
+        description="Retorna os agregados por hora (granularity=hour) ou por dia (granularity=day) dos últimos N dias",
+    )
+    def timeline(self, request, pk=None):
+        chatbot = self.get_object()
+        granularity = request.query_params.get('granularity', 'day')
+        try:
+            days = min(int(request.query_params.get('days', 30)), 365)
+        except ValueError:
+            return Response(
+                {'error': 'Parâmetro days inválido.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        since = timezone.now() - timedelta(days=days)
+        
+        if granularity == 'hour':
+            rollups = ChatbotAnalyticsHourly.objects.filter(
+                chatbot=chatbot, bucket__gte=since
+            ).order_by('bucket')
+            serializer = ChatbotAnalyticsHourlySerializer(rollups, many=True)
+        elif granularity == 'day':
+            rollups = ChatbotAnalyticsDaily.objects.filter(
+                chatbot=chatbot, day__gte=timezone.localtime(since).date()
+            ).order_by('day')
+            serializer = ChatbotAnalyticsDailySerializer(rollups, many=True)
+        else:
+            return Response(
+                {'error': 'Granularidade deve ser hour ou day.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response({
+            'granularity': granularity,
+            'results': serializer.data
+        })
 
 
 class ChatbotVersionViewSet(ModelViewSet):
@@ -193,7 +254,7 @@ class ChatbotVersionViewSet(ModelViewSet):
         return ChatbotVersion.objects.filter(
             chatbot_id=chatbot_id,
             chatbot__owner=self.request.user
-        ).order_by('-version_number')
+        ).select_related('created_by').order_by('-version_number')
     
     @extend_schema(
         summary="Listar versões do chatbot",
@@ -279,7 +340,23 @@ class PublicChatbotView(generics.RetrieveAPIView):
     
     @extend_schema(
         summary="Obter chatbot público",
-        description="Acessa um chatbot publicado sem autenticação",
+        description="Acessa um chatbot publicado sem autenticação. Suporta ETag/If-None-Match.",
     )
     def get(self, request, *args, **kwargs):
-        return super().get(request, *args, **kwargs) 
\ No newline at end of file
+        # Versão lida pela chave primária: acertos no cache não renderizam nada
+        version = published_version(kwargs['id'])
+        if version is None:
+            raise Http404
+        snapshot = get_published_snapshot(kwargs['id'], version)
+        if snapshot is None:
+            chatbot = self.get_object()
+            body = JSONRenderer().render(self.get_serializer(chatbot).data)
+            snapshot = store_published_snapshot(chatbot, body)
+        
+        if snapshot['etag'] in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(snapshot['body'], content_type='application/json')
+        response['ETag'] = snapshot['etag']
+        response['Cache-Control'] = 'public, no-cache'
+        return response
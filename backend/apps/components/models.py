@@ -3,6 +3,7 @@ Modelos para componentes dos chatbots
 """
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 import uuid
 
 
@@ -174,4 +175,18 @@ class ComponentVariable(models.Model):
         unique_together = ['flow', 'name']
     
     def __str__(self):
-        return f"{self.name} ({self.variable_type})" 
\ No newline at end of file
+        return f"{self.name} ({self.variable_type})"
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._touch_flow()
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self._touch_flow()
+        return result
+    
+    def _touch_flow(self):
+        # Os tipos entram na compilação das condições: gera uma nova versão do fluxo
+        from apps.flows.models import Flow
+        Flow.objects.filter(pk=self.flow_id).update(updated_at=timezone.now()) 
\ No newline at end of file
@@ -30,7 +30,7 @@ class ComponentCategoryViewSet(ModelViewSet):
 
 class ComponentTemplateViewSet(ModelViewSet):
     """ViewSet para templates de componentes"""
-    queryset = ComponentTemplate.objects.filter(is_active=True).order_by('category__order', 'name')
+    queryset = ComponentTemplate.objects.filter(is_active=True).select_related('category').order_by('category__order', 'name')
     serializer_class = ComponentTemplateSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -96,9 +96,9 @@ class ComponentInstanceViewSet(ModelViewSet):
         if flow_id:
             return ComponentInstance.objects.filter(
                 flow_id=flow_id
-            ).order_by('created_at')
+            ).select_related('template', 'flow').order_by('created_at')
         
-        return ComponentInstance.objects.all().order_by('-created_at')
+        return ComponentInstance.objects.select_related('template', 'flow').order_by('-created_at')
     
     @action(detail=False, methods=['post'])
     @extend_schema(
@@ -132,9 +132,13 @@ class ComponentConnectionViewSet(ModelViewSet):
         if flow_id:
             return ComponentConnection.objects.filter(
                 flow_id=flow_id
+            ).select_related(
+                'source_component__template', 'target_component__template'
             ).order_by('created_at')
         
-        return ComponentConnection.objects.all().order_by('-created_at')
+        return ComponentConnection.objects.select_related(
+            'source_component__template', 'target_component__template'
+        ).order_by('-created_at')
 
 
 class ComponentVariableViewSet(ModelViewSet):
@@ -147,9 +151,9 @@ class ComponentVariableViewSet(ModelViewSet):
         if flow_id:
             return ComponentVariable.objects.filter(
                 flow_id=flow_id
-            ).order_by('name')
+            ).select_related('flow').order_by('name')
         
-        return ComponentVariable.objects.all().order_by('-created_at')
+        return ComponentVariable.objects.select_related('flow').order_by('-created_at')
 
 
 @api_view(['POST'])
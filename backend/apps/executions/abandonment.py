@@ -0,0 +1,139 @@
+"""
+Marcação das sessões abandonadas
+
+Sessões em andamento sem atividade há mais de `Chatbot.abandon_after_minutes`
+minutos (ou SESSION_ABANDONMENT['DEFAULT_MINUTES']) passam a 'abandoned'.
+Os ids são selecionados pelo índice (chatbot, last_activity) e atualizados
+em lotes (`UPDATE ... WHERE id IN (...)`), cada lote em sua própria
+transação; os eventos de analytics saem em lote e os agregados diários dos
+dias afetados são recalculados no fim.
+
+Sessões com estado quente ainda não gravado no banco e sessões 'waiting'
+com timer pendente nunca são marcadas.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from apps.chatbots.analytics import SESSION_ABANDONED, record_events
+from apps.chatbots.models import Chatbot
+from apps.flows.models import FlowExecution
+from . import rollups
+from .models import ChatSession, ScheduledTimer
+from .state import get_state_store
+
+
+DEFAULTS = {
+    # None desliga a marcação para os chatbots sem política própria
+    'DEFAULT_MINUTES': 30,
+    'CHUNK_SIZE': 1000,
+}
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'SESSION_ABANDONMENT', {})}
+
+
+def _policies(default_minutes):
+    """{minutos: [ids dos chatbots]} das políticas de abandono em vigor"""
+    policies = defaultdict(list)
+    for chatbot_id, minutes in Chatbot.objects.order_by().values_list('id', 'abandon_after_minutes'):
+        minutes = minutes if minutes is not None else default_minutes
+        if minutes is not None:
+            policies[minutes].append(chatbot_id)
+    return policies
+
+
+def _abandon_sessions(chatbot_ids, cutoff, now, chunk_size, state_store):
+    """Marca as sessões dos chatbots inativas desde `cutoff`; retorna (total, dias afetados)"""
+    idle = ChatSession.objects.filter(chatbot_id__in=chatbot_ids, last_activity__lt=cutoff).order_by('pk')
+    total = 0
+    dirty = defaultdict(set)
+    # Ativas; 'waiting' só sem timer pendente (ex.: desistido)
+    for candidates in (
+        idle.filter(status='active'),
+        idle.filter(status='waiting').exclude(Exists(ScheduledTimer.objects.filter(session_id=OuterRef('pk')))),
+    ):
+        total += _abandon_chunks(candidates, now, chunk_size, state_store, dirty)
+    return total, dirty
+
+
+def _abandon_chunks(candidates, now, chunk_size, state_store, dirty):
+    """Atualiza os candidatos em lotes travados com SKIP LOCKED, somando os dias em `dirty`"""
+    total = 0
+    # Cursor por pk: sessões puladas (vivas ou travadas) não voltam na mesma execução
+    last = None
+    while True:
+        queryset = candidates.filter(pk__gt=last) if last is not None else candidates
+        with transaction.atomic():
+            rows = list(
+                queryset.select_for_update(skip_locked=True, of=('self',))
+                .values_list('pk', 'chatbot_id', 'user_id', 'start_time')[:chunk_size]
+            )
+            if not rows:
+                break
+            last = rows[-1][0]
+
+            # Atividade recente ainda só no estado quente, conferida com as linhas travadas
+            live = state_store.live_among([row[0] for row in rows]) if state_store is not None else set()
+            abandoned = [row for row in rows if str(row[0]) not in live]
+            if abandoned:
+                ChatSession.objects.filter(pk__in=[row[0] for row in abandoned]).update(
+                    status='abandoned', end_time=now
+                )
+
+        record_events([(chatbot_id, SESSION_ABANDONED, user_id, 1, None) for _, chatbot_id, user_id, _ in abandoned])
+        for _, chatbot_id, _, start_time in abandoned:
+            dirty[timezone.localdate(start_time)].add(chatbot_id)
+        total += len(abandoned)
+    return total
+
+
+def _abandon_flow_executions(chatbot_ids, cutoff, chunk_size):
+    """Mesma marcação para as FlowExecution dos fluxos dos chatbots"""
+    executions = FlowExecution.objects.filter(
+        flow__chatbot_id__in=chatbot_ids, status='active', last_activity__lt=cutoff
+    ).order_by()
+    total = 0
+    while True:
+        ids = list(executions.values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return total
+        # update() não dispara o auto_now de last_activity
+        total += FlowExecution.objects.filter(pk__in=ids, status='active').update(status='abandoned')
+
+
+def sweep_abandoned_sessions(now=None, chunk_size=None, default_minutes=None):
+    """
+    Marca como abandonadas as sessões e execuções inativas de todos os
+    chatbots. Retorna {'sessions': n, 'flow_executions': n}.
+    """
+    config = _config()
+    now = now or timezone.now()
+    chunk_size = chunk_size or config['CHUNK_SIZE']
+    if default_minutes is None:
+        default_minutes = config['DEFAULT_MINUTES']
+
+    # Grava o estado quente ocioso antes de olhar last_activity no banco;
+    # o que continua no backend teve atividade recente e é conferido por lote
+    state_store = get_state_store()
+    if state_store is not None:
+        state_store.checkpoint_idle()
+
+    counts = {'sessions': 0, 'flow_executions': 0}
+    dirty = defaultdict(set)
+    for minutes, chatbot_ids in _policies(default_minutes).items():
+        cutoff = now - timedelta(minutes=minutes)
+        sessions, days = _abandon_sessions(chatbot_ids, cutoff, now, chunk_size, state_store)
+        counts['sessions'] += sessions
+        for day, ids in days.items():
+            dirty[day] |= ids
+        counts['flow_executions'] += _abandon_flow_executions(chatbot_ids, cutoff, chunk_size)
+
+    # Os agregados diários só veem mudanças em last_activity, que não muda aqui
+    rollups.rebuild_days(dirty)
+    return counts
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ChatSession, ChatMessage, ExecutionLog, WebhookEvent, UserInput
+from .models import ChatSession, ChatMessage, ExecutionLog, WebhookEvent, UserInput, ScheduledTimer
 
 
 @admin.register(ChatSession)
@@ -117,4 +117,12 @@ class UserInputAdmin(admin.ModelAdmin):
             'fields': ('collected_at',),
             'classes': ('collapse',)
         }),
-    ) 
\ No newline at end of file
+    ) 
+
+
+@admin.register(ScheduledTimer)
+class ScheduledTimerAdmin(admin.ModelAdmin):
+    list_display = ('session', 'node_id', 'due_at', 'claimed_until', 'attempts')
+    list_filter = ('due_at',)
+    search_fields = ('session__user_id', 'node_id')
+    readonly_fields = ('id', 'created_at')
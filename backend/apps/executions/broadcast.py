@@ -0,0 +1,35 @@
+"""
+Publicação dos passos das sessões no channel layer
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+
+logger = logging.getLogger(__name__)
+
+
+def session_group_name(session_id):
+    """Grupo do channel layer que recebe os eventos de uma sessão"""
+    return f'chat_session_{session_id}'
+
+
+def broadcast_step(result, user_event=None):
+    """
+    Publica o passo para o socket da sessão e os observadores.
+
+    Chamado pelo runtime depois de cada passo, venha ele do REST, do
+    WebSocket ou de um timer; falhas do channel layer não afetam o passo.
+    """
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    try:
+        async_to_sync(layer.group_send)(session_group_name(result.session.pk), {
+            'type': 'chat.step',
+            'user_event': user_event,
+            'result': result.to_dict(),
+        })
+    except Exception:
+        logger.warning('Falha ao publicar o passo da sessão %s', result.session.pk, exc_info=True)
@@ -0,0 +1,235 @@
+"""
+Buffer write-behind para os registros de alto volume das sessões
+"""
+import atexit
+import logging
+import threading
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core import serializers
+from django.db import IntegrityError, close_old_connections, transaction
+
+
+logger = logging.getLogger(__name__)
+
+# Ordem de inserção respeitando as FKs (UserInput -> ChatMessage)
+BUFFERED_MODELS = ('executions.ChatMessage', 'executions.ExecutionLog', 'executions.UserInput')
+
+DEFAULTS = {
+    'ENABLED': True,
+    'MAX_SIZE': 500,
+    'FLUSH_INTERVAL': 1.0,
+    'BATCH_SIZE': 500,
+    'SPOOL_PATH': None,
+}
+
+
+class WriteBehindBuffer:
+    """
+    Agrupa inserts de ChatMessage, ExecutionLog e UserInput em lotes de bulk_create.
+
+    O lote é gravado quando atinge MAX_SIZE registros ou a cada FLUSH_INTERVAL
+    segundos, e o restante no desligamento do processo. Se o banco falhar,
+    os registros são gravados no arquivo de spool para replay posterior;
+    registros que violam a integridade (ex.: sessão já removida) são
+    separados no arquivo de rejeitados sem levar o lote junto.
+    """
+
+    def __init__(self, max_size=500, flush_interval=1.0, batch_size=500, spool_path=None):
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.spool_path = Path(spool_path) if spool_path else None
+
+        self._pending = {label: [] for label in BUFFERED_MODELS}
+        self._size = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def add(self, instances):
+        """Enfileira instâncias ainda não salvas para o próximo lote"""
+        with self._lock:
+            for instance in instances:
+                self._pending[instance._meta.label].append(instance)
+                self._size += 1
+            full = self._size >= self.max_size
+            self._ensure_thread()
+
+        if full:
+            self._wakeup.set()
+
+    def __len__(self):
+        return self._size
+
+    def flush(self):
+        """Grava imediatamente tudo o que está pendente"""
+        with self._flush_lock:
+            batch = self._drain()
+            if not batch:
+                return
+            try:
+                self._write(batch)
+            except Exception:
+                # Não perde o lote: os registros vão para o spool antes de propagar o erro
+                self._spool(batch)
+                raise
+
+    def close(self):
+        """Para a thread de flush e grava o restante (chamado no atexit)"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.flush_interval * 5)
+
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Falha ao gravar buffer de execução no desligamento')
+
+    def _drain(self):
+        with self._lock:
+            batch = [(label, objs) for label, objs in self._pending.items() if objs]
+            self._pending = {label: [] for label in BUFFERED_MODELS}
+            self._size = 0
+        return batch
+
+    def _write(self, batch):
+        try:
+            with transaction.atomic():
+                for label, objs in batch:
+                    apps.get_model(label).objects.bulk_create(objs, batch_size=self.batch_size)
+        except IntegrityError:
+            rejected = []
+            for label, objs in batch:
+                rejected += _insert_rows(apps.get_model(label), objs)
+            _reject(self.spool_path, rejected)
+
+    def _spool(self, batch):
+        if self.spool_path is None:
+            logger.error('Buffer de execução descartado: SPOOL_PATH não configurado')
+            return
+        self.spool_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.spool_path.open('a', encoding='utf-8') as spool:
+            for label, objs in batch:
+                spool.write(serializers.serialize('json', objs) + '\n')
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run,
+                name='execution-write-buffer',
+                daemon=True,
+            )
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if not self._size:
+                continue
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Falha ao gravar lote do buffer de execução')
+            finally:
+                close_old_connections()
+
+
+def _insert_rows(model, objs, ignore_conflicts=False):
+    """
+    Insere um registro por transação e retorna os que violam a integridade.
+
+    Cada um precisa do próprio commit: as FKs são verificadas no fim da
+    transação externa, então savepoints não isolariam o registro inválido.
+    """
+    rejected = []
+    for obj in objs:
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create([obj], ignore_conflicts=ignore_conflicts)
+        except IntegrityError:
+            rejected.append(obj)
+    return rejected
+
+
+def rejected_path(spool_path):
+    return spool_path.with_name(spool_path.name + '.rejected')
+
+
+def _reject(spool_path, objs):
+    """Separa os registros inválidos no arquivo de rejeitados do spool"""
+    if not objs:
+        return
+    logger.warning('%d registros do buffer de execução rejeitados por violar a integridade', len(objs))
+    if spool_path is None:
+        return
+    path = rejected_path(spool_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open('a', encoding='utf-8') as rejected:
+        rejected.write(serializers.serialize('json', objs) + '\n')
+
+
+def replay_spool(path, batch_size=500):
+    """
+    Reinsere os registros gravados no spool, ignorando os já existentes.
+    Os que violam a integridade vão para o arquivo de rejeitados.
+    """
+    path = Path(path)
+    if not path.exists():
+        return 0
+
+    total = 0
+    with path.open(encoding='utf-8') as spool:
+        for line in spool:
+            if not line.strip():
+                continue
+            objs = [item.object for item in serializers.deserialize('json', line)]
+            if not objs:
+                continue
+            model = type(objs[0])
+            try:
+                with transaction.atomic():
+                    model.objects.bulk_create(objs, batch_size=batch_size, ignore_conflicts=True)
+            except IntegrityError:
+                # ignore_conflicts não cobre FKs (ex.: sessão removida pela retenção)
+                rejected = _insert_rows(model, objs, ignore_conflicts=True)
+                _reject(path, rejected)
+                objs = [obj for obj in objs if obj not in rejected]
+            total += len(objs)
+
+    path.unlink()
+    return total
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer_settings():
+    return {**DEFAULTS, **getattr(settings, 'EXECUTION_WRITE_BUFFER', {})}
+
+
+def get_write_buffer():
+    """Buffer compartilhado do processo, ou None se desabilitado nas settings"""
+    global _buffer
+    config = get_buffer_settings()
+    if not config['ENABLED']:
+        return None
+
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = WriteBehindBuffer(
+                    max_size=config['MAX_SIZE'],
+                    flush_interval=config['FLUSH_INTERVAL'],
+                    batch_size=config['BATCH_SIZE'],
+                    spool_path=config['SPOOL_PATH'],
+                )
+                atexit.register(_buffer.close)
+    return _buffer
@@ -0,0 +1,131 @@
+"""
+Consumers WebSocket para sessões de chat em tempo real
+"""
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .broadcast import session_group_name
+from .engine import EngineError, step
+from .engine.runtime import FINISHED_STATUSES
+from .models import ChatSession
+from .state import get_state_store
+
+
+def _load_public_session(session_id):
+    session = ChatSession.objects.select_related('flow').filter(
+        id=session_id,
+        chatbot__is_published=True,
+        chatbot__is_active=True
+    ).first()
+    state_store = get_state_store()
+    if session is not None and state_store:
+        # O nó atual pode estar só no estado quente
+        state_store.load(session)
+    return session
+
+
+def _load_owned_session(session_id, user):
+    return ChatSession.objects.filter(id=session_id, owner=user).first()
+
+
+def _step_public_session(session_id, user_event):
+    # Recarregada a cada passo: timers e o REST também avançam a sessão
+    session = _load_public_session(session_id)
+    if session is None:
+        raise EngineError('Sessão não encontrada.')
+    return step(session, user_event)
+
+
+# O motor roda fora da thread principal do ASGI; sessões diferentes avançam em paralelo
+_run_step = database_sync_to_async(_step_public_session, thread_sensitive=False)
+
+
+class ChatSessionConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Conversa de uma ChatSession sobre um único socket persistente.
+
+    Cada passo do motor é publicado pelo runtime no grupo da sessão, de forma
+    que o próprio visitante e os observadores recebem o mesmo lote de
+    mensagens, inclusive dos passos feitos pelo REST e pelos timers.
+    """
+
+    async def connect(self):
+        self.session_id = self.scope['url_route']['kwargs']['session_id']
+        self.group_name = session_group_name(self.session_id)
+        session = await database_sync_to_async(_load_public_session)(self.session_id)
+
+        if session is None:
+            await self.close(code=4404)
+            return
+
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+        # Sessão recém-criada: executa o primeiro passo assim que o socket abre
+        if session.current_node_id is None and session.status not in FINISHED_STATUSES:
+            await self._advance(None)
+
+    async def disconnect(self, code):
+        if getattr(self, 'group_name', None):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        if content.get('type') != 'user_message':
+            await self.send_json({'type': 'error', 'error': 'Tipo de evento não suportado.'})
+            return
+
+        await self._advance({'value': content.get('value')})
+
+    async def _advance(self, user_event):
+        try:
+            # O resultado chega pelo grupo da sessão (chat_step)
+            await _run_step(self.session_id, user_event)
+        except EngineError as e:
+            await self.send_json({'type': 'error', 'error': str(e)})
+
+    async def chat_step(self, event):
+        await self.send_json({
+            'type': 'step',
+            'user_event': event['user_event'],
+            **event['result'],
+        })
+
+
+class ChatSessionObserverConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Acompanhamento somente leitura de uma sessão (live-inspect do builder)
+    """
+
+    async def connect(self):
+        user = self.scope.get('user')
+        self.session_id = self.scope['url_route']['kwargs']['session_id']
+        self.group_name = None
+
+        if user is None or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+
+        session = await database_sync_to_async(_load_owned_session)(self.session_id, user)
+        if session is None:
+            await self.close(code=4404)
+            return
+
+        self.group_name = session_group_name(self.session_id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        # O navegador exige o subprotocolo de volta quando o token veio por ele
+        await self.accept(subprotocol=self.scope.get('auth_subprotocol'))
+
+    async def disconnect(self, code):
+        if self.group_name:
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        # Observadores não interagem com a sessão
+        pass
+
+    async def chat_step(self, event):
+        await self.send_json({
+            'type': 'step',
+            'user_event': event['user_event'],
+            **event['result'],
+        })
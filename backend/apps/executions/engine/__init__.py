@@ -0,0 +1,14 @@
+"""
+Motor de execução server-side dos fluxos
+"""
+from .exceptions import EngineError, InvalidUserEvent
+from .runtime import FlowEngine, StepResult, start_session, step
+
+__all__ = [
+    'EngineError',
+    'InvalidUserEvent',
+    'FlowEngine',
+    'StepResult',
+    'start_session',
+    'step',
+]
@@ -0,0 +1,204 @@
+"""
+Avaliação das condições dos nós `conditional`
+
+As condições são compiladas uma vez por versão do fluxo em closures que
+recebem apenas as variáveis da sessão: operador, valor de comparação e
+conversão de tipo (ComponentVariable.variable_type) já ficam resolvidos.
+"""
+from datetime import date, datetime, timezone as dt_timezone
+import operator as op
+
+from django.utils.dateparse import parse_date, parse_datetime
+
+
+# Aliases usados pelo editor visual para os operadores
+OPERATOR_ALIASES = {
+    'equals': '==',
+    'not_equals': '!=',
+    'greater': '>',
+    'less': '<',
+    'greater_or_equal': '>=',
+    'less_or_equal': '<=',
+}
+
+ORDERING = {
+    '==': op.eq,
+    '!=': op.ne,
+    '>': op.gt,
+    '<': op.lt,
+    '>=': op.ge,
+    '<=': op.le,
+}
+
+TRUE_STRINGS = frozenset({'true', '1', 'yes', 'sim', 'on'})
+
+
+def _to_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+def prepare(data):
+    """
+    Normaliza a condição de um nó `conditional` para avaliação repetida.
+
+    Aceita a forma simples (variable/operator/value) ou grupos
+    `conditions` combinados por `logic` ('and' / 'or'). Retorna
+    (usa_or, ((variavel, operador, valor), ...)).
+    """
+    conditions = data.get('conditions')
+    if not conditions:
+        conditions = [{
+            'variable': data.get('variable'),
+            'operator': data.get('operator', '=='),
+            'value': data.get('value'),
+        }]
+
+    clauses = tuple(
+        (
+            condition.get('variable'),
+            OPERATOR_ALIASES.get(condition.get('operator', '=='), condition.get('operator', '==')),
+            condition.get('value'),
+        )
+        for condition in conditions
+        if condition.get('variable')
+    )
+    return str(data.get('logic', 'and')).lower() == 'or', clauses
+
+
+def _coerce_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _coerce_boolean(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value.strip().lower() in TRUE_STRINGS
+    return bool(value)
+
+
+def _coerce_date(value):
+    """Converte datas e datas/horas (objetos ou ISO 8601) em timestamp UTC"""
+    if isinstance(value, str):
+        value = parse_datetime(value) or parse_date(value)
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=dt_timezone.utc)
+        return value.timestamp()
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day, tzinfo=dt_timezone.utc).timestamp()
+    return None
+
+
+# Conversões aplicadas aos dois lados da comparação por tipo declarado
+COERCERS = {
+    'number': _coerce_number,
+    'boolean': _coerce_boolean,
+    'date': _coerce_date,
+}
+
+
+def _typed_clause(variable, compare_to, right, coerce):
+    # Valores que não convertem para o tipo só satisfazem `!=`
+    missing = compare_to is op.ne
+
+    def clause(variables):
+        left = coerce(variables.get(variable))
+        if left is None:
+            return missing
+        return compare_to(left, right)
+    return clause
+
+
+def compile_clause(variable, operator, value, variable_type=None):
+    """Compila uma comparação em uma closure `f(variables) -> bool`"""
+    operator = OPERATOR_ALIASES.get(operator, operator)
+
+    coerce = COERCERS.get(variable_type)
+    if coerce is not None and operator in ORDERING:
+        right = coerce(value)
+        if right is not None:
+            return _typed_clause(variable, ORDERING[operator], right, coerce)
+
+    if variable_type == 'array' and operator == 'contains':
+        text = str(value)
+
+        def contains_item(variables):
+            left = variables.get(variable)
+            if isinstance(left, (list, tuple)):
+                return value in left or text in map(str, left)
+            return text in str(left)
+        return contains_item
+
+    # Sem tipo declarado: mesma semântica do executor do frontend
+    if operator in ('==', '!='):
+        text = str(value)
+        negate = operator == '!='
+
+        def equals(variables):
+            left = variables.get(variable)
+            return (left == value or str(left) == text) != negate
+        return equals
+    if operator in ORDERING:
+        compare_to = ORDERING[operator]
+        right = _to_number(value)
+
+        def ordering(variables):
+            return compare_to(_to_number(variables.get(variable)), right)
+        return ordering
+    if operator == 'contains':
+        text = str(value)
+
+        def contains(variables):
+            return text in str(variables.get(variable))
+        return contains
+    return _never
+
+
+def _never(variables):
+    return False
+
+
+def _always(variables):
+    return True
+
+
+def compile_condition(data, variable_types=None):
+    """
+    Compila a condição de um nó `conditional` em `f(variables) -> bool`.
+
+    `variable_types` mapeia nome da variável -> variable_type, usado nas
+    comparações tipadas (number, boolean, date, array).
+    """
+    variable_types = variable_types or {}
+    use_or, clauses = prepare(data)
+    predicates = tuple(
+        compile_clause(variable, operator, value, variable_types.get(variable))
+        for variable, operator, value in clauses
+    )
+    if not predicates:
+        return _never if use_or else _always
+    if len(predicates) == 1:
+        return predicates[0]
+
+    if use_or:
+        def match_any(variables):
+            for predicate in predicates:
+                if predicate(variables):
+                    return True
+            return False
+        return match_any
+
+    def match_all(variables):
+        for predicate in predicates:
+            if not predicate(variables):
+                return False
+        return True
+    return match_all
+
@@ -0,0 +1,11 @@
+"""
+Exceções do motor de execução
+"""
+
+
+class EngineError(Exception):
+    """Erro genérico de execução do fluxo"""
+
+
+class InvalidUserEvent(EngineError):
+    """Evento do usuário não pode ser consumido pelo nó atual"""
@@ -0,0 +1,471 @@
+"""
+Handlers dos tipos de nó executados pelo motor
+"""
+from datetime import timedelta
+import math
+import re
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.executions import scripts
+from apps.integrations import http, log_pipeline, oauth
+from apps.integrations.models import Integration
+from apps.integrations.response_cache import get_response_cache
+from . import conditions
+from .exceptions import EngineError, InvalidUserEvent
+from .templates import choice_field, render
+
+
+# Nós que aguardam uma resposta do usuário antes de seguir
+BLOCKING_NODE_TYPES = frozenset({'input', 'user-input', 'choice', 'file-upload'})
+
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+PHONE_PATTERN = re.compile(r'^\+?[\d\s().-]{8,20}$')
+
+# Delays a partir desta duração (ms) pausam a sessão em um timer do servidor
+SERVER_DELAY_MS = 5000
+
+
+class NodeResult:
+    """
+    Resultado da execução de um nó
+    """
+    __slots__ = ('message', 'handle', 'next_node_id', 'blocking', 'finished', 'output', 'wait_until')
+
+    def __init__(self, message=None, handle=None, next_node_id=None,
+                 blocking=False, finished=False, output=None, wait_until=None):
+        self.message = message
+        self.handle = handle
+        self.next_node_id = next_node_id
+        self.blocking = blocking
+        self.finished = finished
+        self.output = output or {}
+        # Pausa a sessão ('waiting') até o horário, retomada pelo run_timers
+        self.wait_until = wait_until
+
+
+def bot_message(node, content_type, content):
+    """Monta uma mensagem do bot a ser emitida para o cliente"""
+    return {
+        'node_id': node['id'],
+        'content_type': content_type,
+        'content': content,
+    }
+
+
+def render_field(context, node, field, default=''):
+    """Renderiza um campo do nó usando o template pré-processado na compilação"""
+    template = context.compiled.get_template(node['id'], field)
+    if template is not None:
+        return template.render(context.variables)
+    return render(node.get('data', {}).get(field) or default, context.variables)
+
+
+def _render_choice(context, node, index, choice):
+    template = context.compiled.get_template(node['id'], choice_field(index))
+    if template is not None:
+        return template.render(context.variables)
+    return render(choice.get('label') or f'Opção {index + 1}', context.variables)
+
+
+def execute_start(context, node):
+    return NodeResult()
+
+
+def execute_message(context, node):
+    data = node.get('data', {})
+    field = next((field for field in ('text', 'message', 'label') if data.get(field)), 'text')
+    text = render_field(context, node, field, 'Mensagem não configurada')
+    return NodeResult(message=bot_message(node, 'text', {
+        'type': 'message',
+        'message': text,
+        'avatar': data.get('avatar'),
+        'typingDelay': data.get('typingDelay', 1000),
+    }))
+
+
+def execute_image(context, node):
+    data = node.get('data', {})
+    return NodeResult(message=bot_message(node, 'image', {
+        'type': 'image',
+        'url': render_field(context, node, 'url'),
+        'altText': render_field(context, node, 'altText'),
+        'caption': render_field(context, node, 'caption'),
+        'width': data.get('width'),
+        'height': data.get('height'),
+    }))
+
+
+def execute_video(context, node):
+    data = node.get('data', {})
+    return NodeResult(message=bot_message(node, 'video', {
+        'type': 'video',
+        'url': render_field(context, node, 'url'),
+        'platform': data.get('platform', 'youtube'),
+        'autoplay': data.get('autoplay', False),
+        'controls': data.get('controls', True) is not False,
+        'muted': data.get('muted', False),
+    }))
+
+
+def execute_input(context, node):
+    data = node.get('data', {})
+    input_type = data.get('inputType', 'text')
+    return NodeResult(blocking=True, message=bot_message(node, 'input', {
+        'type': 'user-input',
+        'placeholder': render_field(context, node, 'placeholder', 'Digite sua resposta:'),
+        'required': data.get('required', False),
+        'inputType': input_type,
+        'variableName': data.get('variableName'),
+    }))
+
+
+def execute_choice(context, node):
+    data = node.get('data', {})
+    choices = [
+        {
+            'index': index,
+            'label': _render_choice(context, node, index, choice),
+            'value': choice.get('value') or choice.get('label'),
+        }
+        for index, choice in enumerate(data.get('choices') or [])
+    ]
+    return NodeResult(blocking=True, message=bot_message(node, 'choice', {
+        'type': 'choice',
+        'choices': choices,
+        'allowMultiple': data.get('allowMultiple', False),
+    }))
+
+
+def execute_file_upload(context, node):
+    data = node.get('data', {})
+    return NodeResult(blocking=True, message=bot_message(node, 'file', {
+        'type': 'file-upload',
+        'prompt': render_field(context, node, 'label', 'Envie um arquivo:'),
+        'allowedTypes': data.get('allowedTypes', []),
+        'maxSize': data.get('maxSize', 10),
+        'multiple': data.get('multiple', False),
+    }))
+
+
+def execute_conditional(context, node):
+    data = node.get('data', {})
+    if not data.get('variable') and not data.get('conditions'):
+        raise EngineError('Variável não especificada no nó condicional')
+
+    predicate = context.compiled.get_condition(node['id']) or conditions.compile_condition(data)
+    result = predicate(context.variables)
+    return NodeResult(handle='true' if result else 'false', output={'result': result})
+
+
+def execute_variable(context, node):
+    data = node.get('data', {})
+    variable = data.get('variable')
+    if not variable:
+        raise EngineError('Nome da variável não especificado')
+
+    operation = data.get('operation', 'set')
+    value = render_field(context, node, 'value')
+    variables = context.variables
+
+    if operation == 'set':
+        variables[variable] = value
+    elif operation == 'increment':
+        variables[variable] = _number(variables.get(variable)) + (_number(value) or 1)
+    elif operation == 'decrement':
+        variables[variable] = _number(variables.get(variable)) - (_number(value) or 1)
+    elif operation == 'append':
+        variables[variable] = f"{variables.get(variable) or ''}{value}"
+    elif operation == 'clear':
+        variables[variable] = ''
+
+    return NodeResult(output={'variable': variable, 'operation': operation, 'value': variables.get(variable)})
+
+
+def execute_delay(context, node):
+    data = node.get('data', {})
+    message = data.get('message')
+    duration = _number(data.get('duration', 1000))
+
+    # Pausas curtas são aplicadas pelo cliente; as longas viram um timer durável.
+    # Em nenhum caso o servidor dorme dentro do worker.
+    threshold = getattr(settings, 'SESSION_TIMERS', {}).get('SERVER_DELAY_MS', SERVER_DELAY_MS)
+    wait_until = None
+    if duration >= threshold:
+        wait_until = timezone.now() + timedelta(milliseconds=duration)
+
+    return NodeResult(message=bot_message(node, 'system', {
+        'type': 'delay',
+        'duration': data.get('duration', 1000),
+        'message': render_field(context, node, 'message') if message else None,
+        'showTypingIndicator': data.get('showTypingIndicator', False),
+        'resumesAt': wait_until.isoformat() if wait_until else None,
+    }), wait_until=wait_until)
+
+
+def execute_end(context, node):
+    data = node.get('data', {})
+    return NodeResult(finished=True, message=bot_message(node, 'text', {
+        'type': 'end',
+        'message': render_field(context, node, 'message', 'Conversa finalizada!'),
+        'ctaLabel': data.get('ctaLabel'),
+        'ctaUrl': data.get('ctaUrl'),
+        'showRating': data.get('showRating'),
+    }))
+
+
+def execute_api_request(context, node):
+    """
+    Requisição HTTP pelo cliente compartilhado das integrações.
+
+    Com `integrationId`, usa o pool, o timeout, a autenticação e o circuit
+    breaker da integração, e URLs relativas são resolvidas a partir da
+    base_url da ApiConnection.
+    """
+    data = node.get('data', {})
+    url = render_field(context, node, 'url')
+    if not url:
+        raise EngineError('URL não especificada no nó de requisição')
+    method = str(data.get('method') or 'GET').upper()
+
+    integration = None
+    api = None
+    headers = {}
+    if data.get('integrationId'):
+        integration = Integration.objects.select_related('api_connection', 'webhook').filter(
+            pk=data['integrationId'], owner_id=context.session.owner_id
+        ).first()
+        if integration is None:
+            raise EngineError('Integração do nó de requisição não encontrada')
+        api = http._related(integration, 'api_connection')
+        if api is not None:
+            if not url.startswith(('http://', 'https://')):
+                url = f"{api.base_url.rstrip('/')}/{url.lstrip('/')}"
+            try:
+                headers.update(http.auth_headers(api))
+            except http.HTTPError as exc:
+                # Falha ao obter o token OAuth 2.0
+                _log_request(context, integration, method, url, None, 'error', f'{method} {url} -> falha na autenticação: {exc}')
+                return _api_result(context, node, 'error', {'url': url, 'method': method, 'error': str(exc)})
+    headers.update(data.get('headers') or {})
+
+    body = data.get('body')
+    kwargs = {'headers': headers}
+    if isinstance(body, str) and body:
+        kwargs['content'] = render_field(context, node, 'body').encode('utf-8')
+    elif body:
+        kwargs['json'] = body
+
+    started = time.perf_counter()
+    cache_status = ''
+    try:
+        if api is not None:
+            response, cache_status = get_response_cache().request(api, method, url, integration=integration, **kwargs)
+        else:
+            response = http.request(method, url, integration=integration, **kwargs)
+        if response.status_code == 401 and api is not None and api.auth_type == 'oauth2':
+            # Token revogado antes da expiração: renova e tenta uma vez mais
+            oauth.invalidate_access_token(api)
+            kwargs['headers'] = {**headers, **http.auth_headers(api), **(data.get('headers') or {})}
+            response = http.request(method, url, integration=integration, **kwargs)
+    except http.IntegrationUnavailable as exc:
+        _log_request(context, integration, method, url, started, 'warning', f'{method} {url} -> indisponível: {exc}')
+        # Circuito aberto ou bulkhead cheio: segue pelo ramo de fallback, se houver
+        if context.compiled.next_node_id(node['id'], 'fallback') is None:
+            return _api_result(context, node, 'error', {'url': url, 'method': method, 'error': str(exc)})
+        if data.get('storeResponseIn') and 'fallbackValue' in data:
+            context.variables[data['storeResponseIn']] = data['fallbackValue']
+        return _api_result(context, node, 'fallback', {'url': url, 'method': method, 'error': str(exc)})
+    except http.HTTPError as exc:
+        _log_request(context, integration, method, url, started, 'error', f'{method} {url} -> {exc}')
+        return _api_result(context, node, 'error', {'url': url, 'method': method, 'error': str(exc)})
+
+    try:
+        payload = response.json()
+    except ValueError:
+        payload = response.text
+    variable = data.get('storeResponseIn')
+    if variable:
+        context.variables[variable] = payload
+
+    handle = 'success' if response.is_success else 'error'
+    _log_request(
+        context, integration, method, url, started,
+        'info' if response.is_success else 'error',
+        f'{method} {url} -> {response.status_code}',
+        status_code=response.status_code,
+        cache_status=cache_status,
+    )
+    output = {'url': url, 'method': method, 'status': response.status_code}
+    if cache_status:
+        output['cache'] = cache_status
+    return _api_result(context, node, handle, output)
+
+
+def _log_request(context, integration, method, url, started, level, message, **fields):
+    """Registra a requisição do nó no log da integração, se houver uma"""
+    if integration is None:
+        return
+    log_pipeline.log_integration(
+        integration.pk,
+        execution_id=context.session.id,
+        action='request',
+        level=level,
+        message=message,
+        duration=time.perf_counter() - started if started is not None else None,
+        **fields
+    )
+
+
+def _api_result(context, node, handle, output):
+    next_node_id = context.compiled.next_node_id(node['id'], handle)
+    if next_node_id is None and handle == 'success':
+        next_node_id = context.compiled.next_node_id(node['id'])
+    if next_node_id is None and handle == 'error':
+        raise EngineError(f"Falha na requisição: {output.get('error') or output.get('status')}")
+    return NodeResult(handle=handle, next_node_id=next_node_id, output=output)
+
+
+def execute_script(context, node):
+    """Executa o script do nó no pool de processos isolados"""
+    data = node.get('data', {})
+    language = data.get('language') or 'javascript'
+    source = data.get('script') or ''
+    if not source.strip():
+        raise EngineError('Script não especificado')
+
+    if language != 'python':
+        return _script_result(context, node, 'error', {
+            'language': language,
+            'error': f'Linguagem não suportada no servidor: {language}',
+        })
+
+    names = [str(name).strip('{} ') for name in data.get('variables') or []]
+    if names:
+        variables = {name: context.variables.get(name) for name in names if name}
+    else:
+        variables = dict(context.variables)
+
+    try:
+        result, output = scripts.run_script(source, variables, timeout=data.get('timeout'))
+    except scripts.ScriptError as exc:
+        return _script_result(context, node, 'error', {'language': language, 'error': str(exc)})
+
+    result_variable = data.get('resultVariable')
+    if result_variable:
+        context.variables[str(result_variable).strip('{} ')] = result
+    return _script_result(context, node, 'success', {'language': language, 'result': result, 'output': output})
+
+
+def _script_result(context, node, handle, output):
+    next_node_id = context.compiled.next_node_id(node['id'], handle)
+    if next_node_id is None and handle == 'success':
+        next_node_id = context.compiled.next_node_id(node['id'])
+    if next_node_id is None and handle == 'error':
+        raise EngineError(f"Falha no script: {output['error']}")
+    return NodeResult(handle=handle, next_node_id=next_node_id, output=output)
+
+
+def _number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0
+    if not math.isfinite(number):
+        return 0
+    return int(number) if number.is_integer() else number
+
+
+NODE_HANDLERS = {
+    'start': execute_start,
+    'text': execute_message,
+    'message': execute_message,
+    'image': execute_image,
+    'video': execute_video,
+    'input': execute_input,
+    'user-input': execute_input,
+    'choice': execute_choice,
+    'file-upload': execute_file_upload,
+    'conditional': execute_conditional,
+    'variable': execute_variable,
+    'delay': execute_delay,
+    'end': execute_end,
+    'api-request': execute_api_request,
+    'webhook': execute_api_request,
+    'script': execute_script,
+}
+
+
+def consume_input(node, value):
+    """
+    Valida a resposta do usuário para um nó de entrada.
+
+    Retorna (input_type, valor processado, handle de saída).
+    """
+    data = node.get('data', {})
+    node_type = node.get('type')
+
+    if node_type == 'choice':
+        return ('choice',) + _consume_choice(data, value)
+
+    if node_type == 'file-upload':
+        if not value:
+            raise InvalidUserEvent('Nenhum arquivo enviado')
+        return 'file', value, None
+
+    input_type = data.get('inputType', 'text')
+    raw = '' if value is None else str(value).strip()
+
+    if not raw:
+        if data.get('required'):
+            raise InvalidUserEvent('Este campo é obrigatório')
+        return input_type_for(node), raw, None
+
+    if input_type == 'number':
+        number = _parse_number(raw)
+        if number is None:
+            raise InvalidUserEvent('Informe um número válido')
+        return 'number', number, None
+    if input_type == 'email' and not EMAIL_PATTERN.match(raw):
+        raise InvalidUserEvent('Informe um email válido')
+    if input_type == 'phone' and not PHONE_PATTERN.match(raw):
+        raise InvalidUserEvent('Informe um telefone válido')
+
+    return input_type_for(node), raw, None
+
+
+def _consume_choice(data, value):
+    choices = data.get('choices') or []
+    selected = value.get('index', value.get('value')) if isinstance(value, dict) else value
+
+    for index, choice in enumerate(choices):
+        choice_value = choice.get('value') or choice.get('label')
+        if selected == index or selected in (choice_value, choice.get('label'), str(index)):
+            return choice_value, f'choice-{index}'
+
+    raise InvalidUserEvent('Opção inválida')
+
+
+def _parse_number(raw):
+    try:
+        number = float(raw.replace(',', '.'))
+    except ValueError:
+        return None
+    # nan/inf não cabem nas variáveis gravadas em JSON
+    if not math.isfinite(number):
+        return None
+    return int(number) if number.is_integer() else number
+
+
+def input_type_for(node):
+    """Tipo de UserInput correspondente ao nó de entrada"""
+    node_type = node.get('type')
+    if node_type == 'choice':
+        return 'choice'
+    if node_type == 'file-upload':
+        return 'file'
+    input_type = node.get('data', {}).get('inputType', 'text')
+    # UserInput.input_type não conhece 'password'; tratamos como texto
+    return input_type if input_type in ('text', 'number', 'email', 'phone', 'date') else 'text'
@@ -0,0 +1,368 @@
+"""
+Execução passo a passo de uma ChatSession sobre o fluxo compilado
+"""
+import time
+import uuid
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.chatbots.analytics import MESSAGE, SESSION_COMPLETED, SESSION_STARTED, record_events
+from apps.flows import artifacts
+
+from ..broadcast import broadcast_step
+from ..buffer import get_write_buffer
+from ..models import ChatSession, ChatMessage, ExecutionLog, ScheduledTimer, UserInput
+from ..state import get_state_store
+from .exceptions import EngineError, InvalidUserEvent
+from .handlers import BLOCKING_NODE_TYPES, NODE_HANDLERS, consume_input, input_type_for
+
+
+# Proteção contra ciclos entre nós que não aguardam o usuário
+MAX_NODES_PER_STEP = 100
+
+FINISHED_STATUSES = ('completed', 'abandoned', 'error')
+
+
+class StepResult:
+    """
+    Lote de mensagens emitidas em um passo da sessão
+    """
+    __slots__ = ('session', 'messages', 'error')
+
+    def __init__(self, session, messages, error=None):
+        self.session = session
+        self.messages = messages
+        self.error = error
+
+    @property
+    def awaiting_input(self):
+        return self.session.status == 'active' and self.session.current_node_id is not None
+
+    def to_dict(self):
+        return {
+            'session_id': str(self.session.id),
+            'status': self.session.status,
+            'current_node_id': self.session.current_node_id,
+            'variables': self.session.variables,
+            'messages': self.messages,
+            'error': self.error,
+        }
+
+
+class FlowEngine:
+    """
+    Avança uma sessão pelos nós do fluxo até precisar de uma resposta do usuário
+    """
+
+    def __init__(self, session, buffered=True):
+        self.session = session
+        self.buffered = buffered
+        # O estado quente (se houver) prevalece sobre as colunas da ChatSession
+        self.state_store = get_state_store()
+        self.state = self.state_store.load(session) if self.state_store else None
+        self.compiled = self._load_compiled(session)
+        self.started = session.current_node_id is None and not session.message_count
+        self.variables = dict(session.variables or {})
+        self.messages = []
+        self._chat_messages = []
+        self._logs = []
+        self._inputs = []
+        self._timers = []
+
+    @staticmethod
+    def _load_compiled(session):
+        """Artefato fixado na sessão ou, na falta dele, o rascunho compilado"""
+        if session.artifact_id:
+            compiled = artifacts.load_artifact(session.artifact_id)
+            if compiled is not None:
+                return compiled
+        return session.flow.compile()
+
+    def step(self, user_event=None):
+        """
+        Consome o evento do usuário (se houver) e executa todos os nós
+        consecutivos que não bloqueiam, retornando o lote de mensagens do bot.
+        """
+        session = self.session
+        if session.status in FINISHED_STATUSES:
+            raise EngineError('Sessão já foi finalizada.')
+        if session.status == 'waiting':
+            # Pausada por um delay: só o timer retoma a sessão
+            return StepResult(session, [])
+
+        error = None
+        try:
+            node_id = self._resume(user_event)
+            self._run(node_id)
+        except InvalidUserEvent as exc:
+            self._emit_system(session.current_node_id, str(exc))
+            error = str(exc)
+        except EngineError as exc:
+            session.status = 'error'
+            session.end_time = timezone.now()
+            error = str(exc)
+
+        self._persist()
+        return StepResult(session, self.messages, error)
+
+    def _resume(self, user_event):
+        """Determina o próximo nó a executar a partir do estado da sessão"""
+        compiled = self.compiled
+        current_id = self.session.current_node_id
+
+        if current_id is None:
+            if compiled.start_node is None:
+                raise EngineError('Nenhum nó de início encontrado')
+            return compiled.start_node['id']
+
+        node = compiled.get_node(current_id)
+        if node is None:
+            raise EngineError(f'Nó atual {current_id} não encontrado')
+
+        if node.get('type') not in BLOCKING_NODE_TYPES:
+            return compiled.next_node_id(current_id)
+
+        if user_event is None:
+            # Nada a consumir: o nó continua aguardando a resposta
+            return None
+
+        value = user_event.get('value') if isinstance(user_event, dict) else user_event
+        try:
+            input_type, processed, handle = consume_input(node, value)
+        except InvalidUserEvent as exc:
+            self._record_input(node, value, value, input_type_for(node), errors=[str(exc)])
+            raise
+
+        self._record_input(node, value, processed, input_type)
+        variable_name = node.get('data', {}).get('variableName')
+        if variable_name:
+            self.variables[variable_name] = processed
+
+        next_id = compiled.next_node_id(current_id, handle)
+        if next_id is None and handle is not None:
+            next_id = compiled.next_node_id(current_id)
+        if next_id is None:
+            self._finish(current_id)
+        return next_id
+
+    def _run(self, node_id):
+        compiled = self.compiled
+        executed = 0
+
+        while node_id is not None:
+            executed += 1
+            if executed > MAX_NODES_PER_STEP:
+                raise EngineError('Limite de nós por passo excedido (possível ciclo no fluxo)')
+
+            node = compiled.get_node(node_id)
+            if node is None:
+                raise EngineError(f'Nó {node_id} não encontrado')
+
+            node_type = node.get('type')
+            handler = compiled.dispatch(NODE_HANDLERS, node_id)
+            self.session.current_node_id = node_id
+
+            if handler is None:
+                # Tipos sem execução no servidor são ignorados, seguindo a conexão padrão
+                self._log(node_id, node_type, 'skipped', 0)
+                next_id = compiled.next_node_id(node_id)
+                if next_id is None:
+                    self._finish(node_id)
+                node_id = next_id
+                continue
+
+            started = time.perf_counter()
+            try:
+                result = handler(self, node)
+            except EngineError as exc:
+                self._log(node_id, node_type, 'failed', _elapsed_ms(started), error=str(exc))
+                raise
+            self._log(node_id, node_type, 'completed', _elapsed_ms(started), output=result.output)
+
+            if result.message:
+                self._emit(result.message)
+
+            if result.wait_until is not None:
+                self.session.status = 'waiting'
+                self._timers.append(ScheduledTimer(
+                    session=self.session,
+                    node_id=node_id,
+                    due_at=result.wait_until,
+                ))
+                return
+            if result.blocking:
+                return
+            if result.finished:
+                self._finish(node_id)
+                return
+
+            next_id = result.next_node_id or compiled.next_node_id(node_id, result.handle)
+            if next_id is None:
+                self._finish(node_id)
+            node_id = next_id
+
+    def _finish(self, node_id):
+        self.session.current_node_id = node_id
+        self.session.status = 'completed'
+        self.session.end_time = timezone.now()
+
+    def _emit(self, message, message_type='bot'):
+        chat_message = ChatMessage(
+            id=uuid.uuid4(),
+            session=self.session,
+            owner_id=self.session.owner_id,
+            node_id=message['node_id'],
+            message_type=message_type,
+            content=message['content'],
+            content_type=message['content_type'],
+        )
+        self._chat_messages.append(chat_message)
+        if message_type != 'user':
+            self.messages.append({'id': str(chat_message.id), 'message_type': message_type, **message})
+        return chat_message
+
+    def _emit_system(self, node_id, text):
+        self._emit({
+            'node_id': node_id,
+            'content_type': 'system',
+            'content': {'type': 'error', 'message': text},
+        }, message_type='system')
+
+    def _record_input(self, node, raw_value, processed, input_type, errors=None):
+        chat_message = self._emit({
+            'node_id': node['id'],
+            'content_type': 'choice' if input_type == 'choice' else 'text',
+            'content': {'type': 'user-input', 'value': raw_value},
+        }, message_type='user')
+        self._inputs.append(UserInput(
+            id=uuid.uuid4(),
+            session=self.session,
+            owner_id=self.session.owner_id,
+            message=chat_message,
+            input_type=input_type,
+            raw_value='' if raw_value is None else str(raw_value),
+            processed_value=processed,
+            variable_name=node.get('data', {}).get('variableName'),
+            is_valid=not errors,
+            validation_errors=errors or [],
+        ))
+
+    def _log(self, node_id, node_type, status, execution_time, output=None, error=''):
+        self._logs.append(ExecutionLog(
+            id=uuid.uuid4(),
+            session=self.session,
+            owner_id=self.session.owner_id,
+            node_id=node_id,
+            component_type=node_type or '',
+            status=status,
+            output_data=output or {},
+            error_message=error,
+            execution_time=execution_time,
+            completed_at=timezone.now() if status != 'started' else None,
+        ))
+
+    def _persist(self):
+        session = self.session
+        session.variables = self.variables
+        session.message_count += len(self._chat_messages)
+        events = self._analytics_events()
+        records = self._chat_messages + self._logs + self._inputs
+        write_buffer = get_write_buffer() if self.buffered else None
+
+        with transaction.atomic():
+            if self.state_store is None:
+                session.save()
+            else:
+                self.state_store.save(session, self.state)
+            # Os timers precisam existir junto com o estado 'waiting', fora do buffer
+            ScheduledTimer.objects.bulk_create(self._timers)
+            if write_buffer is None:
+                ChatMessage.objects.bulk_create(self._chat_messages)
+                ExecutionLog.objects.bulk_create(self._logs)
+                UserInput.objects.bulk_create(self._inputs)
+
+        if write_buffer is not None and records:
+            write_buffer.add(records)
+        record_events(events)
+
+        self._chat_messages, self._logs, self._inputs, self._timers = [], [], [], []
+
+    def _analytics_events(self):
+        """Eventos do passo para a agregação incremental de analytics"""
+        session = self.session
+        chatbot_id, user_id = session.chatbot_id, session.user_id
+        events = []
+        if self.started:
+            events.append((chatbot_id, SESSION_STARTED, user_id, 1, session.start_time))
+        if self._chat_messages:
+            events.append((chatbot_id, MESSAGE, user_id, len(self._chat_messages), None))
+        if session.status == 'completed':
+            events.append((chatbot_id, SESSION_COMPLETED, user_id, 1, None))
+        return events
+
+
+def _elapsed_ms(started):
+    return (time.perf_counter() - started) * 1000
+
+
+def _lock_session(session):
+    """
+    Recarrega a sessão travando a linha até o fim da transação.
+
+    Passos da mesma sessão (REST, WebSocket e timers) ficam serializados:
+    carregar o estado, executar e gravar acontecem sem outro passo no meio.
+    """
+    return ChatSession.objects.select_for_update(of=('self',)).select_related('flow').get(pk=session.pk)
+
+
+def step(session, user_event=None, buffered=True):
+    """
+    Executa um passo da sessão e retorna o lote de mensagens do bot.
+
+    Com buffered=False as mensagens e logs são gravados antes do retorno,
+    para quem precisa ler o que acabou de ser escrito.
+    """
+    with transaction.atomic():
+        result = FlowEngine(_lock_session(session), buffered=buffered).step(user_event)
+    # Depois do commit: quem recebe o passo pode ler a sessão atualizada
+    broadcast_step(result, user_event)
+    return result
+
+
+def resume_timer(session, node_id, buffered=True):
+    """
+    Retoma a sessão pausada no nó `delay` quando o timer vence.
+
+    Retorna None se a sessão não está mais aguardando esse nó (finalizada,
+    retomada por outro worker ou timer obsoleto).
+    """
+    with transaction.atomic():
+        session = _lock_session(session)
+        engine = FlowEngine(session, buffered=buffered)
+        if session.status != 'waiting' or session.current_node_id != node_id:
+            return None
+        session.status = 'active'
+        result = engine.step()
+    broadcast_step(result)
+    return result
+
+
+def start_session(chatbot, flow, user_id, **fields):
+    """
+    Cria uma sessão para o fluxo e executa o primeiro passo.
+
+    A sessão fica presa ao artefato publicado vigente, então republicações e
+    rascunhos salvos depois não mudam o fluxo de uma conversa em andamento.
+    """
+    artifact_id, _ = artifacts.compiled_for_chatbot(chatbot, flow)
+    session = ChatSession.objects.create(
+        chatbot=chatbot,
+        flow=flow,
+        artifact_id=artifact_id,
+        user_id=user_id,
+        status='active',
+        current_node_id=None,
+        **fields
+    )
+    return step(session)
@@ -0,0 +1,72 @@
+"""
+Interpolação de variáveis {{variavel}} nos textos dos nós
+"""
+from functools import lru_cache
+import re
+
+
+VARIABLE_PATTERN = re.compile(r'\{\{(\w+)\}\}')
+
+
+# Quantidade de textos distintos pré-processados mantidos em memória por processo
+TEMPLATE_CACHE_SIZE = 4096
+
+
+class Template:
+    """
+    Texto pré-processado em segmentos literais e nomes de variáveis.
+
+    `literals` tem sempre um item a mais que `names`: a renderização intercala
+    os dois sem regex nem testes de posição.
+    """
+    __slots__ = ('source', 'literals', 'names')
+
+    def __init__(self, source):
+        self.source = str(source)
+        parts = VARIABLE_PATTERN.split(self.source)
+        self.literals = tuple(parts[0::2])
+        self.names = tuple(parts[1::2])
+
+    def __repr__(self):
+        return f"<Template {self.source!r}>"
+
+    @property
+    def variables(self):
+        """Nomes das variáveis referenciadas, na ordem em que aparecem"""
+        return self.names
+
+    @property
+    def is_static(self):
+        return not self.names
+
+    def render(self, variables):
+        names = self.names
+        if not names:
+            return self.source
+
+        literals = self.literals
+        output = [literals[0]]
+        append = output.append
+        for index, name in enumerate(names, 1):
+            value = variables.get(name)
+            append('{{%s}}' % name if value is None or value == '' else str(value))
+            append(literals[index])
+        return ''.join(output)
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def parse(text):
+    """Pré-processa um texto com marcadores {{variavel}} (imutável, compartilhado entre fluxos)"""
+    return Template(text)
+
+
+def choice_field(index):
+    """Chave do rótulo da opção `index` de um nó `choice` entre os templates do fluxo"""
+    return f'choices.{index}.label'
+
+
+def render(text, variables):
+    """Substitui {{variavel}} pelo valor da sessão, mantendo o marcador se ausente"""
+    if not text:
+        return ''
+    return parse(str(text)).render(variables)
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from apps.executions.retention import apply_retention
+
+
+class Command(BaseCommand):
+    help = 'Remove as sessões expiradas pela retenção de cada chatbot e mantém as partições das tabelas de execução'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, help='Linhas apagadas por lote')
+        parser.add_argument('--skip-partitions', action='store_true', help='Não cria nem remove partições')
+
+    def handle(self, *args, **options):
+        counts, dropped = apply_retention(
+            chunk_size=options['chunk_size'],
+            partitions=not options['skip_partitions'],
+        )
+        for label, deleted in sorted(counts.items()):
+            self.stdout.write(f'{label}: {deleted} linhas removidas')
+        for table, names in sorted(dropped.items()):
+            self.stdout.write(f'{table}: {len(names)} partições removidas')
+        self.stdout.write(self.style.SUCCESS('Retenção aplicada.'))
@@ -0,0 +1,106 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.executions.engine import conditions
+
+
+CASES = [
+    (
+        'Comparação simples',
+        {'variable': 'plano', 'operator': 'equals', 'value': 'premium'},
+        {},
+    ),
+    (
+        'Grupo AND numérico',
+        {
+            'logic': 'and',
+            'conditions': [
+                {'variable': 'idade', 'operator': '>=', 'value': '18'},
+                {'variable': 'pontos', 'operator': 'greater', 'value': 100},
+                {'variable': 'plano', 'operator': '!=', 'value': 'free'},
+            ],
+        },
+        {'idade': 'number', 'pontos': 'number'},
+    ),
+    (
+        'Grupo OR com data e booleano',
+        {
+            'logic': 'or',
+            'conditions': [
+                {'variable': 'vencimento', 'operator': '<', 'value': '2024-01-01'},
+                {'variable': 'ativo', 'operator': '==', 'value': 'false'},
+                {'variable': 'tags', 'operator': 'contains', 'value': 'vip'},
+            ],
+        },
+        {'vencimento': 'date', 'ativo': 'boolean', 'tags': 'array'},
+    ),
+]
+
+VARIABLES = {
+    'plano': 'premium',
+    'idade': 32,
+    'pontos': '250',
+    'vencimento': '2024-06-30',
+    'ativo': True,
+    'tags': ['novo', 'vip'],
+}
+
+
+def _to_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+def _compare(left, operator, right):
+    """Comparação feita a cada avaliação, como antes da compilação das condições"""
+    if operator == '==':
+        return left == right or str(left) == str(right)
+    if operator == '!=':
+        return not (left == right or str(left) == str(right))
+    if operator in conditions.ORDERING:
+        return conditions.ORDERING[operator](_to_number(left), _to_number(right))
+    if operator == 'contains':
+        return str(right) in str(left)
+    return False
+
+
+def _interpret(data, variables):
+    """Caminho sem compilação: normaliza o JSON do nó e compara a cada avaliação"""
+    use_or, clauses = conditions.prepare(data)
+    results = (_compare(variables.get(variable), operator, value) for variable, operator, value in clauses)
+    return any(results) if use_or else all(results)
+
+
+class Command(BaseCommand):
+    help = 'Compara o tempo por avaliação das condições interpretadas a partir do JSON e compiladas em closures'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100000)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        for name, data, types in CASES:
+            started = time.perf_counter()
+            for _ in range(iterations):
+                _interpret(data, VARIABLES)
+            interpreted = time.perf_counter() - started
+
+            started = time.perf_counter()
+            predicate = conditions.compile_condition(data, types)
+            compile_time = time.perf_counter() - started
+
+            started = time.perf_counter()
+            for _ in range(iterations):
+                predicate(VARIABLES)
+            compiled = time.perf_counter() - started
+
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(f'  interpretado: {interpreted / iterations * 1e6:.3f} µs/avaliação')
+            self.stdout.write(
+                f'  compilado:    {compiled / iterations * 1e6:.3f} µs/avaliação '
+                f'(compilação {compile_time * 1e6:.1f} µs, resultado {predicate(VARIABLES)})'
+            )
+            self.stdout.write(f'  ganho:        {interpreted / compiled:.1f}x')
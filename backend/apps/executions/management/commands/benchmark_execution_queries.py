@@ -0,0 +1,133 @@
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.chatbots.models import Chatbot
+from apps.executions.models import ChatSession, ChatMessage, ExecutionLog, UserInput, WebhookEvent
+from apps.flows.models import Flow
+
+
+class Command(BaseCommand):
+    help = (
+        'Popula um conjunto de dados temporário e compara o plano (EXPLAIN) e o tempo das '
+        'consultas por usuário no formato antigo (join até chatbot.owner) e no novo (owner desnormalizado)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--owners', type=int, default=20)
+        parser.add_argument('--sessions', type=int, default=200, help='Sessões por dono')
+        parser.add_argument('--messages', type=int, default=20, help='Mensagens por sessão')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--keep', action='store_true', help='Mantém os dados gerados')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            owner = self._seed(options['owners'], options['sessions'], options['messages'])
+            session = ChatSession.objects.filter(owner=owner).first()
+
+            cases = [
+                (
+                    'Sessões do usuário',
+                    ChatSession.objects.filter(chatbot__owner=owner).order_by('-start_time'),
+                    ChatSession.objects.filter(owner=owner).order_by('-start_time'),
+                ),
+                (
+                    'Mensagens do usuário',
+                    ChatMessage.objects.filter(session__chatbot__owner=owner).order_by('-sent_at'),
+                    ChatMessage.objects.filter(owner=owner).order_by('-sent_at'),
+                ),
+                (
+                    'Mensagens de uma sessão',
+                    ChatMessage.objects.filter(session_id=session.pk, session__chatbot__owner=owner).order_by('sent_at'),
+                    ChatMessage.objects.filter(session_id=session.pk, owner=owner).order_by('sent_at'),
+                ),
+                (
+                    'Logs do usuário',
+                    ExecutionLog.objects.filter(session__chatbot__owner=owner).order_by('-started_at'),
+                    ExecutionLog.objects.filter(owner=owner).order_by('-started_at'),
+                ),
+                (
+                    'Entradas do usuário',
+                    UserInput.objects.filter(session__chatbot__owner=owner).order_by('-collected_at'),
+                    UserInput.objects.filter(owner=owner).order_by('-collected_at'),
+                ),
+                (
+                    'Webhooks do usuário',
+                    WebhookEvent.objects.filter(session__chatbot__owner=owner).order_by('-created_at'),
+                    WebhookEvent.objects.filter(owner=owner).order_by('-created_at'),
+                ),
+            ]
+            for title, before, after in cases:
+                self._compare(title, before, after, options['repeat'])
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+    def _compare(self, title, before, after, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        for label, queryset in (('antes', before), ('depois', after)):
+            page = queryset[:20]
+            started = time.perf_counter()
+            for _ in range(repeat):
+                list(page)
+            elapsed = (time.perf_counter() - started) * 1000 / repeat
+            self.stdout.write(f'  [{label}] {elapsed:.2f} ms por página')
+            for line in page.explain().splitlines():
+                self.stdout.write(f'    {line}')
+
+    def _seed(self, owners, sessions_per_owner, messages_per_session):
+        self.stdout.write('Gerando dados...')
+        suffix = uuid.uuid4().hex[:8]
+        first_owner = None
+
+        for index in range(owners):
+            owner = User.objects.create(username=f'benchmark-{suffix}-{index}')
+            first_owner = first_owner or owner
+            chatbot = Chatbot.objects.create(name=f'Benchmark {index}', owner=owner)
+            flow = Flow.objects.create(chatbot=chatbot, name='Benchmark', is_main_flow=True, created_by=owner)
+
+            sessions = ChatSession.objects.bulk_create([
+                ChatSession(
+                    chatbot=chatbot,
+                    flow=flow,
+                    owner=owner,
+                    user_id=f'user-{n}',
+                    status=('active', 'completed', 'abandoned')[n % 3],
+                )
+                for n in range(sessions_per_owner)
+            ])
+
+            messages, logs, inputs, webhooks = [], [], [], []
+            for session in sessions:
+                for n in range(messages_per_session):
+                    message = ChatMessage(
+                        id=uuid.uuid4(),
+                        session=session,
+                        owner=owner,
+                        message_type='user' if n % 2 else 'bot',
+                        content={'type': 'text', 'message': f'Mensagem {n}'},
+                    )
+                    messages.append(message)
+                    logs.append(ExecutionLog(
+                        session=session, owner=owner, node_id=f'node-{n}',
+                        component_type='message', status='completed',
+                    ))
+                    if n % 2:
+                        inputs.append(UserInput(
+                            session=session, owner=owner, message=message,
+                            input_type='text', raw_value='valor', processed_value='valor',
+                        ))
+                webhooks.append(WebhookEvent(
+                    session=session, owner=owner, event_type='session.completed',
+                    webhook_url='https://example.com/hook', payload={},
+                ))
+
+            ChatMessage.objects.bulk_create(messages, batch_size=1000)
+            ExecutionLog.objects.bulk_create(logs, batch_size=1000)
+            UserInput.objects.bulk_create(inputs, batch_size=1000)
+            WebhookEvent.objects.bulk_create(webhooks, batch_size=1000)
+
+        return first_owner
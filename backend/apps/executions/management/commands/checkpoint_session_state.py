@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from apps.executions.state import get_state_store
+
+
+class Command(BaseCommand):
+    help = 'Grava na ChatSession o estado quente das sessões inativas e o libera do backend'
+
+    def handle(self, *args, **options):
+        state_store = get_state_store()
+        if state_store is None:
+            self.stdout.write('Estado quente das sessões desabilitado.')
+            return
+
+        count = state_store.checkpoint_idle()
+        self.stdout.write(self.style.SUCCESS(f'{count} sessões gravadas e liberadas.'))
@@ -0,0 +1,30 @@
+import asyncio
+import signal
+
+from django.core.management.base import BaseCommand
+
+from apps.executions.webhooks import WebhookDeliveryWorker
+
+
+class Command(BaseCommand):
+    help = 'Worker que envia os eventos de webhook pendentes, com novas tentativas e backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Envia os eventos vencidos e encerra')
+        parser.add_argument('--concurrency', type=int, help='Requisições simultâneas')
+        parser.add_argument('--batch-size', type=int, help='Eventos reservados por ciclo')
+
+    def handle(self, *args, **options):
+        worker = WebhookDeliveryWorker.from_settings(
+            concurrency=options['concurrency'],
+            batch_size=options['batch_size'],
+        )
+        processed = asyncio.run(self._run(worker, options['once']))
+        self.stdout.write(self.style.SUCCESS(f'{processed} eventos de webhook processados.'))
+
+    async def _run(self, worker, once):
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            # Termina o lote em andamento antes de sair
+            loop.add_signal_handler(sig, worker.stop)
+        return await worker.run(once=once)
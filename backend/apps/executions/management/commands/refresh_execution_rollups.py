@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.executions.rollups import refresh_daily_rollups
+
+
+class Command(BaseCommand):
+    help = 'Atualiza os agregados diários de execução com as sessões alteradas desde a última execução'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recalcula todos os dias, ignorando a marca')
+
+    def handle(self, *args, **options):
+        count = refresh_daily_rollups(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f'{count} agregados diários atualizados.'))
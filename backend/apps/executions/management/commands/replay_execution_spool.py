@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from apps.executions.buffer import get_buffer_settings, replay_spool
+
+
+class Command(BaseCommand):
+    help = 'Reinsere mensagens, logs e entradas gravados no spool do buffer de execução'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help='Arquivo de spool (padrão: EXECUTION_WRITE_BUFFER["SPOOL_PATH"])')
+
+    def handle(self, *args, **options):
+        config = get_buffer_settings()
+        path = options['path'] or config['SPOOL_PATH']
+        if not path:
+            self.stderr.write('Nenhum arquivo de spool configurado.')
+            return
+
+        total = replay_spool(path, batch_size=config['BATCH_SIZE'])
+        self.stdout.write(self.style.SUCCESS(f'{total} registros reinseridos a partir de {path}.'))
@@ -0,0 +1,25 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from apps.executions.timers import TimerRunner
+
+
+class Command(BaseCommand):
+    help = 'Worker que retoma as sessões pausadas por nós delay quando seus timers vencem'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Dispara os timers vencidos e encerra')
+        parser.add_argument('--workers', type=int, help='Sessões retomadas em paralelo')
+        parser.add_argument('--batch-size', type=int, help='Timers reservados por carga')
+
+    def handle(self, *args, **options):
+        runner = TimerRunner.from_settings(
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+        )
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            # Termina os disparos em andamento antes de sair
+            signal.signal(sig, lambda *_: runner.stop())
+        fired = runner.run(once=options['once'])
+        self.stdout.write(self.style.SUCCESS(f'{fired} timers disparados.'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from apps.executions.abandonment import sweep_abandoned_sessions
+
+
+class Command(BaseCommand):
+    help = 'Marca como abandonadas as sessões sem atividade além do tempo limite de cada chatbot'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, help='Sessões atualizadas por lote')
+        parser.add_argument('--minutes', type=int, help='Tempo limite dos chatbots sem política própria')
+
+    def handle(self, *args, **options):
+        counts = sweep_abandoned_sessions(
+            chunk_size=options['chunk_size'],
+            default_minutes=options['minutes'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{counts['sessions']} sessões e {counts['flow_executions']} execuções marcadas como abandonadas."
+        ))
@@ -0,0 +1,49 @@
+"""
+Autenticação JWT dos WebSockets
+"""
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+
+# Subprotocolo que carrega o token: new WebSocket(url, ['bearer', token])
+BEARER_SUBPROTOCOL = 'bearer'
+
+
+def _token_from_scope(scope):
+    """Token de acesso do subprotocolo 'bearer' ou do parâmetro ?token="""
+    subprotocols = scope.get('subprotocols') or []
+    if len(subprotocols) >= 2 and subprotocols[0] == BEARER_SUBPROTOCOL:
+        return subprotocols[1], BEARER_SUBPROTOCOL
+    tokens = parse_qs(scope.get('query_string', b'').decode()).get('token')
+    return (tokens[0], None) if tokens else (None, None)
+
+
+@database_sync_to_async
+def _user_for_token(token):
+    authentication = JWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(token))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Autentica o socket pelo mesmo access token da API.
+
+    Fica dentro do AuthMiddlewareStack: um token válido substitui o usuário
+    da sessão do Django; sem token (ou com token inválido) ele é mantido.
+    """
+
+    async def __call__(self, scope, receive, send):
+        token, subprotocol = _token_from_scope(scope)
+        if token:
+            user = await _user_for_token(token)
+            if user is not None:
+                scope = dict(scope, user=user, auth_subprotocol=subprotocol)
+        return await super().__call__(scope, receive, send)
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbots', '0002_incremental_analytics'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('executions', '0002_buffered_event_timestamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('position', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Marca de Agregação',
+                'verbose_name_plural': 'Marcas de Agregação',
+            },
+        ),
+        migrations.CreateModel(
+            name='ExecutionDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('sessions_started', models.PositiveIntegerField(default=0)),
+                ('sessions_completed', models.PositiveIntegerField(default=0)),
+                ('sessions_abandoned', models.PositiveIntegerField(default=0)),
+                ('sessions_error', models.PositiveIntegerField(default=0)),
+                ('message_count', models.PositiveIntegerField(default=0)),
+                ('input_types', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('chatbot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='chatbots.chatbot')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Agregado Diário de Execuções',
+                'verbose_name_plural': 'Agregados Diários de Execuções',
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['owner', 'day'], name='executions__owner_i_b8684f_idx')],
+                'unique_together': {('chatbot', 'day')},
+            },
+        ),
+    ]
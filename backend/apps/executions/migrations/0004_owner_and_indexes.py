@@ -0,0 +1,81 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('executions', '0003_execution_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='owner',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='owner',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='executionlog',
+            name='owner',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='userinput',
+            name='owner',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='webhookevent',
+            name='owner',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['session', 'sent_at'], name='executions__session_718c99_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['owner', '-sent_at'], name='executions__owner_i_69da4e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatsession',
+            index=models.Index(fields=['owner', '-start_time'], name='executions__owner_i_ba185e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatsession',
+            index=models.Index(fields=['chatbot', 'status', 'start_time'], name='executions__chatbot_d0d811_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='executionlog',
+            index=models.Index(fields=['session', 'started_at'], name='executions__session_5274b3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='executionlog',
+            index=models.Index(fields=['owner', '-started_at'], name='executions__owner_i_6c3162_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userinput',
+            index=models.Index(fields=['session', 'collected_at'], name='executions__session_c19ab5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userinput',
+            index=models.Index(fields=['owner', '-collected_at'], name='executions__owner_i_68b32d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='webhookevent',
+            index=models.Index(fields=['status', 'next_retry'], name='executions__status_e40640_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='webhookevent',
+            index=models.Index(fields=['owner', '-created_at'], name='executions__owner_i_f7121c_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:27
+
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_owner(apps, schema_editor):
+    ChatSession = apps.get_model('executions', 'ChatSession')
+    Chatbot = apps.get_model('chatbots', 'Chatbot')
+
+    ChatSession.objects.filter(owner__isnull=True).update(
+        owner=Subquery(Chatbot.objects.filter(pk=OuterRef('chatbot_id')).values('owner_id')[:1])
+    )
+
+    sessions = ChatSession.objects.filter(pk=OuterRef('session_id')).values('owner_id')[:1]
+    for model_name in ('ChatMessage', 'ExecutionLog', 'WebhookEvent', 'UserInput'):
+        model = apps.get_model('executions', model_name)
+        model.objects.filter(owner__isnull=True).update(owner=Subquery(sessions))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbots', '0001_initial'),
+        ('executions', '0004_owner_and_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_owner, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flows', '0002_publishedflowartifact'),
+        ('executions', '0005_backfill_owner'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatsession',
+            name='artifact',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='chat_sessions', to='flows.publishedflowartifact'),
+        ),
+    ]
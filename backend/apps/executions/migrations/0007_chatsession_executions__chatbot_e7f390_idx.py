@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('executions', '0006_chatsession_artifact'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatsession',
+            index=models.Index(fields=['chatbot', 'last_activity'], name='executions__chatbot_e7f390_idx'),
+        ),
+    ]
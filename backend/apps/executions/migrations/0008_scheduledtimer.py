@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('executions', '0007_chatsession_executions__chatbot_e7f390_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduledTimer',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('node_id', models.CharField(max_length=255)),
+                ('due_at', models.DateTimeField()),
+                ('claimed_until', models.DateTimeField(blank=True, null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timers', to='executions.chatsession')),
+            ],
+            options={
+                'verbose_name': 'Timer Agendado',
+                'verbose_name_plural': 'Timers Agendados',
+                'ordering': ['due_at'],
+                'indexes': [models.Index(fields=['due_at'], name='executions__due_at_3f3897_idx')],
+            },
+        ),
+    ]
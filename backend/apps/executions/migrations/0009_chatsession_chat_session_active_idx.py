@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('executions', '0008_scheduledtimer'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatsession',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['chatbot', 'last_activity'], name='chat_session_active_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:15
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('executions', '0009_chatsession_chat_session_active_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='chatsession',
+            name='chat_session_active_idx',
+        ),
+    ]
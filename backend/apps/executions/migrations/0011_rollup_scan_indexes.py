@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('executions', '0010_remove_chat_session_active_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatsession',
+            index=models.Index(fields=['last_activity'], name='executions__last_ac_bd36ce_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userinput',
+            index=models.Index(fields=['collected_at'], name='executions__collect_c7babe_idx'),
+        ),
+    ]
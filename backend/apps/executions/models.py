@@ -1,6 +1,7 @@
 """
 Modelos para execução em tempo real dos chatbots
 """
+from django.contrib.auth.models import User
 from django.db import models
 from django.utils import timezone
 import uuid
@@ -13,6 +14,18 @@ class ChatSession(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     chatbot = models.ForeignKey('chatbots.Chatbot', on_delete=models.CASCADE, related_name='chat_sessions')
     flow = models.ForeignKey('flows.Flow', on_delete=models.CASCADE, related_name='chat_sessions')
+    # Artefato publicado que a sessão executa; sem ele o rascunho do fluxo é usado
+    artifact = models.ForeignKey(
+        'flows.PublishedFlowArtifact',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='chat_sessions',
+    )
+    # Dono do chatbot, desnormalizado para os filtros por usuário evitarem joins
+    # (sem índice próprio: os índices compostos começam por owner)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, null=True, editable=False, db_index=False, related_name='+')
     
     # Identificação do usuário
     user_id = models.CharField(max_length=255)  # ID único da sessão
@@ -51,10 +64,23 @@ class ChatSession(models.Model):
         verbose_name = "Sessão de Chat"
         verbose_name_plural = "Sessões de Chat"
         ordering = ['-start_time']
+        indexes = [
+            models.Index(fields=['owner', '-start_time']),
+            models.Index(fields=['chatbot', 'status', 'start_time']),
+            # Sessões ociosas por chatbot: abandono (ativas e aguardando) e retenção
+            models.Index(fields=['chatbot', 'last_activity']),
+            # Varredura por intervalo de last_activity feita pelos rollups diários
+            models.Index(fields=['last_activity']),
+        ]
     
     def __str__(self):
         return f"{self.chatbot.name} - {self.user_id}"
     
+    def save(self, *args, **kwargs):
+        if self.owner_id is None and self.chatbot_id is not None:
+            self.owner_id = self.chatbot.owner_id
+        super().save(*args, **kwargs)
+    
     def duration(self):
         """Duração da sessão em segundos"""
         if self.end_time:
@@ -68,6 +94,8 @@ class ChatMessage(models.Model):
     """
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     session = models.ForeignKey(ChatSession, on_delete=models.CASCADE, related_name='messages')
+    # Desnormalizado de session.chatbot.owner
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, null=True, editable=False, db_index=False, related_name='+')
     
     # Dados da mensagem
     node_id = models.CharField(max_length=255, null=True)  # Componente que gerou
@@ -100,7 +128,8 @@ class ChatMessage(models.Model):
     is_read = models.BooleanField(default=False)
     
     # Timestamps
-    sent_at = models.DateTimeField(auto_now_add=True)
+    # Horário do evento, preservado quando o insert é feito em lote pelo buffer
+    sent_at = models.DateTimeField(default=timezone.now)
     delivered_at = models.DateTimeField(null=True, blank=True)
     read_at = models.DateTimeField(null=True, blank=True)
     
@@ -108,9 +137,18 @@ class ChatMessage(models.Model):
         verbose_name = "Mensagem do Chat"
         verbose_name_plural = "Mensagens do Chat"
         ordering = ['sent_at']
+        indexes = [
+            models.Index(fields=['session', 'sent_at']),
+            models.Index(fields=['owner', '-sent_at']),
+        ]
     
     def __str__(self):
         return f"{self.message_type}: {self.session.user_id}"
+    
+    def save(self, *args, **kwargs):
+        if self.owner_id is None and self.session_id is not None:
+            self.owner_id = self.session.owner_id
+        super().save(*args, **kwargs)
 
 
 class ExecutionLog(models.Model):
@@ -119,6 +157,8 @@ class ExecutionLog(models.Model):
     """
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     session = models.ForeignKey(ChatSession, on_delete=models.CASCADE, related_name='execution_logs')
+    # Desnormalizado de session.chatbot.owner
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, null=True, editable=False, db_index=False, related_name='+')
     
     # Dados da execução
     node_id = models.CharField(max_length=255)
@@ -144,16 +184,25 @@ class ExecutionLog(models.Model):
     execution_time = models.FloatField(null=True)  # Tempo em ms
     
     # Timestamps
-    started_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(default=timezone.now)
     completed_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         verbose_name = "Log de Execução"
         verbose_name_plural = "Logs de Execução"
         ordering = ['started_at']
+        indexes = [
+            models.Index(fields=['session', 'started_at']),
+            models.Index(fields=['owner', '-started_at']),
+        ]
     
     def __str__(self):
         return f"{self.component_type} - {self.status}"
+    
+    def save(self, *args, **kwargs):
+        if self.owner_id is None and self.session_id is not None:
+            self.owner_id = self.session.owner_id
+        super().save(*args, **kwargs)
 
 
 class WebhookEvent(models.Model):
@@ -162,6 +211,8 @@ class WebhookEvent(models.Model):
     """
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     session = models.ForeignKey(ChatSession, on_delete=models.CASCADE, related_name='webhook_events')
+    # Desnormalizado de session.chatbot.owner
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, null=True, editable=False, db_index=False, related_name='+')
     
     # Dados do webhook
     event_type = models.CharField(max_length=100)
@@ -201,9 +252,45 @@ class WebhookEvent(models.Model):
         verbose_name = "Evento de Webhook"
         verbose_name_plural = "Eventos de Webhook"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_retry']),
+            models.Index(fields=['owner', '-created_at']),
+        ]
     
     def __str__(self):
         return f"{self.event_type} - {self.status}"
+    
+    def save(self, *args, **kwargs):
+        if self.owner_id is None and self.session_id is not None:
+            self.owner_id = self.session.owner_id
+        super().save(*args, **kwargs)
+
+
+class ScheduledTimer(models.Model):
+    """
+    Timer persistido que retoma uma sessão pausada por um nó `delay`
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    session = models.ForeignKey(ChatSession, on_delete=models.CASCADE, related_name='timers')
+    node_id = models.CharField(max_length=255)  # Nó `delay` que pausou a sessão
+    
+    due_at = models.DateTimeField()
+    # Reserva do worker que carregou o timer; vencida, outro worker o assume
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Timer Agendado"
+        verbose_name_plural = "Timers Agendados"
+        ordering = ['due_at']
+        indexes = [
+            models.Index(fields=['due_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.session_id} - {self.node_id} @ {self.due_at}"
 
 
 class UserInput(models.Model):
@@ -212,6 +299,8 @@ class UserInput(models.Model):
     """
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     session = models.ForeignKey(ChatSession, on_delete=models.CASCADE, related_name='user_inputs')
+    # Desnormalizado de session.chatbot.owner
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, null=True, editable=False, db_index=False, related_name='+')
     message = models.ForeignKey(ChatMessage, on_delete=models.CASCADE)
     
     # Dados da entrada
@@ -238,12 +327,73 @@ class UserInput(models.Model):
     validation_errors = models.JSONField(default=list)
     
     # Timestamps
-    collected_at = models.DateTimeField(auto_now_add=True)
+    collected_at = models.DateTimeField(default=timezone.now)
     
     class Meta:
         verbose_name = "Entrada do Usuário"
         verbose_name_plural = "Entradas dos Usuários"
         ordering = ['collected_at']
+        indexes = [
+            models.Index(fields=['session', 'collected_at']),
+            models.Index(fields=['owner', '-collected_at']),
+            # Varredura por intervalo de collected_at feita pelos rollups diários
+            models.Index(fields=['collected_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.input_type}: {self.raw_value}"
+    
+    def save(self, *args, **kwargs):
+        if self.owner_id is None and self.session_id is not None:
+            self.owner_id = self.session.owner_id
+        super().save(*args, **kwargs)
+
+
+class ExecutionDailyRollup(models.Model):
+    """
+    Agregado diário das sessões de um chatbot, usado pelo dashboard de execuções
+    """
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    chatbot = models.ForeignKey('chatbots.Chatbot', on_delete=models.CASCADE, related_name='+')
+    day = models.DateField()  # Dia de início das sessões
+    
+    # Contadores das sessões iniciadas no dia
+    sessions_started = models.PositiveIntegerField(default=0)
+    sessions_completed = models.PositiveIntegerField(default=0)
+    sessions_abandoned = models.PositiveIntegerField(default=0)
+    sessions_error = models.PositiveIntegerField(default=0)
+    message_count = models.PositiveIntegerField(default=0)
+    input_types = models.JSONField(default=dict)  # {input_type: quantidade}
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Agregado Diário de Execuções"
+        verbose_name_plural = "Agregados Diários de Execuções"
+        ordering = ['-day']
+        unique_together = ['chatbot', 'day']
+        indexes = [
+            models.Index(fields=['owner', 'day']),
+        ]
+    
+    def __str__(self):
+        return f"{self.chatbot_id} - {self.day}"
+    
+    @property
+    def sessions_active(self):
+        return self.sessions_started - self.sessions_completed - self.sessions_abandoned - self.sessions_error
+
+
+class RollupWatermark(models.Model):
+    """
+    Posição até a qual um job de agregação já processou as alterações
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    position = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = "Marca de Agregação"
+        verbose_name_plural = "Marcas de Agregação"
     
     def __str__(self):
-        return f"{self.input_type}: {self.raw_value}" 
\ No newline at end of file
+        return f"{self.name}: {self.position}"
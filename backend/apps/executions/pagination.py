@@ -0,0 +1,156 @@
+"""
+Paginação por cursor para os endpoints ordenados por horário
+"""
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from datetime import timedelta
+import uuid
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+# Folga além dos intervalos de flush dos buffers de escrita
+WRITE_LAG_MARGIN = 5.0
+
+
+def write_lag():
+    """
+    Segundos até um registro aparecer no banco com o seu horário original:
+    mensagens, logs e entradas passam pelo buffer write-behind e os logs de
+    integração pelo pipeline em lote.
+    """
+    buffer_interval = getattr(settings, 'EXECUTION_WRITE_BUFFER', {}).get('FLUSH_INTERVAL', 1.0)
+    logs_interval = getattr(settings, 'INTEGRATION_LOGS', {}).get('FLUSH_INTERVAL', 2.0)
+    return max(buffer_interval, logs_interval) + WRITE_LAG_MARGIN
+
+
+class TimestampCursorPagination(CursorPagination):
+    """
+    Paginação keyset sobre (horário, id), sem COUNT(*) nem OFFSET.
+
+    O campo de horário e a direção vêm do order_by do queryset da view, com o
+    id como desempate. Com ?since=<token> retorna, em ordem crescente, apenas
+    os registros posteriores ao token; toda resposta traz o `since` do registro
+    mais recente da página para o próximo polling.
+
+    Os registros chegam ao banco com atraso (buffers de escrita) mas com o
+    horário original, então o polling só entrega os mais antigos que a marca
+    d'água (agora − write_lag) e o token nunca passa dela: um registro gravado
+    depois de emitido o token ainda é entregue no polling seguinte. Registros
+    mais novos que a marca podem aparecer de novo; o cliente deduplica por id.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    since_query_param = 'since'
+    invalid_since_message = 'Parâmetro since inválido.'
+
+    def get_ordering(self, request, queryset, view):
+        order_by = queryset.query.order_by or getattr(view, 'ordering', None) or ('-pk',)
+        field = order_by[0]
+        if self.get_since(request) is not None:
+            return (field.lstrip('-'), 'id')
+        return (field, '-id' if field.startswith('-') else 'id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        since = self.get_since(request)
+        if since is None:
+            self.since_mode = False
+            page = super().paginate_queryset(queryset, request, view)
+        else:
+            page = self.paginate_since(queryset, request, view, since)
+
+        if page is not None:
+            self.since = self.encode_since(page) or request.query_params.get(self.since_query_param)
+        return page
+
+    def get_high_water(self):
+        """Horário até o qual os buffers de escrita já gravaram os registros"""
+        return timezone.now() - timedelta(seconds=write_lag())
+
+    def paginate_since(self, queryset, request, view, since):
+        self.since_mode = True
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        field = self.ordering[0]
+
+        timestamp, pk = since
+        self.high_water = self.get_high_water()
+        queryset = queryset.filter(
+            Q(**{f'{field}__gt': timestamp}) | Q(**{field: timestamp, 'id__gt': pk}),
+            **{f'{field}__lte': self.high_water}
+        ).order_by(*self.ordering)
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        self.has_more = len(results) > self.page_size
+        return self.page
+
+    def get_since(self, request):
+        token = request.query_params.get(self.since_query_param)
+        if not token:
+            return None
+        try:
+            timestamp, pk = b64decode(token.encode('ascii')).decode('ascii').split('|', 1)
+            timestamp = parse_datetime(timestamp)
+            pk = uuid.UUID(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_since_message)
+        if timestamp is None:
+            raise NotFound(self.invalid_since_message)
+        return timestamp, pk
+
+    def encode_since(self, page):
+        """Token do registro mais recente da página, ou None se vazia"""
+        if not page:
+            return None
+        field = self.ordering[0].lstrip('-')
+        latest = max(page, key=lambda item: (getattr(item, field), item.pk.hex))
+        timestamp, pk = getattr(latest, field), latest.pk
+
+        high_water = getattr(self, 'high_water', None) or self.get_high_water()
+        if timestamp > high_water:
+            # Tudo até a marca d'água já está na página; o resto volta no próximo polling
+            timestamp, pk = high_water, uuid.UUID(int=0)
+        token = f'{timestamp.isoformat()}|{pk}'
+        return b64encode(token.encode('ascii')).decode('ascii')
+
+    def get_paginated_response(self, data):
+        if self.since_mode:
+            return Response(OrderedDict([
+                ('since', self.since),
+                ('has_more', self.has_more),
+                ('results', data),
+            ]))
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('since', self.since),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['since'] = {
+            'type': 'string',
+            'nullable': True,
+            'description': 'Token para buscar apenas registros posteriores (?since=)',
+        }
+        return response_schema
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters.append({
+            'name': self.since_query_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Retorna apenas registros posteriores a este token, em ordem crescente',
+            'schema': {'type': 'string'},
+        })
+        return parameters
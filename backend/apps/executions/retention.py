@@ -0,0 +1,296 @@
+"""
+Retenção dos dados de execução
+
+As sessões expiram `Chatbot.retention_days` dias após a última atividade
+(ou EXECUTION_RETENTION['DEFAULT_DAYS']). A remoção é feita em lotes, filhos
+antes das sessões, cada lote em sua própria transação, para não segurar
+locks longos nem montar a cascata inteira de uma vez na memória. As sessões
+do lote ficam travadas até o fim dele, então um passo concorrente espera e
+não grava filhos de uma sessão já apagada; sessões com estado quente (ainda
+em conversa) ficam de fora, conferidas depois de travar o lote.
+
+No PostgreSQL, as tabelas de alto volume que estiverem particionadas por
+RANGE no campo de data (PARTITION_KEYS) ganham partições mensais com
+antecedência, e as partições inteiramente mais antigas que a maior retenção
+configurada são desanexadas e apagadas (ou mantidas como arquivo) sem
+DELETE linha a linha. A retenção é por sessão (last_activity) e não pela data
+das linhas: a partição de uma tabela filha das sessões só sai quando nenhuma
+linha dela pertence a uma sessão que ainda existe.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+import logging
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.chatbots.models import Chatbot
+from apps.integrations import log_pipeline
+from apps.integrations.models import IntegrationLog
+from .buffer import get_write_buffer
+from .models import ChatSession, ChatMessage, ExecutionLog, ScheduledTimer, UserInput, WebhookEvent
+from .state import get_state_store
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # None guarda as sessões para sempre
+    'DEFAULT_DAYS': 90,
+    'CHUNK_SIZE': 1000,
+    # Partições mensais criadas além do mês atual
+    'PARTITIONS_AHEAD': 2,
+    # Mantém as partições expiradas desanexadas em vez de apagá-las
+    'ARCHIVE_PARTITIONS': False,
+}
+
+# Tabelas de alto volume e o campo de data usado como chave de partição
+PARTITION_KEYS = {
+    ChatMessage: 'sent_at',
+    ExecutionLog: 'started_at',
+    UserInput: 'collected_at',
+    WebhookEvent: 'created_at',
+    IntegrationLog: 'timestamp',
+}
+
+# Ordem de remoção dos filhos das sessões (UserInput referencia ChatMessage)
+SESSION_CHILDREN = (ScheduledTimer, UserInput, ChatMessage, ExecutionLog, WebhookEvent)
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'EXECUTION_RETENTION', {})}
+
+
+def _delete_in_chunks(queryset, chunk_size, counts):
+    """Apaga o queryset em lotes de `chunk_size` chaves, somando em `counts`"""
+    model = queryset.model
+    while True:
+        ids = list(queryset.values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return
+        for label, deleted in model.objects.filter(pk__in=ids).delete()[1].items():
+            counts[label] += deleted
+
+
+def purge_expired_sessions(now=None, chunk_size=None, default_days=None):
+    """
+    Remove as sessões expiradas de todos os chatbots, agrupadas por política
+    de retenção. Retorna {modelo: linhas apagadas}.
+    """
+    config = _config()
+    now = now or timezone.now()
+    chunk_size = chunk_size or config['CHUNK_SIZE']
+    if default_days is None:
+        default_days = config['DEFAULT_DAYS']
+
+    # Linhas ainda no buffer deste processo chegam antes das sessões sumirem;
+    # as que restarem no buffer de outro processo são recusadas pela FK e
+    # separadas por ele (ver buffer.rejected_path)
+    write_buffer = get_write_buffer()
+    if write_buffer is not None:
+        write_buffer.flush()
+
+    # Estado quente ocioso vai para o banco; o restante é conferido por lote,
+    # com as sessões travadas (a última atividade no banco está atrasada)
+    state_store = get_state_store()
+    if state_store is not None:
+        state_store.checkpoint_idle()
+
+    counts = defaultdict(int)
+    policies = Chatbot.objects.order_by().values_list('retention_days', flat=True).distinct()
+    for policy in policies:
+        days = policy if policy is not None else default_days
+        if days is None:
+            continue
+
+        if policy is None:
+            sessions = ChatSession.objects.filter(chatbot__retention_days__isnull=True)
+        else:
+            sessions = ChatSession.objects.filter(chatbot__retention_days=policy)
+        sessions = sessions.filter(last_activity__lt=now - timedelta(days=days)).order_by('pk')
+
+        # Cursor por pk: sessões puladas (vivas ou travadas) não voltam na mesma execução
+        last = None
+        while True:
+            queryset = sessions.filter(pk__gt=last) if last is not None else sessions
+            with transaction.atomic():
+                rows = list(
+                    queryset.select_for_update(skip_locked=True, of=('self',))
+                    .values_list('pk', flat=True)[:chunk_size]
+                )
+                if not rows:
+                    break
+                last = rows[-1]
+                live = state_store.live_among(rows) if state_store is not None else set()
+                ids = [pk for pk in rows if str(pk) not in live]
+                for model in SESSION_CHILDREN:
+                    _delete_in_chunks(model.objects.filter(session_id__in=ids), chunk_size, counts)
+                for label, deleted in ChatSession.objects.filter(pk__in=ids).delete()[1].items():
+                    counts[label] += deleted
+    return dict(counts)
+
+
+def max_retention_days(default_days):
+    """Maior retenção em vigor, ou None se algum chatbot guarda tudo"""
+    policies = set(Chatbot.objects.order_by().values_list('retention_days', flat=True).distinct())
+    if None in policies:
+        if default_days is None:
+            return None
+        policies.discard(None)
+        policies.add(default_days)
+    return max(policies, default=default_days)
+
+
+def _month_start(value):
+    value = value.astimezone(dt_timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add_months(value, months):
+    month = value.month - 1 + months
+    return value.replace(year=value.year + month // 12, month=month % 12 + 1)
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y%m}'
+
+
+def partitioned_tables():
+    """{tabela: campo} das tabelas de PARTITION_KEYS particionadas no banco"""
+    if connection.vendor != 'postgresql':
+        return {}
+    tables = {model._meta.db_table: field for model, field in PARTITION_KEYS.items()}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_partitioned_table p '
+            'JOIN pg_class c ON c.oid = p.partrelid '
+            'WHERE c.relname = ANY(%s) AND pg_table_is_visible(c.oid)',
+            [list(tables)],
+        )
+        return {name: tables[name] for (name,) in cursor.fetchall()}
+
+
+def _partitions(cursor, table):
+    """Meses das partições mensais da tabela criadas por `ensure_partitions`"""
+    cursor.execute(
+        'SELECT child.relname FROM pg_inherits i '
+        'JOIN pg_class parent ON parent.oid = i.inhparent '
+        'JOIN pg_class child ON child.oid = i.inhrelid '
+        'WHERE parent.relname = %s AND pg_table_is_visible(parent.oid)',
+        [table],
+    )
+    pattern = re.compile(rf'^{re.escape(table)}_p(\d{{4}})(\d{{2}})$')
+    months = {}
+    for (name,) in cursor.fetchall():
+        match = pattern.match(name)
+        if match:
+            months[name] = datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=dt_timezone.utc)
+    return months
+
+
+def ensure_partitions(table, now, ahead):
+    """Cria as partições mensais que faltam do mês atual até `ahead` meses à frente"""
+    quote = connection.ops.quote_name
+    current = _month_start(now)
+    created = 0
+    with connection.cursor() as cursor:
+        existing = set(_partitions(cursor, table))
+        for offset in range(ahead + 1):
+            start = _add_months(current, offset)
+            name = partition_name(table, start)
+            if name in existing:
+                continue
+            cursor.execute(
+                f'CREATE TABLE {quote(name)} PARTITION OF {quote(table)} FOR VALUES FROM (%s) TO (%s)',
+                [start, _add_months(start, 1)],
+            )
+            created += 1
+    return created
+
+
+def _has_live_sessions(cursor, partition):
+    """Se alguma linha da partição pertence a uma sessão que ainda existe"""
+    quote = connection.ops.quote_name
+    cursor.execute(
+        f'SELECT EXISTS (SELECT 1 FROM {quote(partition)} p '
+        f'JOIN {quote(ChatSession._meta.db_table)} s ON s.id = p.session_id)'
+    )
+    return cursor.fetchone()[0]
+
+
+def drop_expired_partitions(table, cutoff, archive=False, session_rows=False):
+    """
+    Desanexa as partições cujo mês termina antes de `cutoff` e as apaga
+    (ou mantém como tabelas avulsas, com `archive`). Retorna os nomes.
+
+    Com `session_rows`, a tabela é filha das sessões e a partição só sai se
+    nenhuma linha dela pertence a uma sessão ainda não expirada.
+    """
+    quote = connection.ops.quote_name
+    dropped = []
+    with connection.cursor() as cursor:
+        for name, month in sorted(_partitions(cursor, table).items(), key=lambda item: item[1]):
+            if _add_months(month, 1) > cutoff:
+                continue
+            if session_rows and _has_live_sessions(cursor, name):
+                logger.info('Partição %s mantida: ainda tem linhas de sessões ativas', name)
+                continue
+            cursor.execute(f'ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}')
+            if not archive:
+                cursor.execute(f'DROP TABLE {quote(name)}')
+            dropped.append(name)
+    return dropped
+
+
+def maintain_partitions(now=None, default_days=None):
+    """
+    Cria as próximas partições e remove as expiradas das tabelas
+    particionadas. Retorna {tabela: partições removidas}.
+    """
+    config = _config()
+    now = now or timezone.now()
+    if default_days is None:
+        default_days = config['DEFAULT_DAYS']
+
+    tables = partitioned_tables()
+    if not tables:
+        return {}
+
+    session_days = max_retention_days(default_days)
+    logs_hours = getattr(settings, 'INTEGRATION_LOGS', {}).get(
+        'RETENTION_HOURS', log_pipeline.DEFAULTS['RETENTION_HOURS']
+    )
+    result = {}
+    for table in tables:
+        ensure_partitions(table, now, config['PARTITIONS_AHEAD'])
+        session_rows = table != IntegrationLog._meta.db_table
+        if not session_rows:
+            # Os logs antigos já foram resumidos por compact_logs
+            cutoff = now - timedelta(hours=logs_hours) if logs_hours is not None else None
+        else:
+            cutoff = now - timedelta(days=session_days) if session_days is not None else None
+        if cutoff is not None:
+            result[table] = drop_expired_partitions(
+                table, cutoff, archive=config['ARCHIVE_PARTITIONS'], session_rows=session_rows
+            )
+    return result
+
+
+def apply_retention(now=None, chunk_size=None, partitions=True):
+    """
+    Executa a retenção completa: compacta os logs de integração, remove as
+    sessões expiradas e mantém as partições. Retorna (linhas, partições).
+    """
+    now = now or timezone.now()
+    _, compacted = log_pipeline.compact_logs(now=now)
+    counts = purge_expired_sessions(now=now, chunk_size=chunk_size)
+    if compacted:
+        counts[IntegrationLog._meta.label] = counts.get(IntegrationLog._meta.label, 0) + compacted
+
+    dropped = maintain_partitions(now=now) if partitions else {}
+    for table, names in dropped.items():
+        if names:
+            logger.info('Partições removidas de %s: %s', table, ', '.join(names))
+    return counts, dropped
@@ -0,0 +1,113 @@
+"""
+Atualização incremental dos agregados diários de execução
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.chatbots.models import Chatbot
+from .models import ChatSession, UserInput, ExecutionDailyRollup, RollupWatermark
+
+
+WATERMARK_NAME = 'execution_daily_rollup'
+
+# Margem para registros gravados com atraso pelo buffer e pelo estado quente
+SAFETY_LAG = timedelta(seconds=30)
+
+
+def refresh_daily_rollups(full=False, now=None):
+    """
+    Recalcula os agregados dos pares (chatbot, dia) que tiveram sessões ou
+    entradas alteradas desde a última execução. Retorna quantos foram gravados.
+    """
+    upto = (now or timezone.now()) - SAFETY_LAG
+    watermark = RollupWatermark.objects.filter(name=WATERMARK_NAME).first()
+    since = None if full or watermark is None else watermark.position
+
+    count = rebuild_days(_dirty_days(since, upto))
+    RollupWatermark.objects.update_or_create(name=WATERMARK_NAME, defaults={'position': upto})
+    return count
+
+
+def rebuild_days(dirty):
+    """Recalcula os agregados de {dia: chatbots}, um dia por transação"""
+    count = 0
+    for day, chatbot_ids in sorted(dirty.items()):
+        with transaction.atomic():
+            count += _rebuild_day(day, chatbot_ids)
+    return count
+
+
+def _dirty_days(since, upto):
+    """Mapeia dia -> chatbots cujas sessões daquele dia mudaram no intervalo"""
+    sessions = ChatSession.objects.filter(last_activity__lte=upto)
+    inputs = UserInput.objects.filter(collected_at__lte=upto)
+    if since is not None:
+        sessions = sessions.filter(last_activity__gt=since)
+        inputs = inputs.filter(collected_at__gt=since)
+
+    dirty = defaultdict(set)
+    pairs = sessions.annotate(day=TruncDate('start_time')).values_list('day', 'chatbot_id').distinct()
+    for day, chatbot_id in pairs:
+        dirty[day].add(chatbot_id)
+    pairs = inputs.annotate(day=TruncDate('session__start_time')).values_list(
+        'day', 'session__chatbot_id'
+    ).distinct()
+    for day, chatbot_id in pairs:
+        dirty[day].add(chatbot_id)
+    return dirty
+
+
+def _rebuild_day(day, chatbot_ids):
+    """Recalcula por completo os agregados de um dia para os chatbots informados"""
+    sessions = ChatSession.objects.annotate(day=TruncDate('start_time')).filter(
+        day=day, chatbot_id__in=chatbot_ids
+    )
+    totals = {
+        row['chatbot_id']: row
+        for row in sessions.values('chatbot_id').annotate(
+            started=Count('id'),
+            completed=Count('id', filter=Q(status='completed')),
+            abandoned=Count('id', filter=Q(status='abandoned')),
+            error=Count('id', filter=Q(status='error')),
+            messages=Sum('message_count'),
+        )
+    }
+
+    input_types = defaultdict(dict)
+    histogram = UserInput.objects.annotate(day=TruncDate('session__start_time')).filter(
+        day=day, session__chatbot_id__in=chatbot_ids
+    ).values('session__chatbot_id', 'input_type').annotate(count=Count('id'))
+    for row in histogram:
+        input_types[row['session__chatbot_id']][row['input_type']] = row['count']
+
+    owners = dict(Chatbot.objects.filter(id__in=chatbot_ids).values_list('id', 'owner_id'))
+
+    # Chatbots sem sessões restantes no dia (ex.: removidas) perdem o agregado
+    ExecutionDailyRollup.objects.filter(day=day, chatbot_id__in=chatbot_ids).exclude(
+        chatbot_id__in=list(totals)
+    ).delete()
+
+    count = 0
+    for chatbot_id, row in totals.items():
+        if chatbot_id not in owners:
+            continue
+        ExecutionDailyRollup.objects.update_or_create(
+            chatbot_id=chatbot_id,
+            day=day,
+            defaults={
+                'owner_id': owners[chatbot_id],
+                'sessions_started': row['started'],
+                'sessions_completed': row['completed'],
+                'sessions_abandoned': row['abandoned'],
+                'sessions_error': row['error'],
+                'message_count': row['messages'] or 0,
+                'input_types': input_types.get(chatbot_id, {}),
+            },
+        )
+        count += 1
+    return count
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from .consumers import ChatSessionConsumer, ChatSessionObserverConsumer
+
+websocket_urlpatterns = [
+    path('ws/chat/<uuid:session_id>/', ChatSessionConsumer.as_asgi()),
+    path('ws/chat/<uuid:session_id>/observe/', ChatSessionObserverConsumer.as_asgi()),
+]
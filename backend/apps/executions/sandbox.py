@@ -0,0 +1,181 @@
+"""
+Execução isolada dos scripts dos nós `script` (lado do processo worker)
+
+Este módulo roda dentro dos processos do pool de scripts e não depende do
+Django. Cada processo aplica seus limites de memória na inicialização e um
+limite de tempo de CPU por script; o código é validado (sem imports nem
+acesso a atributos `_`) e executado com um conjunto restrito de builtins.
+"""
+import ast
+import builtins
+from collections import OrderedDict
+import json
+import math
+import resource
+import signal
+
+
+MAX_SOURCE_LENGTH = 20000
+MAX_OUTPUT_LINES = 50
+MAX_RESULT_BYTES = 65536
+COMPILED_CACHE_SIZE = 128
+
+
+class ScriptRejected(Exception):
+    """Script recusado pela validação antes de executar"""
+
+
+class CpuLimitExceeded(BaseException):
+    # BaseException: não pode ser capturada por `except Exception` do script
+    pass
+
+
+SAFE_BUILTINS = {
+    name: getattr(builtins, name)
+    for name in (
+        'abs', 'all', 'any', 'bool', 'chr', 'dict', 'divmod', 'enumerate', 'filter',
+        'float', 'int', 'isinstance', 'len', 'list', 'map', 'max', 'min',
+        'ord', 'pow', 'range', 'repr', 'reversed', 'round', 'set', 'sorted', 'str',
+        'sum', 'tuple', 'zip',
+        'Exception', 'ArithmeticError', 'IndexError', 'KeyError', 'TypeError',
+        'ValueError', 'ZeroDivisionError',
+    )
+}
+SAFE_BUILTINS.update({'True': True, 'False': False, 'None': None})
+
+# Módulos puros expostos como nomes globais
+SAFE_MODULES = {'math': math}
+
+# Atributos que dão acesso a frames, código e globais do interpretador; format
+# e format_map resolvem atributos dentro da string, fora do alcance do AST
+BLOCKED_ATTRIBUTES = frozenset({
+    'gi_frame', 'gi_code', 'cr_frame', 'cr_code', 'ag_frame', 'ag_code',
+    'f_globals', 'f_locals', 'f_builtins', 'f_back', 'f_code', 'tb_frame', 'tb_next',
+    'format', 'format_map', 'mro',
+})
+
+
+def validate(source):
+    """Faz o parse do script recusando imports e nomes/atributos com `_` inicial"""
+    if len(source) > MAX_SOURCE_LENGTH:
+        raise ScriptRejected('Script excede o tamanho máximo')
+    try:
+        tree = ast.parse(source, mode='exec')
+    except SyntaxError as exc:
+        raise ScriptRejected(f'Erro de sintaxe na linha {exc.lineno}: {exc.msg}')
+
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            raise ScriptRejected('Imports não são permitidos')
+        if isinstance(node, (ast.Global, ast.Nonlocal)):
+            raise ScriptRejected('global/nonlocal não são permitidos')
+        name = None
+        if isinstance(node, ast.Attribute):
+            name = node.attr
+        elif isinstance(node, ast.Name):
+            name = node.id
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            name = node.name
+        if name is not None and (name.startswith('_') or (isinstance(node, ast.Attribute) and name in BLOCKED_ATTRIBUTES)):
+            raise ScriptRejected(f'Nome não permitido: {name}')
+    return compile(tree, '<script>', 'exec')
+
+
+class ScriptRunner:
+    """
+    Executor mantido vivo no processo worker, com cache dos scripts compilados
+    """
+
+    def __init__(self, memory_limit_mb=None):
+        self._compiled = OrderedDict()
+        if memory_limit_mb:
+            limit = int(memory_limit_mb) * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        signal.signal(signal.SIGXCPU, self._on_cpu_limit)
+
+    @staticmethod
+    def _on_cpu_limit(signum, frame):
+        raise CpuLimitExceeded()
+
+    def _compile(self, source):
+        code = self._compiled.get(source)
+        if code is None:
+            code = self._compiled[source] = validate(source)
+            while len(self._compiled) > COMPILED_CACHE_SIZE:
+                self._compiled.popitem(last=False)
+        else:
+            self._compiled.move_to_end(source)
+        return code
+
+    def run(self, source, variables, cpu_seconds):
+        """
+        Executa o script e retorna (ok, resultado ou mensagem de erro, saída).
+
+        O resultado é o retorno de `main()` se o script a definir, senão o
+        valor final da variável global `result`.
+        """
+        output = []
+
+        def capture(*args, **kwargs):
+            if len(output) < MAX_OUTPUT_LINES:
+                output.append(' '.join(str(arg) for arg in args))
+
+        scope = {'__builtins__': {**SAFE_BUILTINS, 'print': capture}, **SAFE_MODULES}
+        scope.update({name: value for name, value in variables.items() if name.isidentifier() and not name.startswith('_')})
+        scope['variables'] = dict(variables)
+
+        self._limit_cpu(cpu_seconds)
+        try:
+            code = self._compile(source)
+            exec(code, scope)
+            main = scope.get('main')
+            result = main() if callable(main) else scope.get('result')
+        except ScriptRejected as exc:
+            return False, str(exc), output
+        except CpuLimitExceeded:
+            return False, 'Limite de tempo de CPU excedido', output
+        except MemoryError:
+            return False, 'Limite de memória excedido', output
+        except RecursionError:
+            return False, 'Limite de recursão excedido', output
+        except Exception as exc:
+            return False, f'{exc.__class__.__name__}: {exc}', output
+        finally:
+            self._limit_cpu(None)
+
+        try:
+            encoded = json.dumps(result, default=str)
+        except (TypeError, ValueError):
+            return False, 'Resultado não serializável', output
+        if len(encoded) > MAX_RESULT_BYTES:
+            return False, 'Resultado excede o tamanho máximo', output
+        return True, json.loads(encoded), output
+
+    @staticmethod
+    def _limit_cpu(cpu_seconds):
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        if cpu_seconds is None:
+            resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+            return
+        # RLIMIT_CPU é acumulado no processo: o limite vale a partir do uso atual
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        soft = int(math.ceil(usage.ru_utime + usage.ru_stime + cpu_seconds))
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def worker_main(conn, memory_limit_mb):
+    """Laço do processo worker: recebe jobs pelo pipe até receber None"""
+    # Interrupções do terminal são tratadas pelo processo pai
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    runner = ScriptRunner(memory_limit_mb)
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        source, variables, cpu_seconds = job
+        conn.send(runner.run(source, variables, cpu_seconds))
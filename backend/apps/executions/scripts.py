@@ -0,0 +1,204 @@
+"""
+Pool de processos que executa os nós `script`
+
+Os workers são criados antes do uso (pre-fork) e reaproveitados entre
+scripts, com limite de memória, de tempo de CPU e de tempo total. A fila é
+limitada: sem vaga dentro de QUEUE_TIMEOUT a chamada falha na hora em vez de
+prender o worker web. Um script que estoura o tempo total tem o processo
+encerrado e substituído.
+"""
+import atexit
+import logging
+import multiprocessing
+import queue
+import threading
+
+from django.conf import settings
+
+from . import sandbox
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'WORKERS': 2,
+    # Chamadas que podem aguardar um worker livre além das em execução
+    'QUEUE_SIZE': 8,
+    'QUEUE_TIMEOUT': 0.5,
+    'TIMEOUT': 2.0,
+    'MAX_TIMEOUT': 10.0,
+    'CPU_SECONDS': 1,
+    'MEMORY_MB': 256,
+    # Processos são reciclados após esta quantidade de scripts
+    'MAX_JOBS': 1000,
+}
+
+
+class ScriptError(Exception):
+    """Falha na execução de um script"""
+
+
+class ScriptTimeout(ScriptError):
+    pass
+
+
+class ScriptPoolBusy(ScriptError):
+    pass
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'SCRIPT_POOL', {})}
+
+
+def _context():
+    # forkserver evita herdar threads, locks e conexões do processo web
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+class _Worker:
+    """Processo worker e a ponta do pipe usada pelo pool"""
+
+    def __init__(self, context, memory_mb):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=sandbox.worker_main,
+            args=(child_conn, memory_mb),
+            name='script-worker',
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+    def execute(self, source, variables, cpu_seconds, timeout):
+        self.jobs += 1
+        try:
+            self.conn.send((source, variables, cpu_seconds))
+            if not self.conn.poll(timeout):
+                raise ScriptTimeout(f'Script excedeu o tempo limite de {timeout:g}s')
+            return self.conn.recv()
+        except (EOFError, OSError) as exc:
+            # BrokenPipeError/ConnectionResetError: o processo morreu
+            raise ScriptError('Processo do script foi encerrado') from exc
+
+    def stop(self, kill=False):
+        if kill or not self.process.is_alive():
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except OSError:
+                self.process.kill()
+        self.process.join(timeout=1)
+        self.conn.close()
+
+
+class ScriptPool:
+    """
+    Workers pré-criados alimentados por uma fila limitada
+    """
+
+    def __init__(self, workers=2, queue_size=8, queue_timeout=0.5, timeout=2.0, max_timeout=10.0,
+                 cpu_seconds=1, memory_mb=256, max_jobs=1000):
+        self.size = workers
+        self.queue_timeout = queue_timeout
+        self.timeout = timeout
+        self.max_timeout = max_timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.max_jobs = max_jobs
+
+        self._context = _context()
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        # LIFO: os workers usados mais recentemente (mais quentes) saem primeiro
+        self._idle = queue.LifoQueue()
+        self._closed = False
+        for _ in range(workers):
+            self._idle.put(self._spawn())
+
+    def _spawn(self):
+        return _Worker(self._context, self.memory_mb)
+
+    def run(self, source, variables=None, timeout=None):
+        """
+        Executa o script em um worker. Retorna (resultado, saída do print).
+
+        Levanta ScriptPoolBusy com a fila cheia, ScriptTimeout ao estourar
+        o tempo total e ScriptError nas demais falhas do script.
+        """
+        if self._closed:
+            raise ScriptError('Pool de scripts encerrado')
+        timeout = min(float(timeout or self.timeout), self.max_timeout)
+
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise ScriptPoolBusy('Fila de scripts cheia')
+        try:
+            try:
+                worker = self._idle.get(timeout=self.queue_timeout + self.timeout)
+            except queue.Empty:
+                raise ScriptPoolBusy('Nenhum worker de script disponível')
+            if not worker.process.is_alive():
+                # Morreu ocioso (OOM killer, sinal externo)
+                worker.stop(kill=True)
+                worker = self._spawn()
+
+            try:
+                ok, value, output = worker.execute(source, variables or {}, self.cpu_seconds, timeout)
+            except Exception as exc:
+                # Processo preso ou morto, ou pipe em estado desconhecido: substitui por um novo
+                worker.stop(kill=True)
+                worker = self._spawn()
+                if isinstance(exc, ScriptError):
+                    raise
+                raise ScriptError(f'Falha ao enviar o script ao worker: {exc}') from exc
+            finally:
+                if worker.jobs >= self.max_jobs:
+                    worker.stop()
+                    worker = self._spawn()
+                self._idle.put(worker)
+        finally:
+            self._slots.release()
+
+        if not ok:
+            raise ScriptError(value)
+        return value, output
+
+    def close(self):
+        """Encerra os workers ociosos (chamado no atexit)"""
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            worker.stop()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_script_pool():
+    """Pool compartilhado do processo, criado (com os workers) no primeiro uso"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                config = _config()
+                _pool = ScriptPool(
+                    workers=config['WORKERS'],
+                    queue_size=config['QUEUE_SIZE'],
+                    queue_timeout=config['QUEUE_TIMEOUT'],
+                    timeout=config['TIMEOUT'],
+                    max_timeout=config['MAX_TIMEOUT'],
+                    cpu_seconds=config['CPU_SECONDS'],
+                    memory_mb=config['MEMORY_MB'],
+                    max_jobs=config['MAX_JOBS'],
+                )
+                atexit.register(_pool.close)
+    return _pool
+
+
+def run_script(source, variables=None, timeout=None):
+    return get_script_pool().run(source, variables, timeout)
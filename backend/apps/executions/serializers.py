@@ -25,6 +25,9 @@ class ChatSessionSerializer(serializers.ModelSerializer):
         return obj.duration()
     
     def get_messages_count(self, obj):
+        # Anotado no queryset da listagem; demais ações fazem a contagem
+        if hasattr(obj, 'messages_count'):
+            return obj.messages_count
         return obj.messages.count()
 
 
@@ -143,6 +146,18 @@ class ChatSessionCreateSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class PublicChatSessionStartSerializer(serializers.Serializer):
+    """Serializer para início público de uma sessão de chat"""
+    user_id = serializers.CharField(max_length=255, required=False)
+    user_data = serializers.DictField(required=False, default=dict)
+    variables = serializers.DictField(required=False, default=dict)
+
+
+class ChatStepSerializer(serializers.Serializer):
+    """Serializer para a resposta do usuário em um passo da sessão"""
+    value = serializers.JSONField(required=False, allow_null=True)
+
+
 class ChatSessionStatsSerializer(serializers.Serializer):
     """Serializer para estatísticas de sessões"""
     total_sessions = serializers.IntegerField()
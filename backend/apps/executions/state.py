@@ -0,0 +1,348 @@
+"""
+Estado quente das sessões de chat, mantido fora do banco entre checkpoints
+"""
+from datetime import datetime, timezone as dt_timezone
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+from django.utils.module_loading import import_string
+
+from .models import ChatSession
+from .rollups import SAFETY_LAG
+
+
+logger = logging.getLogger(__name__)
+
+# Campos da ChatSession mantidos no backend de estado
+STATE_FIELDS = ('current_node_id', 'status', 'variables', 'context', 'message_count', 'end_time')
+
+FINISHED_STATUSES = ('completed', 'abandoned', 'error')
+
+DEFAULTS = {
+    'ENABLED': True,
+    'BACKEND': 'apps.executions.state.InMemorySessionStateBackend',
+    'OPTIONS': {},
+    'CHECKPOINT_EVERY': 10,
+    'IDLE_TIMEOUT': 300,
+    'TTL': 24 * 60 * 60,
+    # Segundos sem tentar o backend depois de uma falha de conexão
+    'RETRY_AFTER': 30,
+}
+
+
+class SessionState:
+    """
+    Snapshot do estado mutável de uma ChatSession
+    """
+    __slots__ = STATE_FIELDS + ('steps', 'updated_at')
+
+    def __init__(self, current_node_id=None, status='active', variables=None, context=None,
+                 message_count=0, end_time=None, steps=0, updated_at=None):
+        self.current_node_id = current_node_id
+        self.status = status
+        self.variables = variables or {}
+        self.context = context or {}
+        self.message_count = message_count
+        self.end_time = end_time
+        self.steps = steps
+        self.updated_at = updated_at or time.time()
+
+    @classmethod
+    def from_session(cls, session):
+        return cls(**{field: getattr(session, field) for field in STATE_FIELDS})
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        if data.get('end_time'):
+            data['end_time'] = parse_datetime(data['end_time'])
+        return cls(**data)
+
+    def to_dict(self):
+        data = {field: getattr(self, field) for field in self.__slots__}
+        if self.end_time:
+            data['end_time'] = self.end_time.isoformat()
+        return data
+
+    def apply_to(self, session):
+        for field in STATE_FIELDS:
+            setattr(session, field, getattr(self, field))
+
+
+class BaseSessionStateBackend:
+    """
+    Interface dos backends de estado quente
+    """
+    # Falhas do backend tratadas pelo store como indisponibilidade
+    errors = ()
+
+    def get(self, session_id):
+        raise NotImplementedError
+
+    def set(self, session_id, data, ttl):
+        raise NotImplementedError
+
+    def delete(self, session_id):
+        raise NotImplementedError
+
+    def idle(self, older_than):
+        """Retorna [(session_id, data)] sem atividade desde `older_than` (timestamp)"""
+        raise NotImplementedError
+
+    def existing(self, session_ids):
+        """Retorna os ids (str), entre `session_ids`, das sessões com estado quente"""
+        return {str(session_id) for session_id in session_ids if self.get(session_id) is not None}
+
+
+class InMemorySessionStateBackend(BaseSessionStateBackend):
+    """
+    Backend em memória do processo, usado em testes e desenvolvimento
+    """
+
+    def __init__(self, **options):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            raw = self._data.get(str(session_id))
+        return json.loads(raw) if raw else None
+
+    def set(self, session_id, data, ttl):
+        # Serializa para reproduzir a cópia que o Redis faria
+        raw = json.dumps(data)
+        with self._lock:
+            self._data[str(session_id)] = raw
+
+    def delete(self, session_id):
+        with self._lock:
+            self._data.pop(str(session_id), None)
+
+    def idle(self, older_than):
+        with self._lock:
+            items = list(self._data.items())
+        result = []
+        for session_id, raw in items:
+            data = json.loads(raw)
+            if data['updated_at'] <= older_than:
+                result.append((session_id, data))
+        return result
+
+    def existing(self, session_ids):
+        with self._lock:
+            return {str(session_id) for session_id in session_ids} & set(self._data)
+
+
+class RedisSessionStateBackend(BaseSessionStateBackend):
+    """
+    Backend em hash do Redis, com um sorted set indexando a última atividade
+    """
+
+    def __init__(self, url=None, prefix='chat_session_state', **options):
+        import redis
+
+        # Sem timeout, um Redis fora do ar travaria cada passo das sessões
+        options.setdefault('socket_connect_timeout', 1)
+        options.setdefault('socket_timeout', 1)
+        self.errors = (redis.RedisError, OSError)
+        self.client = redis.Redis.from_url(url or settings.CELERY_BROKER_URL, **options)
+        self.prefix = prefix
+        self.activity_key = f'{prefix}:activity'
+
+    def _key(self, session_id):
+        return f'{self.prefix}:{session_id}'
+
+    def get(self, session_id):
+        raw = self.client.hgetall(self._key(session_id))
+        if not raw:
+            return None
+        return {key.decode(): json.loads(value) for key, value in raw.items()}
+
+    def set(self, session_id, data, ttl):
+        key = self._key(session_id)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hset(key, mapping={field: json.dumps(value) for field, value in data.items()})
+        pipe.expire(key, ttl)
+        pipe.zadd(self.activity_key, {str(session_id): data['updated_at']})
+        pipe.execute()
+
+    def delete(self, session_id):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.delete(self._key(session_id))
+        pipe.zrem(self.activity_key, str(session_id))
+        pipe.execute()
+
+    def idle(self, older_than):
+        session_ids = [
+            member.decode()
+            for member in self.client.zrangebyscore(self.activity_key, '-inf', older_than)
+        ]
+        result = []
+        for session_id in session_ids:
+            data = self.get(session_id)
+            if data is None:
+                # Hash expirou pelo TTL; só resta limpar o índice
+                self.client.zrem(self.activity_key, session_id)
+                continue
+            result.append((session_id, data))
+        return result
+
+    def existing(self, session_ids):
+        session_ids = [str(session_id) for session_id in session_ids]
+        pipe = self.client.pipeline(transaction=False)
+        for session_id in session_ids:
+            pipe.exists(self._key(session_id))
+        return {session_id for session_id, found in zip(session_ids, pipe.execute()) if found}
+
+
+class SessionStateStore:
+    """
+    Mantém o estado vivo no backend e grava na ChatSession apenas nos checkpoints:
+    mudança de status, a cada `checkpoint_every` passos ou após `idle_timeout`.
+
+    Se o backend cair, as sessões passam a ser gravadas direto na ChatSession
+    até `retry_after` segundos depois da falha.
+    """
+
+    def __init__(self, backend, checkpoint_every=10, idle_timeout=300, ttl=86400, retry_after=30):
+        self.backend = backend
+        self.checkpoint_every = checkpoint_every
+        self.idle_timeout = idle_timeout
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self._down_until = 0
+
+    @property
+    def available(self):
+        return time.monotonic() >= self._down_until
+
+    def _unavailable(self, exc):
+        logger.warning('Backend de estado das sessões indisponível, gravando no banco: %s', exc)
+        self._down_until = time.monotonic() + self.retry_after
+
+    def load(self, session):
+        """Aplica o estado quente sobre a sessão carregada do banco"""
+        data = None
+        if self.available:
+            try:
+                data = self.backend.get(session.pk)
+            except self.backend.errors as exc:
+                self._unavailable(exc)
+        # Estado quente mais antigo que o banco (gravado direto durante uma
+        # queda do backend ou alterado fora do engine) é descartado
+        if data and session.last_activity and data['updated_at'] < session.last_activity.timestamp() - 0.001:
+            data = None
+        state = SessionState.from_dict(data) if data else SessionState.from_session(session)
+        state.apply_to(session)
+        return state
+
+    def save(self, session, state):
+        """Registra o passo executado; retorna True se houve checkpoint no banco"""
+        previous_status = state.status
+        for field in STATE_FIELDS:
+            setattr(state, field, getattr(session, field))
+        state.steps += 1
+        state.updated_at = time.time()
+
+        finished = state.status in FINISHED_STATUSES
+        checkpoint = (
+            finished or not self.available
+            or state.status != previous_status or state.steps >= self.checkpoint_every
+        )
+        if checkpoint:
+            self.checkpoint(session.pk, state)
+            state.steps = 0
+        if not self.available:
+            return True
+
+        try:
+            if finished:
+                self.backend.delete(session.pk)
+            else:
+                self.backend.set(session.pk, state.to_dict(), self.ttl)
+        except self.backend.errors as exc:
+            self._unavailable(exc)
+            if not checkpoint:
+                self.checkpoint(session.pk, state)
+            return True
+        return checkpoint
+
+    def checkpoint(self, session_id, state):
+        """Grava o estado na ChatSession com um único UPDATE"""
+        # last_activity nunca fica atrás da janela já processada pelos agregados
+        # diários (rollups.SAFETY_LAG); senão um checkpoint tardio (sessão
+        # ociosa) nunca seria visto por eles
+        touched = max(
+            datetime.fromtimestamp(state.updated_at, tz=dt_timezone.utc),
+            datetime.now(tz=dt_timezone.utc) - SAFETY_LAG,
+        )
+        ChatSession.objects.filter(pk=session_id).update(
+            last_activity=touched,
+            **{field: getattr(state, field) for field in STATE_FIELDS}
+        )
+
+    def discard(self, session_id):
+        """Descarta o estado quente (a sessão foi alterada diretamente no banco)"""
+        try:
+            self.backend.delete(session_id)
+        except self.backend.errors as exc:
+            # O estado quente que sobrar fica mais antigo que o banco e é ignorado
+            self._unavailable(exc)
+
+    def checkpoint_idle(self):
+        """Grava e libera as sessões sem atividade há mais de `idle_timeout` segundos"""
+        count = 0
+        for session_id, data in self.backend.idle(time.time() - self.idle_timeout):
+            self.checkpoint(session_id, SessionState.from_dict(data))
+            self.backend.delete(session_id)
+            count += 1
+        return count
+
+    def live_among(self, session_ids):
+        """
+        Ids (str), entre `session_ids`, das sessões com estado ainda não gravado.
+
+        Chamado com as linhas travadas: um passo concorrente grava o estado
+        quente antes de soltar a trava, então o resultado vale até o commit.
+        Sem o backend não há como saber, e todas contam como vivas.
+        """
+        if not self.available:
+            return {str(session_id) for session_id in session_ids}
+        try:
+            return self.backend.existing(session_ids)
+        except self.backend.errors as exc:
+            self._unavailable(exc)
+            return {str(session_id) for session_id in session_ids}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_state_settings():
+    return {**DEFAULTS, **getattr(settings, 'EXECUTION_SESSION_STATE', {})}
+
+
+def get_state_store():
+    """Store compartilhado do processo, ou None se desabilitado nas settings"""
+    global _store
+    config = get_state_settings()
+    if not config['ENABLED']:
+        return None
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                backend = import_string(config['BACKEND'])(**config['OPTIONS'])
+                _store = SessionStateStore(
+                    backend,
+                    checkpoint_every=config['CHECKPOINT_EVERY'],
+                    idle_timeout=config['IDLE_TIMEOUT'],
+                    ttl=config['TTL'],
+                    retry_after=config['RETRY_AFTER'],
+                )
+    return _store
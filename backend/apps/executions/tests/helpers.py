@@ -0,0 +1,53 @@
+"""
+Fluxos e configurações compartilhados pelos testes de execução
+"""
+from django.contrib.auth.models import User
+
+from apps.chatbots.models import Chatbot
+from apps.flows.models import Flow
+
+
+# Passos síncronos e sem serviços externos (Redis, agregador de analytics)
+ENGINE_SETTINGS = {
+    'CHANNEL_LAYERS': {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    'EXECUTION_SESSION_STATE': {'ENABLED': False},
+    'EXECUTION_WRITE_BUFFER': {'ENABLED': False},
+    'CHATBOT_ANALYTICS': {'ENABLED': False},
+}
+
+
+def node(node_id, node_type, **data):
+    return {'id': node_id, 'type': node_type, 'data': data}
+
+
+def chain(*nodes):
+    """Conecta os nós na ordem em que foram passados"""
+    return [
+        {'id': f'e-{source["id"]}', 'source': source['id'], 'target': target['id']}
+        for source, target in zip(nodes, nodes[1:])
+    ]
+
+
+def create_flow(nodes, edges, published=False, username='engine'):
+    user, _ = User.objects.get_or_create(username=username)
+    chatbot = Chatbot.objects.create(name='Bot de teste', owner=user, is_published=published)
+    flow = Flow.objects.create(
+        chatbot=chatbot, name='Principal', is_main_flow=True, nodes=nodes, edges=edges, created_by=user
+    )
+    return chatbot, flow
+
+
+GREETING_FLOW = [
+    node('start', 'start'),
+    node('hello', 'text', text='Olá!'),
+    node('ask', 'input', variableName='nome', required=True),
+    node('reply', 'text', text='Prazer, {{nome}}'),
+    node('end', 'end', message='Tchau'),
+]
+
+DELAY_FLOW = [
+    node('start', 'start'),
+    node('wait', 'delay', duration=60000),
+    node('after', 'text', text='Voltei'),
+    node('end', 'end'),
+]
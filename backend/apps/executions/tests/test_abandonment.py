@@ -0,0 +1,91 @@
+"""
+Testes da marcação das sessões abandonadas
+"""
+from datetime import timedelta
+import time
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..abandonment import sweep_abandoned_sessions
+from ..models import ChatSession, ScheduledTimer
+from ..state import InMemorySessionStateBackend, SessionStateStore
+from .helpers import ENGINE_SETTINGS, GREETING_FLOW, chain, create_flow
+
+
+@override_settings(**ENGINE_SETTINGS)
+class SweepAbandonedSessionsTests(TestCase):
+
+    def setUp(self):
+        self.chatbot, self.flow = create_flow(GREETING_FLOW, chain(*GREETING_FLOW))
+        self.now = timezone.now()
+
+    def create_session(self, minutes_idle, status='active', chatbot=None):
+        session = ChatSession.objects.create(
+            chatbot=chatbot or self.chatbot, flow=self.flow, user_id='u', status=status
+        )
+        ChatSession.objects.filter(pk=session.pk).update(last_activity=self.now - timedelta(minutes=minutes_idle))
+        return session
+
+    def sweep(self, store=None, **kwargs):
+        with mock.patch('apps.executions.abandonment.get_state_store', return_value=store):
+            return sweep_abandoned_sessions(now=self.now, **kwargs)
+
+    def statuses(self):
+        return dict(ChatSession.objects.values_list('pk', 'status'))
+
+    def test_idle_sessions_are_abandoned_in_chunks(self):
+        idle = [self.create_session(60) for _ in range(5)]
+        recent = self.create_session(5)
+        finished = self.create_session(60, status='completed')
+
+        counts = self.sweep(chunk_size=2, default_minutes=30)
+
+        self.assertEqual(counts, {'sessions': 5, 'flow_executions': 0})
+        statuses = self.statuses()
+        self.assertEqual({statuses[session.pk] for session in idle}, {'abandoned'})
+        self.assertEqual(statuses[recent.pk], 'active')
+        self.assertEqual(statuses[finished.pk], 'completed')
+        self.assertEqual(ChatSession.objects.get(pk=idle[0].pk).end_time, self.now)
+
+    def test_waiting_sessions_with_pending_timer_are_kept(self):
+        paused = self.create_session(60, status='waiting')
+        ScheduledTimer.objects.create(session=paused, node_id='wait', due_at=self.now + timedelta(hours=1))
+        gave_up = self.create_session(60, status='waiting')
+
+        self.assertEqual(self.sweep(default_minutes=30)['sessions'], 1)
+        self.assertEqual(self.statuses(), {paused.pk: 'waiting', gave_up.pk: 'abandoned'})
+
+    def test_chatbot_policy_overrides_default(self):
+        patient, _ = create_flow(GREETING_FLOW, chain(*GREETING_FLOW))
+        patient.abandon_after_minutes = 120
+        patient.save()
+        kept = self.create_session(60, chatbot=patient)
+        abandoned = self.create_session(60)
+
+        self.assertEqual(self.sweep(default_minutes=30)['sessions'], 1)
+        self.assertEqual(self.statuses(), {kept.pk: 'active', abandoned.pk: 'abandoned'})
+
+    def test_sessions_with_hot_state_are_kept(self):
+        store = SessionStateStore(InMemorySessionStateBackend(), idle_timeout=300)
+        live = [self.create_session(60) for _ in range(3)]
+        idle = self.create_session(60)
+        for session in live:
+            store.backend.set(session.pk, {'updated_at': time.time()}, 60)
+
+        # Lotes de uma sessão: o cursor passa pelas vivas sem voltar a elas
+        counts = self.sweep(store, chunk_size=1, default_minutes=30)
+
+        self.assertEqual(counts['sessions'], 1)
+        statuses = self.statuses()
+        self.assertEqual(statuses[idle.pk], 'abandoned')
+        self.assertEqual({statuses[session.pk] for session in live}, {'active'})
+
+    def test_unavailable_state_backend_keeps_everything(self):
+        store = SessionStateStore(InMemorySessionStateBackend())
+        store._down_until = time.monotonic() + 60
+        session = self.create_session(60)
+
+        self.assertEqual(self.sweep(store, default_minutes=30)['sessions'], 0)
+        self.assertEqual(self.statuses(), {session.pk: 'active'})
@@ -0,0 +1,86 @@
+"""
+Testes do buffer write-behind e do replay do spool
+"""
+from pathlib import Path
+import shutil
+import tempfile
+import uuid
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import TransactionTestCase
+
+from ..buffer import WriteBehindBuffer, rejected_path, replay_spool
+from ..models import ChatMessage, ChatSession, ExecutionLog
+from .helpers import GREETING_FLOW, chain, create_flow
+
+
+class WriteBehindBufferTests(TransactionTestCase):
+    # As FKs só são verificadas no commit, fora da transação do TestCase
+
+    def setUp(self):
+        chatbot, flow = create_flow(GREETING_FLOW, chain(*GREETING_FLOW))
+        self.session = ChatSession.objects.create(chatbot=chatbot, flow=flow, user_id='visitante')
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.spool_path = Path(directory) / 'buffer.spool'
+        self.buffer = WriteBehindBuffer(max_size=100, flush_interval=60, spool_path=self.spool_path)
+        self.addCleanup(self.buffer.close)
+
+    def message(self, session_id=None):
+        return ChatMessage(
+            id=uuid.uuid4(),
+            session_id=session_id or self.session.pk,
+            owner_id=self.session.owner_id,
+            node_id='n',
+            message_type='bot',
+            content={},
+        )
+
+    def test_flush_writes_pending_rows(self):
+        log = ExecutionLog(id=uuid.uuid4(), session=self.session, node_id='n', component_type='text', status='completed')
+        self.buffer.add([self.message(), self.message(), log])
+        self.assertEqual(len(self.buffer), 3)
+        self.assertFalse(ChatMessage.objects.exists())
+
+        self.buffer.flush()
+
+        self.assertEqual(len(self.buffer), 0)
+        self.assertEqual(ChatMessage.objects.count(), 2)
+        self.assertEqual(ExecutionLog.objects.count(), 1)
+
+    def test_rows_violating_integrity_are_rejected_alone(self):
+        valid, orphan = self.message(), self.message(session_id=uuid.uuid4())
+        self.buffer.add([valid, orphan])
+
+        self.buffer.flush()
+
+        self.assertEqual(list(ChatMessage.objects.values_list('pk', flat=True)), [valid.pk])
+        self.assertIn(str(orphan.pk), rejected_path(self.spool_path).read_text())
+        self.assertFalse(self.spool_path.exists())
+
+    def test_database_failure_spools_for_replay(self):
+        messages = [self.message(), self.message()]
+        self.buffer.add(messages)
+
+        with mock.patch.object(self.buffer, '_write', side_effect=OperationalError('banco fora')):
+            with self.assertRaises(OperationalError):
+                self.buffer.flush()
+        self.assertFalse(ChatMessage.objects.exists())
+        self.assertTrue(self.spool_path.exists())
+
+        self.assertEqual(replay_spool(self.spool_path), 2)
+        self.assertEqual(ChatMessage.objects.count(), 2)
+        self.assertFalse(self.spool_path.exists())
+
+    def test_replay_skips_existing_and_rejects_orphans(self):
+        existing = self.message()
+        existing.save()
+        orphan = self.message(session_id=uuid.uuid4())
+        self.buffer._spool([('executions.ChatMessage', [existing, self.message(), orphan])])
+
+        self.assertEqual(replay_spool(self.spool_path), 2)
+
+        self.assertEqual(ChatMessage.objects.count(), 2)
+        self.assertIn(str(orphan.pk), rejected_path(self.spool_path).read_text())
+        self.assertFalse(self.spool_path.exists())
@@ -0,0 +1,63 @@
+"""
+Testes da compilação das condições dos nós `conditional`
+"""
+from django.test import SimpleTestCase
+
+from ..engine.conditions import compile_condition
+
+
+class CompileConditionTests(SimpleTestCase):
+
+    def test_untyped_comparisons_and_aliases(self):
+        equals = compile_condition({'variable': 'idade', 'operator': 'equals', 'value': '18'})
+        greater = compile_condition({'variable': 'idade', 'operator': 'greater', 'value': '18'})
+        contains = compile_condition({'variable': 'nome', 'operator': 'contains', 'value': 'ana'})
+
+        self.assertTrue(equals({'idade': 18}))
+        self.assertFalse(equals({'idade': 19}))
+        self.assertTrue(greater({'idade': '19'}))
+        self.assertFalse(greater({'idade': 'abc'}))
+        self.assertTrue(contains({'nome': 'mariana'}))
+        self.assertFalse(compile_condition({'variable': 'x', 'operator': 'matches', 'value': 1})({'x': 1}))
+
+    def test_typed_number_date_and_boolean(self):
+        types = {'idade': 'number', 'nascimento': 'date', 'aceite': 'boolean'}
+        adult = compile_condition({'variable': 'idade', 'operator': '>=', 'value': '18'}, types)
+        before = compile_condition({'variable': 'nascimento', 'operator': '<', 'value': '2000-01-01'}, types)
+        accepted = compile_condition({'variable': 'aceite', 'operator': '==', 'value': True}, types)
+        not_accepted = compile_condition({'variable': 'aceite', 'operator': '!=', 'value': True}, types)
+
+        self.assertTrue(adult({'idade': '18.0'}))
+        self.assertFalse(adult({'idade': None}))
+        self.assertTrue(before({'nascimento': '1999-12-31T23:00:00Z'}))
+        self.assertFalse(before({'nascimento': '2000-01-01'}))
+        self.assertTrue(accepted({'aceite': 'Sim'}))
+        self.assertFalse(accepted({'aceite': 'não'}))
+        # Valor que não converte só satisfaz `!=`
+        self.assertTrue(not_accepted({}))
+
+    def test_array_contains(self):
+        condition = compile_condition(
+            {'variable': 'tags', 'operator': 'contains', 'value': '2'}, {'tags': 'array'}
+        )
+
+        self.assertTrue(condition({'tags': [1, 2, 3]}))
+        self.assertFalse(condition({'tags': [12]}))
+        self.assertTrue(condition({'tags': 'a,2'}))
+
+    def test_groups(self):
+        clauses = [
+            {'variable': 'a', 'operator': '==', 'value': 1},
+            {'variable': 'b', 'operator': '==', 'value': 2},
+        ]
+        match_all = compile_condition({'conditions': clauses})
+        match_any = compile_condition({'conditions': clauses, 'logic': 'OR'})
+
+        self.assertTrue(match_all({'a': 1, 'b': 2}))
+        self.assertFalse(match_all({'a': 1, 'b': 3}))
+        self.assertTrue(match_any({'a': 0, 'b': 2}))
+        self.assertFalse(match_any({'a': 0, 'b': 0}))
+
+    def test_empty_condition(self):
+        self.assertTrue(compile_condition({})({}))
+        self.assertFalse(compile_condition({'logic': 'or', 'conditions': [{'variable': ''}]})({}))
@@ -0,0 +1,116 @@
+"""
+Testes do motor que avança as sessões pelos nós do fluxo
+"""
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..engine import EngineError, start_session, step
+from ..models import ChatMessage, ChatSession, ExecutionLog, ScheduledTimer, UserInput
+from .helpers import DELAY_FLOW, ENGINE_SETTINGS, GREETING_FLOW, chain, create_flow, node
+
+
+@override_settings(**ENGINE_SETTINGS)
+class FlowEngineTests(TestCase):
+
+    def setUp(self):
+        self.chatbot, self.flow = create_flow(GREETING_FLOW, chain(*GREETING_FLOW))
+
+    def test_start_runs_until_input(self):
+        result = start_session(self.chatbot, self.flow, 'visitante')
+
+        self.assertIsNone(result.error)
+        self.assertEqual([message['node_id'] for message in result.messages], ['hello', 'ask'])
+        self.assertEqual(result.messages[0]['content']['message'], 'Olá!')
+        self.assertTrue(result.awaiting_input)
+
+        session = ChatSession.objects.get(pk=result.session.pk)
+        self.assertEqual(session.current_node_id, 'ask')
+        self.assertEqual(session.message_count, 2)
+
+    def test_step_stores_input_and_finishes(self):
+        session = start_session(self.chatbot, self.flow, 'visitante').session
+
+        result = step(session, {'value': 'Ana'})
+
+        self.assertEqual([message['node_id'] for message in result.messages], ['reply', 'end'])
+        self.assertEqual(result.messages[0]['content']['message'], 'Prazer, Ana')
+        session = ChatSession.objects.get(pk=session.pk)
+        self.assertEqual(session.status, 'completed')
+        self.assertEqual(session.variables, {'nome': 'Ana'})
+        self.assertIsNotNone(session.end_time)
+        self.assertEqual(ChatMessage.objects.filter(session=session).count(), 5)
+        self.assertEqual(ExecutionLog.objects.filter(session=session, status='completed').count(), 5)
+        self.assertEqual(UserInput.objects.get(session=session).processed_value, 'Ana')
+
+    def test_invalid_input_keeps_waiting(self):
+        session = start_session(self.chatbot, self.flow, 'visitante').session
+
+        result = step(session, {'value': '  '})
+
+        self.assertEqual(result.error, 'Este campo é obrigatório')
+        session = ChatSession.objects.get(pk=session.pk)
+        self.assertEqual(session.status, 'active')
+        self.assertEqual(session.current_node_id, 'ask')
+        self.assertFalse(UserInput.objects.get(session=session).is_valid)
+
+    def test_number_input_rejects_non_finite_values(self):
+        nodes = [node('start', 'start'), node('ask', 'input', inputType='number', variableName='idade'), node('end', 'end')]
+        chatbot, flow = create_flow(nodes, chain(*nodes), username='numero')
+        session = start_session(chatbot, flow, 'visitante').session
+
+        for value in ('nan', 'inf', '-Infinity'):
+            self.assertEqual(step(session, {'value': value}).error, 'Informe um número válido')
+
+        step(session, {'value': '4,5'})
+        self.assertEqual(ChatSession.objects.get(pk=session.pk).variables, {'idade': 4.5})
+
+    def test_finished_session_rejects_step(self):
+        session = start_session(self.chatbot, self.flow, 'visitante').session
+        step(session, {'value': 'Ana'})
+
+        with self.assertRaises(EngineError):
+            step(session, {'value': 'de novo'})
+
+    def test_step_reloads_stale_session(self):
+        session = start_session(self.chatbot, self.flow, 'visitante').session
+        # Outro processo avançou a sessão depois que esta instância foi carregada
+        step(ChatSession.objects.get(pk=session.pk), {'value': 'Ana'})
+
+        with self.assertRaises(EngineError):
+            step(session, {'value': 'Bia'})
+
+    def test_cycle_is_stopped(self):
+        nodes = [node('start', 'start'), node('a', 'text', text='a'), node('b', 'text', text='b')]
+        edges = chain(*nodes) + [{'id': 'loop', 'source': 'b', 'target': 'a'}]
+        chatbot, flow = create_flow(nodes, edges, username='ciclo')
+
+        result = start_session(chatbot, flow, 'visitante')
+
+        self.assertEqual(result.session.status, 'error')
+        self.assertIn('Limite de nós por passo', result.error)
+
+    def test_published_session_is_pinned_to_artifact(self):
+        self.chatbot.publish()
+        session = start_session(self.chatbot, self.flow, 'visitante').session
+        self.assertEqual(session.artifact_id, self.chatbot.published_artifact_id)
+
+        # O rascunho muda depois do início; a conversa continua na versão publicada
+        self.flow.nodes = [dict(item, data={'text': 'Mudou'}) if item['id'] == 'reply' else item for item in GREETING_FLOW]
+        self.flow.save()
+        result = step(session, {'value': 'Ana'})
+
+        self.assertEqual(result.messages[0]['content']['message'], 'Prazer, Ana')
+
+    def test_delay_pauses_session_with_timer(self):
+        chatbot, flow = create_flow(DELAY_FLOW, chain(*DELAY_FLOW), username='delay')
+
+        session = start_session(chatbot, flow, 'visitante').session
+
+        self.assertEqual(ChatSession.objects.get(pk=session.pk).status, 'waiting')
+        timer = ScheduledTimer.objects.get(session=session)
+        self.assertEqual(timer.node_id, 'wait')
+        self.assertGreater(timer.due_at, timezone.now() + timedelta(seconds=50))
+        # Só o timer retoma a sessão
+        self.assertEqual(step(session, {'value': 'oi'}).messages, [])
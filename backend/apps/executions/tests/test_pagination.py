@@ -0,0 +1,86 @@
+"""
+Testes da paginação por cursor e do polling com ?since=
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..models import ChatMessage, ChatSession
+from ..pagination import write_lag
+from .helpers import GREETING_FLOW, chain, create_flow
+
+
+class TimestampCursorPaginationTests(TestCase):
+    url = '/api/executions/messages/'
+
+    def setUp(self):
+        chatbot, flow = create_flow(GREETING_FLOW, chain(*GREETING_FLOW))
+        self.session = ChatSession.objects.create(chatbot=chatbot, flow=flow, user_id='u')
+        self.client = APIClient()
+        self.client.force_authenticate(chatbot.owner)
+        self.base = timezone.now() - timedelta(hours=1)
+        # Dois registros com o mesmo horário para exercitar o desempate por id
+        self.messages = [self.message(self.base + timedelta(seconds=i // 2)) for i in range(5)]
+
+    def message(self, sent_at):
+        return ChatMessage.objects.create(session=self.session, message_type='bot', content={}, sent_at=sent_at)
+
+    def get(self, url=None, **params):
+        response = self.client.get(url or self.url, params if url is None else None)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def ids(self, page):
+        return [row['id'] for row in page['results']]
+
+    def test_pages_follow_cursor_without_count(self):
+        seen = []
+        with CaptureQueriesContext(connection) as context:
+            page = self.get(session_id=str(self.session.pk), page_size=2)
+        while True:
+            seen += self.ids(page)
+            if not page['next']:
+                break
+            page = self.get(page['next'])
+
+        expected = sorted(self.messages, key=lambda message: (message.sent_at, message.pk))
+        self.assertEqual(seen, [str(message.pk) for message in expected])
+        self.assertFalse(any('COUNT' in query['sql'].upper() for query in context.captured_queries))
+
+    def test_since_returns_only_newer_records(self):
+        page = self.get(session_id=str(self.session.pk))
+        token = page['since']
+        self.assertIsNotNone(token)
+
+        late = self.message(self.base + timedelta(minutes=5))
+        # Mais novo que a marca d'água: ainda pode estar no buffer de escrita
+        self.message(timezone.now())
+
+        page = self.get(session_id=str(self.session.pk), since=token)
+        self.assertEqual(self.ids(page), [str(late.pk)])
+        self.assertFalse(page['has_more'])
+
+        page = self.get(session_id=str(self.session.pk), since=page['since'])
+        self.assertEqual(page['results'], [])
+
+    def test_since_token_is_capped_at_high_water(self):
+        recent = self.message(timezone.now())
+
+        token = self.get(session_id=str(self.session.pk))['since']
+        # Registro do buffer gravado depois do token, com horário posterior à marca d'água
+        late = self.message(timezone.now() - timedelta(seconds=write_lag() - 1))
+
+        with mock.patch('apps.executions.pagination.write_lag', return_value=0):
+            page = self.get(session_id=str(self.session.pk), since=token)
+        self.assertEqual(set(self.ids(page)), {str(late.pk), str(recent.pk)})
+
+    def test_invalid_since(self):
+        with self.assertLogs('django.request', 'WARNING'):
+            response = self.client.get(self.url, {'since': 'não-é-token'})
+
+        self.assertEqual(response.status_code, 404)
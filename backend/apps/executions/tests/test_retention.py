@@ -0,0 +1,81 @@
+"""
+Testes da remoção em lotes das sessões expiradas
+"""
+from datetime import timedelta
+import time
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..models import ChatMessage, ChatSession, ExecutionLog, UserInput
+from ..retention import purge_expired_sessions
+from ..state import InMemorySessionStateBackend, SessionStateStore
+from .helpers import ENGINE_SETTINGS, GREETING_FLOW, chain, create_flow
+
+
+@override_settings(**ENGINE_SETTINGS)
+class PurgeExpiredSessionsTests(TestCase):
+
+    def setUp(self):
+        self.chatbot, self.flow = create_flow(GREETING_FLOW, chain(*GREETING_FLOW))
+        self.now = timezone.now()
+
+    def create_session(self, days_idle, chatbot=None):
+        session = ChatSession.objects.create(chatbot=chatbot or self.chatbot, flow=self.flow, user_id='u')
+        message = ChatMessage.objects.create(session=session, message_type='user', content={})
+        UserInput.objects.create(session=session, message=message, input_type='text', raw_value='x', processed_value='x')
+        ExecutionLog.objects.create(session=session, node_id='n', component_type='text', status='completed')
+        ChatSession.objects.filter(pk=session.pk).update(last_activity=self.now - timedelta(days=days_idle))
+        return session
+
+    def purge(self, store=None, **kwargs):
+        with mock.patch('apps.executions.retention.get_state_store', return_value=store):
+            return purge_expired_sessions(now=self.now, **kwargs)
+
+    def test_expired_sessions_are_removed_in_chunks(self):
+        expired = [self.create_session(100) for _ in range(5)]
+        kept = self.create_session(10)
+
+        counts = self.purge(chunk_size=2, default_days=90)
+
+        self.assertEqual(counts['executions.ChatSession'], 5)
+        self.assertEqual(counts['executions.ChatMessage'], 5)
+        self.assertEqual(counts['executions.UserInput'], 5)
+        self.assertEqual(list(ChatSession.objects.values_list('pk', flat=True)), [kept.pk])
+        self.assertFalse(ChatMessage.objects.filter(session__in=[session.pk for session in expired]).exists())
+
+    def test_chatbot_policy_overrides_default(self):
+        strict, _ = create_flow(GREETING_FLOW, chain(*GREETING_FLOW))
+        strict.retention_days = 7
+        strict.save()
+        self.create_session(10, chatbot=strict)
+        forever = self.create_session(1000)
+
+        with override_settings(EXECUTION_RETENTION={'DEFAULT_DAYS': None}):
+            counts = self.purge()
+
+        self.assertEqual(counts['executions.ChatSession'], 1)
+        self.assertEqual(list(ChatSession.objects.values_list('pk', flat=True)), [forever.pk])
+
+    def test_sessions_with_hot_state_are_kept(self):
+        store = SessionStateStore(InMemorySessionStateBackend())
+        live = [self.create_session(100) for _ in range(3)]
+        expired = self.create_session(100)
+        for session in live:
+            store.backend.set(session.pk, {'updated_at': time.time()}, 60)
+
+        # Lotes de uma sessão: o cursor passa pelas vivas sem voltar a elas
+        counts = self.purge(store, chunk_size=1, default_days=90)
+
+        self.assertEqual(counts['executions.ChatSession'], 1)
+        self.assertFalse(ChatSession.objects.filter(pk=expired.pk).exists())
+        self.assertEqual(ChatSession.objects.count(), 3)
+
+    def test_unavailable_state_backend_keeps_everything(self):
+        store = SessionStateStore(InMemorySessionStateBackend())
+        store._down_until = time.monotonic() + 60
+        self.create_session(100)
+
+        self.assertEqual(self.purge(store, default_days=90), {})
+        self.assertEqual(ChatSession.objects.count(), 1)
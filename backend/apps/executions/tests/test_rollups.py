@@ -0,0 +1,93 @@
+"""
+Testes dos agregados diários de execução e do dashboard
+"""
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..models import ChatMessage, ChatSession, ExecutionDailyRollup, RollupWatermark, UserInput
+from ..rollups import SAFETY_LAG, WATERMARK_NAME, refresh_daily_rollups
+from .helpers import GREETING_FLOW, chain, create_flow
+
+
+class DailyRollupTests(TestCase):
+
+    def setUp(self):
+        self.chatbot, self.flow = create_flow(GREETING_FLOW, chain(*GREETING_FLOW))
+
+    def create_session(self, status='active', input_type=None):
+        session = ChatSession.objects.create(
+            chatbot=self.chatbot, flow=self.flow, user_id='visitante', status=status, message_count=2
+        )
+        if input_type:
+            message = ChatMessage.objects.create(session=session, message_type='user', content={})
+            UserInput.objects.create(
+                session=session, message=message, input_type=input_type, raw_value='x', processed_value='x'
+            )
+        return session
+
+    def refresh(self, **kwargs):
+        return refresh_daily_rollups(now=timezone.now() + SAFETY_LAG + timedelta(seconds=1), **kwargs)
+
+    def test_refresh_aggregates_day(self):
+        self.create_session('completed', input_type='email')
+        self.create_session('abandoned', input_type='email')
+        self.create_session()
+
+        self.assertEqual(self.refresh(), 1)
+
+        rollup = ExecutionDailyRollup.objects.get(chatbot=self.chatbot)
+        self.assertEqual(rollup.owner_id, self.chatbot.owner_id)
+        self.assertEqual((rollup.sessions_started, rollup.sessions_completed, rollup.sessions_abandoned), (3, 1, 1))
+        self.assertEqual(rollup.sessions_active, 1)
+        self.assertEqual(rollup.message_count, 6)
+        self.assertEqual(rollup.input_types, {'email': 2})
+
+    def test_refresh_only_touches_changed_days(self):
+        now = timezone.now()
+        session = self.create_session()
+        ChatSession.objects.filter(pk=session.pk).update(last_activity=now - timedelta(minutes=10))
+        self.assertEqual(refresh_daily_rollups(now=now - timedelta(minutes=5)), 1)
+        self.assertTrue(RollupWatermark.objects.filter(name=WATERMARK_NAME).exists())
+
+        self.assertEqual(refresh_daily_rollups(now=now - timedelta(minutes=4)), 0)
+
+        # Alteração depois da marca: o dia volta a ser recalculado
+        ChatSession.objects.filter(pk=session.pk).update(status='completed', last_activity=now - timedelta(minutes=3))
+        self.assertEqual(refresh_daily_rollups(now=now), 1)
+        self.assertEqual(ExecutionDailyRollup.objects.get(chatbot=self.chatbot).sessions_completed, 1)
+
+    def test_recent_changes_wait_for_safety_lag(self):
+        self.create_session()
+
+        self.assertEqual(refresh_daily_rollups(), 0)
+        self.assertFalse(ExecutionDailyRollup.objects.exists())
+
+
+class ExecutionDashboardTests(TestCase):
+
+    def setUp(self):
+        self.chatbot, _ = create_flow(GREETING_FLOW, chain(*GREETING_FLOW))
+        self.client = APIClient()
+        self.client.force_authenticate(self.chatbot.owner)
+        today = timezone.localdate()
+        for days_ago, started, completed in ((0, 5, 2), (1, 3, 3), (60, 10, 10)):
+            ExecutionDailyRollup.objects.create(
+                owner=self.chatbot.owner, chatbot=self.chatbot, day=today - timedelta(days=days_ago),
+                sessions_started=started, sessions_completed=completed, input_types={'text': started},
+            )
+
+    def test_dashboard_reads_rollups_in_two_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/executions/dashboard/')
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['total_sessions'], 18)
+        self.assertEqual(data['completed_sessions'], 15)
+        self.assertEqual(data['active_sessions'], 3)
+        self.assertEqual(data['sessions_by_chatbot'], [{'chatbot__name': self.chatbot.name, 'count': 18}])
+        self.assertEqual([row['count'] for row in data['recent_activity']], [3, 5])
+        self.assertEqual(data['common_input_types'], [{'input_type': 'text', 'count': 8}])
@@ -0,0 +1,91 @@
+"""
+Testes do sandbox e do pool de processos dos nós `script`
+"""
+from django.test import SimpleTestCase
+
+from .. import sandbox
+from ..scripts import ScriptError, ScriptPool, ScriptTimeout
+
+
+class SandboxValidationTests(SimpleTestCase):
+
+    def assertRejected(self, source, message):
+        with self.assertRaisesMessage(sandbox.ScriptRejected, message):
+            sandbox.validate(source)
+
+    def test_accepts_plain_script(self):
+        self.assertIsNotNone(sandbox.validate('result = math.sqrt(16) + len(variables)'))
+
+    def test_rejects_imports(self):
+        self.assertRejected('import os', 'Imports não são permitidos')
+        self.assertRejected('from os import path', 'Imports não são permitidos')
+
+    def test_rejects_private_names(self):
+        self.assertRejected('x = ().__class__', 'Nome não permitido: __class__')
+        self.assertRejected('_secret = 1', 'Nome não permitido: _secret')
+
+    def test_rejects_blocked_attributes(self):
+        self.assertRejected("'{0.x}'.format(1)", 'Nome não permitido: format')
+        self.assertRejected('g = (x for x in []).gi_frame', 'Nome não permitido: gi_frame')
+
+    def test_rejects_global_and_oversized_scripts(self):
+        self.assertRejected('def main():\n    global x', 'global/nonlocal não são permitidos')
+        self.assertRejected('x = 1\n' * sandbox.MAX_SOURCE_LENGTH, 'tamanho máximo')
+        self.assertRejected('x = ', 'Erro de sintaxe na linha 1')
+
+
+class ScriptPoolTests(SimpleTestCase):
+    # Um pool por classe: criar os processos worker é caro
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.pool = ScriptPool(workers=1, queue_size=1, timeout=5.0, max_timeout=5.0, cpu_seconds=1, memory_mb=256)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+        super().tearDownClass()
+
+    def test_returns_result_and_output(self):
+        result, output = self.pool.run('print("oi", nome)\ndef main():\n    return {"dobro": valor * 2}', {
+            'nome': 'Ana', 'valor': 21,
+        })
+
+        self.assertEqual(result, {'dobro': 42})
+        self.assertEqual(output, ['oi Ana'])
+
+    def test_script_errors(self):
+        with self.assertRaisesMessage(ScriptError, 'ZeroDivisionError'):
+            self.pool.run('result = 1 / 0')
+        with self.assertRaisesMessage(ScriptError, 'Imports não são permitidos'):
+            self.pool.run('import os')
+        with self.assertRaisesMessage(ScriptError, 'Resultado excede o tamanho máximo'):
+            self.pool.run(f'result = "x" * {sandbox.MAX_RESULT_BYTES}')
+
+    def test_cpu_limit(self):
+        with self.assertRaisesMessage(ScriptError, 'Limite de tempo de CPU excedido'):
+            self.pool.run('while True:\n    pass')
+        # O mesmo worker continua atendendo
+        self.assertEqual(self.pool.run('result = 1')[0], 1)
+
+    def test_memory_limit(self):
+        with self.assertRaisesMessage(ScriptError, 'Limite de memória excedido'):
+            self.pool.run('result = len([0] * (10 ** 9))')
+        self.assertEqual(self.pool.run('result = 2')[0], 2)
+
+    def test_wall_clock_timeout_replaces_worker(self):
+        pool = ScriptPool(workers=1, queue_size=0, timeout=0.5, cpu_seconds=30, memory_mb=256)
+        self.addCleanup(pool.close)
+
+        with self.assertRaises(ScriptTimeout):
+            pool.run('while True:\n    pass')
+        self.assertEqual(pool.run('result = 3')[0], 3)
+
+    def test_dead_worker_is_replaced(self):
+        worker = self.pool._idle.get()
+        worker.process.kill()
+        worker.process.join()
+        self.pool._idle.put(worker)
+
+        self.assertEqual(self.pool.run('result = 4')[0], 4)
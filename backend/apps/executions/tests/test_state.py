@@ -0,0 +1,109 @@
+"""
+Testes do estado quente das sessões e dos checkpoints na ChatSession
+"""
+from datetime import timedelta
+import time
+
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import ChatSession
+from ..rollups import SAFETY_LAG
+from ..state import InMemorySessionStateBackend, SessionStateStore
+from .helpers import GREETING_FLOW, chain, create_flow
+
+
+class BackendDown(InMemorySessionStateBackend):
+    errors = (ConnectionError,)
+
+    def _fail(self, *args):
+        raise ConnectionError('backend fora do ar')
+
+    get = set = delete = _fail
+
+
+class SessionStateStoreTests(TestCase):
+
+    def setUp(self):
+        chatbot, flow = create_flow(GREETING_FLOW, chain(*GREETING_FLOW))
+        self.session = ChatSession.objects.create(chatbot=chatbot, flow=flow, user_id='visitante')
+        self.backend = InMemorySessionStateBackend()
+        self.store = SessionStateStore(self.backend, checkpoint_every=3, idle_timeout=300, retry_after=30)
+
+    def advance(self, session, state, **fields):
+        for field, value in fields.items():
+            setattr(session, field, value)
+        return self.store.save(session, state)
+
+    def db(self):
+        return ChatSession.objects.get(pk=self.session.pk)
+
+    def test_steps_stay_hot_until_checkpoint(self):
+        state = self.store.load(self.session)
+
+        self.assertFalse(self.advance(self.session, state, current_node_id='a', variables={'x': 1}))
+        self.assertFalse(self.advance(self.session, state, current_node_id='b'))
+        self.assertIsNone(self.db().current_node_id)
+
+        # Uma instância recarregada do banco enxerga o estado quente
+        reloaded = self.db()
+        self.store.load(reloaded)
+        self.assertEqual((reloaded.current_node_id, reloaded.variables), ('b', {'x': 1}))
+
+        self.assertTrue(self.advance(self.session, state, current_node_id='c'))
+        self.assertEqual(self.db().current_node_id, 'c')
+
+    def test_status_change_checkpoints(self):
+        state = self.store.load(self.session)
+
+        self.assertTrue(self.advance(self.session, state, status='waiting'))
+
+        self.assertEqual(self.db().status, 'waiting')
+
+    def test_finished_session_leaves_backend(self):
+        state = self.store.load(self.session)
+        self.advance(self.session, state, current_node_id='a')
+
+        self.assertTrue(self.advance(self.session, state, status='completed', end_time=timezone.now()))
+
+        self.assertEqual(self.db().status, 'completed')
+        self.assertIsNone(self.backend.get(self.session.pk))
+
+    def test_backend_outage_falls_back_to_database(self):
+        store = SessionStateStore(BackendDown(), checkpoint_every=10, retry_after=30)
+        with self.assertLogs('apps.executions.state', 'WARNING'):
+            state = store.load(self.session)
+        self.assertFalse(store.available)
+
+        self.session.current_node_id = 'a'
+        self.assertTrue(store.save(self.session, state))
+
+        self.assertEqual(self.db().current_node_id, 'a')
+
+    def test_stale_hot_state_is_ignored(self):
+        state = self.store.load(self.session)
+        self.advance(self.session, state, current_node_id='hot')
+        # Alteração direta no banco depois do último passo
+        ChatSession.objects.filter(pk=self.session.pk).update(
+            current_node_id='db', last_activity=timezone.now() + timedelta(seconds=5)
+        )
+
+        reloaded = self.db()
+        self.store.load(reloaded)
+
+        self.assertEqual(reloaded.current_node_id, 'db')
+
+    def test_idle_checkpoint_is_not_behind_rollups(self):
+        state = self.store.load(self.session)
+        self.advance(self.session, state, current_node_id='a')
+        data = self.backend.get(self.session.pk)
+        data['updated_at'] = time.time() - 3600
+        self.backend.set(self.session.pk, data, 60)
+        started = timezone.now()
+
+        self.assertEqual(self.store.checkpoint_idle(), 1)
+
+        session = self.db()
+        self.assertEqual(session.current_node_id, 'a')
+        self.assertGreaterEqual(session.last_activity, started - SAFETY_LAG - timedelta(seconds=1))
+        self.assertEqual(self.store.live_among([self.session.pk]), set())
@@ -0,0 +1,59 @@
+"""
+Testes das estatísticas de sessões
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..models import ChatSession
+from .helpers import GREETING_FLOW, chain, create_flow
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class SessionStatsTests(TestCase):
+    url = '/api/executions/sessions/stats/'
+
+    def setUp(self):
+        cache.clear()
+        self.chatbot, self.flow = create_flow(GREETING_FLOW, chain(*GREETING_FLOW))
+        self.client = APIClient()
+        self.client.force_authenticate(self.chatbot.owner)
+
+        now = timezone.now()
+        for status, minutes in (('completed', 2), ('completed', 4), ('abandoned', None), ('active', None)):
+            session = ChatSession.objects.create(chatbot=self.chatbot, flow=self.flow, user_id='u', status=status)
+            if minutes:
+                ChatSession.objects.filter(pk=session.pk).update(end_time=session.start_time + timedelta(minutes=minutes))
+        old = ChatSession.objects.create(chatbot=self.chatbot, flow=self.flow, user_id='u')
+        ChatSession.objects.filter(pk=old.pk).update(start_time=now - timedelta(days=40))
+
+    def test_stats_in_one_aggregate_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        data = response.json()
+        self.assertEqual(data['total_sessions'], 5)
+        self.assertEqual(data['active_sessions'], 2)
+        self.assertEqual(data['completed_sessions'], 2)
+        self.assertEqual(data['abandoned_sessions'], 1)
+        self.assertEqual(data['sessions_this_week'], 4)
+        self.assertAlmostEqual(data['avg_duration_seconds'], 180, places=3)
+
+        # Resultado em cache por dono e filtros
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).json(), data)
+
+    def test_filters(self):
+        since = (timezone.localdate() - timedelta(days=7)).isoformat()
+
+        response = self.client.get(self.url, {'start_date': since, 'chatbot': str(self.chatbot.pk)})
+
+        self.assertEqual(response.json()['total_sessions'], 4)
+
+    def test_invalid_filters(self):
+        for params in ({'start_date': 'ontem'}, {'chatbot': 'x'}):
+            with self.assertLogs('django.request', 'WARNING'):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
@@ -0,0 +1,36 @@
+"""
+Testes da interpolação de variáveis nos textos dos nós
+"""
+from django.test import SimpleTestCase
+
+from ..engine import templates
+
+
+class TemplateTests(SimpleTestCase):
+
+    def test_splits_literals_and_names(self):
+        template = templates.parse('Olá, {{nome}}! Você tem {{idade}} anos')
+
+        self.assertEqual(template.literals, ('Olá, ', '! Você tem ', ' anos'))
+        self.assertEqual(template.variables, ('nome', 'idade'))
+        self.assertFalse(template.is_static)
+        self.assertIs(templates.parse('Olá, {{nome}}! Você tem {{idade}} anos'), template)
+
+    def test_render(self):
+        text = '{{nome}} tem {{idade}} anos'
+
+        self.assertEqual(templates.render(text, {'nome': 'Ana', 'idade': 30}), 'Ana tem 30 anos')
+        # Variáveis ausentes ou vazias mantêm o marcador
+        self.assertEqual(templates.render(text, {'nome': ''}), '{{nome}} tem {{idade}} anos')
+        self.assertEqual(templates.render(text, {'nome': 0, 'idade': False}), '0 tem False anos')
+
+    def test_static_and_empty_text(self):
+        template = templates.parse('Sem variáveis { {x} }')
+
+        self.assertTrue(template.is_static)
+        self.assertEqual(template.render({'x': 1}), 'Sem variáveis { {x} }')
+        self.assertEqual(templates.render(None, {}), '')
+        self.assertEqual(templates.render(42, {}), '42')
+
+    def test_choice_field(self):
+        self.assertEqual(templates.choice_field(2), 'choices.2.label')
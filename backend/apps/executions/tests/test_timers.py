@@ -0,0 +1,113 @@
+"""
+Testes dos timers duráveis dos nós `delay`
+"""
+from datetime import timedelta
+
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from ..engine import start_session
+from ..models import ChatMessage, ChatSession, ScheduledTimer
+from ..timers import TimerRunner, TimerWheel, claim_timers
+from .helpers import DELAY_FLOW, ENGINE_SETTINGS, chain, create_flow
+
+
+class TimerWheelTests(SimpleTestCase):
+
+    def test_expires_on_due_tick(self):
+        wheel = TimerWheel(tick=1, slots=4, levels=2, start=0)
+        wheel.add('a', 3)
+        wheel.add('b', 10)
+
+        self.assertEqual(wheel.advance(2), [])
+        self.assertEqual(wheel.advance(3), ['a'])
+        self.assertEqual(wheel.advance(9), [])
+        self.assertEqual(wheel.advance(10), ['b'])
+        self.assertEqual(len(wheel), 0)
+
+    def test_overflow_cascades_down(self):
+        wheel = TimerWheel(tick=1, slots=4, levels=2, start=0)
+        wheel.add('far', 100)
+
+        self.assertEqual(wheel.advance(99), [])
+        self.assertEqual(wheel.advance(100), ['far'])
+
+    def test_cancel_and_reschedule(self):
+        wheel = TimerWheel(tick=1, slots=4, levels=2, start=0)
+        wheel.add('cancelled', 5)
+        wheel.add('moved', 5)
+        wheel.cancel('cancelled')
+        wheel.add('moved', 7)
+
+        self.assertEqual(wheel.advance(6), [])
+        self.assertEqual(wheel.advance(7), ['moved'])
+
+    def test_past_due_fires_on_next_tick(self):
+        wheel = TimerWheel(tick=1, slots=4, levels=2, start=10)
+        wheel.add('late', 2)
+
+        self.assertEqual(wheel.advance(10), ['late'])
+
+
+@override_settings(**ENGINE_SETTINGS)
+class ClaimTimersTests(TestCase):
+
+    def setUp(self):
+        chatbot, flow = create_flow(DELAY_FLOW, chain(*DELAY_FLOW))
+        self.session = ChatSession.objects.create(chatbot=chatbot, flow=flow, user_id='visitante', status='waiting')
+        self.now = timezone.now()
+
+    def timer(self, seconds):
+        return ScheduledTimer.objects.create(
+            session=self.session, node_id='wait', due_at=self.now + timedelta(seconds=seconds)
+        )
+
+    def test_claims_only_due_timers_once(self):
+        due = self.timer(-1)
+        soon = self.timer(5)
+        self.timer(600)
+
+        claimed = claim_timers(self.now + timedelta(seconds=10), batch_size=10, lease=60, now=self.now)
+
+        self.assertEqual({timer.pk for timer in claimed}, {due.pk, soon.pk})
+        self.assertEqual(claim_timers(self.now + timedelta(seconds=10), 10, 60, now=self.now), [])
+
+    def test_expired_claim_is_released(self):
+        due = self.timer(-1)
+        claim_timers(self.now, batch_size=10, lease=60, now=self.now)
+
+        later = self.now + timedelta(seconds=120)
+        self.assertEqual([timer.pk for timer in claim_timers(later, 10, 60, now=later)], [due.pk])
+
+    def test_batch_size(self):
+        for seconds in (-3, -2, -1):
+            self.timer(seconds)
+
+        self.assertEqual(len(claim_timers(self.now, batch_size=2, lease=60, now=self.now)), 2)
+
+
+@override_settings(**ENGINE_SETTINGS)
+class TimerRunnerTests(TransactionTestCase):
+    # Os timers disparam nas threads do executor, com conexões próprias
+
+    def test_run_once_resumes_due_sessions(self):
+        chatbot, flow = create_flow(DELAY_FLOW, chain(*DELAY_FLOW))
+        session = start_session(chatbot, flow, 'visitante').session
+        ScheduledTimer.objects.filter(session=session).update(due_at=timezone.now() - timedelta(seconds=1))
+
+        fired = TimerRunner(tick=0.01, workers=1).run(once=True)
+
+        self.assertEqual(fired, 1)
+        session = ChatSession.objects.get(pk=session.pk)
+        self.assertEqual(session.status, 'completed')
+        self.assertFalse(ScheduledTimer.objects.exists())
+        self.assertTrue(ChatMessage.objects.filter(session=session, node_id='after').exists())
+
+    def test_stale_timer_is_dropped(self):
+        chatbot, flow = create_flow(DELAY_FLOW, chain(*DELAY_FLOW))
+        session = ChatSession.objects.create(chatbot=chatbot, flow=flow, user_id='visitante', status='completed')
+        ScheduledTimer.objects.create(session=session, node_id='wait', due_at=timezone.now())
+
+        self.assertEqual(TimerRunner(tick=0.01, workers=1).run(once=True), 1)
+        self.assertFalse(ScheduledTimer.objects.exists())
+        self.assertEqual(ChatSession.objects.get(pk=session.pk).status, 'completed')
@@ -0,0 +1,123 @@
+"""
+Testes da entrega assíncrona dos webhooks
+"""
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+import httpx
+
+from ..models import ChatSession, WebhookEvent
+from ..webhooks import WebhookDeliveryWorker, backoff_delay, claim_due_events
+from .helpers import GREETING_FLOW, chain, create_flow
+
+
+class BackoffDelayTests(SimpleTestCase):
+
+    def test_exponential_with_jitter_and_cap(self):
+        for retry_count, ceiling in ((1, 30), (2, 60), (3, 120), (10, 3600)):
+            for _ in range(20):
+                delay = backoff_delay(retry_count, 30, 3600)
+                self.assertGreaterEqual(delay, ceiling / 2)
+                self.assertLessEqual(delay, ceiling)
+
+
+class WebhookDeliveryTests(TestCase):
+
+    def setUp(self):
+        chatbot, flow = create_flow(GREETING_FLOW, chain(*GREETING_FLOW))
+        self.session = ChatSession.objects.create(chatbot=chatbot, flow=flow, user_id='u')
+        self.worker = WebhookDeliveryWorker(backoff_base=30, backoff_max=3600)
+
+    def create_event(self, url='https://hooks.example.com/x', **fields):
+        return WebhookEvent.objects.create(
+            session=self.session, event_type='teste', webhook_url=url, payload={'a': 1}, **fields
+        )
+
+    def deliver(self, outcome):
+        """Roda um ciclo do worker com o resultado de arequest simulado (ou {url: status})"""
+        async def arequest(method, url, **kwargs):
+            result = outcome[url] if isinstance(outcome, dict) else outcome
+            if isinstance(result, Exception):
+                raise result
+            return httpx.Response(result, json={'ok': result < 300}, request=httpx.Request(method, url))
+
+        with mock.patch('apps.executions.webhooks.http.arequest', side_effect=arequest) as patched:
+            processed = async_to_sync(self.worker.run)(once=True)
+        return processed, patched
+
+    def test_success_marks_sent(self):
+        event = self.create_event()
+
+        processed, patched = self.deliver(200)
+
+        self.assertEqual(processed, 1)
+        self.assertEqual(patched.call_args.kwargs['json'], {'a': 1})
+        event.refresh_from_db()
+        self.assertEqual((event.status, event.response_status, event.response_data), ('sent', 200, {'ok': True}))
+        self.assertIsNotNone(event.sent_at)
+        self.assertIsNone(event.next_retry)
+
+    def test_server_error_is_retried_with_backoff(self):
+        event = self.create_event()
+        before = timezone.now()
+
+        self.deliver(503)
+
+        event.refresh_from_db()
+        self.assertEqual((event.status, event.retry_count, event.error_message), ('retrying', 1, 'HTTP 503'))
+        self.assertGreaterEqual(event.next_retry, before + timedelta(seconds=15))
+        self.assertLessEqual(event.next_retry, timezone.now() + timedelta(seconds=30))
+        # Ainda não venceu: o próximo ciclo não reenvia
+        self.assertEqual(self.deliver(200)[0], 0)
+
+    def test_client_errors(self):
+        rejected = self.create_event('https://hooks.example.com/rejeita')
+        throttled = self.create_event('https://hooks.example.com/limita')
+
+        with self.assertLogs('apps.executions.webhooks', 'WARNING'):
+            self.deliver({rejected.webhook_url: 400, throttled.webhook_url: 429})
+
+        rejected.refresh_from_db()
+        throttled.refresh_from_db()
+        self.assertEqual((rejected.status, rejected.retry_count), ('failed', 0))
+        self.assertEqual((throttled.status, throttled.retry_count), ('retrying', 1))
+
+    def test_network_error_until_retries_exhausted(self):
+        event = self.create_event(max_retries=1)
+
+        self.deliver(httpx.ConnectError('recusada'))
+        event.refresh_from_db()
+        self.assertEqual((event.status, event.retry_count, event.error_message), ('retrying', 1, 'recusada'))
+
+        WebhookEvent.objects.filter(pk=event.pk).update(next_retry=timezone.now())
+        with self.assertLogs('apps.executions.webhooks', 'WARNING'):
+            self.deliver(httpx.ConnectError('recusada'))
+        event.refresh_from_db()
+        self.assertEqual(event.status, 'failed')
+        self.assertIsNone(event.next_retry)
+
+    def test_unexpected_error_is_permanent(self):
+        event = self.create_event()
+
+        with self.assertLogs('apps.executions.webhooks', 'ERROR'):
+            self.deliver(ValueError('URL inválida'))
+
+        event.refresh_from_db()
+        self.assertEqual(event.status, 'failed')
+        self.assertIn('ValueError', event.error_message)
+
+    def test_claim_reserves_only_due_events(self):
+        now = timezone.now()
+        due = self.create_event()
+        self.create_event(next_retry=now + timedelta(minutes=5))
+        self.create_event(status='sent')
+
+        claimed = claim_due_events(10, claim_timeout=300, now=now)
+
+        self.assertEqual([event.pk for event in claimed], [due.pk])
+        due.refresh_from_db()
+        self.assertEqual(due.next_retry, now + timedelta(seconds=300))
+        self.assertEqual(claim_due_events(10, claim_timeout=300, now=now), [])
@@ -0,0 +1,246 @@
+"""
+Timers duráveis das sessões pausadas por nós `delay`
+
+Os timers ficam na tabela ScheduledTimer, indexada por due_at, e sobrevivem
+a reinícios. Cada worker (comando run_timers) reserva periodicamente os que
+vencem dentro do horizonte e os coloca em uma roda de timers hierárquica em
+memória, que dispara cada um no seu tick sem varrer a tabela. Uma reserva
+vencida (worker que morreu) devolve o timer para os demais workers.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .engine.runtime import resume_timer
+from .models import ChatSession, ScheduledTimer
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'SERVER_DELAY_MS': 5000,
+    'TICK': 0.5,
+    # Timers que vencem dentro deste intervalo (s) são carregados na roda
+    'HORIZON': 60,
+    'LOAD_INTERVAL': 5,
+    'BATCH_SIZE': 1000,
+    # Folga da reserva além do horizonte antes de outro worker assumir
+    'LEASE': 60,
+    'WORKERS': 8,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': 30,
+}
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'SESSION_TIMERS', {})}
+
+
+class TimerWheel:
+    """
+    Roda de timers hierárquica.
+
+    O nível 0 tem `slots` posições de `tick` segundos e cada nível acima
+    cobre `slots` voltas do anterior. Inserir e expirar custam O(1); os
+    timers dos níveis altos descem (cascata) quando a roda de baixo completa
+    a volta. Timers além do último nível aguardam em `overflow`.
+    """
+
+    def __init__(self, tick=0.5, slots=64, levels=3, start=None):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self._wheels = [[[] for _ in range(slots)] for _ in range(levels)]
+        self._overflow = []
+        # Próximo tick ainda não processado
+        self._current = int((time.time() if start is None else start) / tick)
+        self._due = {}
+
+    def __len__(self):
+        return len(self._due)
+
+    def __contains__(self, key):
+        return key in self._due
+
+    def add(self, key, due):
+        """Agenda `key` para o timestamp `due`; reagendar substitui o anterior"""
+        due_tick = max(int(math.ceil(due / self.tick)), self._current)
+        self._due[key] = due_tick
+        self._place(key, due_tick)
+
+    def cancel(self, key):
+        # As entradas nos slots são descartadas ao expirar
+        self._due.pop(key, None)
+
+    def _place(self, key, due_tick):
+        delta = due_tick - self._current
+        span = 1
+        for level in range(self.levels):
+            if delta < span * self.slots:
+                self._wheels[level][(due_tick // span) % self.slots].append((key, due_tick))
+                return
+            span *= self.slots
+        self._overflow.append((key, due_tick))
+
+    def _cascade(self):
+        current = self._current
+        top_span = self.slots ** self.levels
+        if current % top_span == 0 and self._overflow:
+            entries, self._overflow = self._overflow, []
+            for entry in entries:
+                self._place(*entry)
+        for level in range(self.levels - 1, 0, -1):
+            span = self.slots ** level
+            if current % span:
+                continue
+            slot = self._wheels[level][(current // span) % self.slots]
+            entries = slot[:]
+            slot.clear()
+            for entry in entries:
+                self._place(*entry)
+
+    def advance(self, now):
+        """Processa os ticks até `now` e retorna as chaves vencidas"""
+        target = int(now / self.tick)
+        expired = []
+        while self._current <= target:
+            self._cascade()
+            slot = self._wheels[0][self._current % self.slots]
+            if slot:
+                entries = slot[:]
+                slot.clear()
+                for key, due_tick in entries:
+                    if self._due.get(key) == due_tick:
+                        del self._due[key]
+                        expired.append(key)
+            self._current += 1
+        return expired
+
+
+def claim_timers(until, batch_size, lease, now=None):
+    """
+    Reserva até `batch_size` timers que vencem até `until` para este worker.
+
+    Os registros são travados com SKIP LOCKED, então workers concorrentes
+    pegam lotes disjuntos.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        timers = list(
+            ScheduledTimer.objects.select_for_update(skip_locked=True)
+            .filter(due_at__lte=until)
+            .filter(Q(claimed_until__isnull=True) | Q(claimed_until__lt=now))
+            .order_by('due_at')[:batch_size]
+        )
+        if timers:
+            ScheduledTimer.objects.filter(pk__in=[timer.pk for timer in timers]).update(
+                claimed_until=until + timedelta(seconds=lease)
+            )
+    return timers
+
+
+class TimerRunner:
+    """
+    Carrega os timers próximos do vencimento na roda e retoma as sessões
+    """
+
+    def __init__(self, tick=0.5, horizon=60, load_interval=5, batch_size=1000, lease=60,
+                 workers=8, max_attempts=5, retry_delay=30):
+        self.tick = tick
+        self.horizon = horizon
+        self.load_interval = load_interval
+        self.batch_size = batch_size
+        self.lease = lease
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._stopped = threading.Event()
+        self._timers = {}
+
+    @classmethod
+    def from_settings(cls, **overrides):
+        config = _config()
+        options = {
+            'tick': config['TICK'],
+            'horizon': config['HORIZON'],
+            'load_interval': config['LOAD_INTERVAL'],
+            'batch_size': config['BATCH_SIZE'],
+            'lease': config['LEASE'],
+            'workers': config['WORKERS'],
+            'max_attempts': config['MAX_ATTEMPTS'],
+            'retry_delay': config['RETRY_DELAY'],
+        }
+        options.update({key: value for key, value in overrides.items() if value is not None})
+        return cls(**options)
+
+    def stop(self):
+        self._stopped.set()
+
+    def load(self, wheel, horizon):
+        """Reserva os timers que vencem dentro do horizonte e os coloca na roda"""
+        now = timezone.now()
+        timers = claim_timers(now + timedelta(seconds=horizon), self.batch_size, self.lease, now=now)
+        for timer in timers:
+            self._timers[timer.pk] = timer
+            wheel.add(timer.pk, timer.due_at.timestamp())
+        return len(timers)
+
+    def run(self, once=False):
+        """
+        Dispara timers até ser parado; com `once`, só os já vencidos.
+        Retorna quantos timers foram disparados.
+        """
+        wheel = TimerWheel(tick=self.tick)
+        fired = 0
+        next_load = 0
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='session-timer') as executor:
+            try:
+                while not self._stopped.is_set():
+                    now = time.time()
+                    if now >= next_load:
+                        loaded = self.load(wheel, 0 if once else self.horizon)
+                        # Lote cheio: ainda há timers no horizonte, recarrega no próximo ciclo
+                        next_load = now if loaded >= self.batch_size else now + self.load_interval
+                        if once and not loaded and not wheel:
+                            break
+
+                    for key in wheel.advance(now):
+                        executor.submit(self.fire, self._timers.pop(key))
+                        fired += 1
+
+                    if not once:
+                        self._stopped.wait(self.tick)
+            finally:
+                close_old_connections()
+        return fired
+
+    def fire(self, timer):
+        """Retoma a sessão do timer; falhas inesperadas são tentadas de novo depois"""
+        close_old_connections()
+        try:
+            session = ChatSession.objects.select_related('flow').filter(pk=timer.session_id).first()
+            if session is not None:
+                # O passo retomado é publicado pelo runtime no grupo da sessão
+                resume_timer(session, timer.node_id)
+            ScheduledTimer.objects.filter(pk=timer.pk).delete()
+        except Exception:
+            logger.exception('Falha ao retomar a sessão %s pelo timer %s', timer.session_id, timer.pk)
+            if timer.attempts + 1 >= self.max_attempts:
+                ScheduledTimer.objects.filter(pk=timer.pk).delete()
+            else:
+                ScheduledTimer.objects.filter(pk=timer.pk).update(
+                    attempts=F('attempts') + 1,
+                    claimed_until=None,
+                    due_at=timezone.now() + timedelta(seconds=self.retry_delay),
+                )
+            return
+        finally:
+            close_old_connections()
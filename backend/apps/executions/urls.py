@@ -7,6 +7,8 @@ from .views import (
     ExecutionLogViewSet,
     WebhookEventViewSet,
     UserInputViewSet,
+    PublicChatSessionStartView,
+    PublicChatSessionStepView,
     execution_dashboard,
 )
 
@@ -26,4 +28,8 @@ urlpatterns = [
     
     # Dashboard
     path('dashboard/', execution_dashboard, name='execution-dashboard'),
+    
+    # Execução pública das sessões de chat
+    path('public/<uuid:chatbot_id>/sessions/', PublicChatSessionStartView.as_view(), name='public-session-start'),
+    path('public/sessions/<uuid:session_id>/step/', PublicChatSessionStepView.as_view(), name='public-session-step'),
 ] 
\ No newline at end of file
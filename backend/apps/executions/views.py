@@ -2,31 +2,53 @@ from rest_framework import generics, permissions, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
-from django.db.models import Count, Avg, Q
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Avg, DurationField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from datetime import timedelta
+from django.utils.dateparse import parse_date
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+import uuid
 from drf_spectacular.utils import extend_schema
 
-from .models import ChatSession, ChatMessage, ExecutionLog, WebhookEvent, UserInput
+from apps.chatbots.analytics import SESSION_COMPLETED, record_events
+from apps.chatbots.models import Chatbot
+from .engine import EngineError, start_session, step
+from .models import ChatSession, ChatMessage, ExecutionLog, WebhookEvent, UserInput, ExecutionDailyRollup
+from .pagination import TimestampCursorPagination
 from .serializers import (
     ChatSessionSerializer,
     ChatMessageSerializer,
     ExecutionLogSerializer,
     WebhookEventSerializer,
     UserInputSerializer,
+    PublicChatSessionStartSerializer,
+    ChatStepSerializer,
 )
+from .state import get_state_store
 
 
 class ChatSessionViewSet(ModelViewSet):
     """ViewSet para gerenciamento de sessões de chat"""
     serializer_class = ChatSessionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TimestampCursorPagination
     
     def get_queryset(self):
         # Filtrar sessões dos chatbots do usuário
-        return ChatSession.objects.filter(
-            chatbot__owner=self.request.user
+        queryset = ChatSession.objects.filter(
+            owner=self.request.user
         ).order_by('-start_time')
+        if self.action == 'list':
+            # Subconsulta correlacionada: conta só as linhas da página
+            messages = ChatMessage.objects.filter(session=OuterRef('pk')).order_by().values('session')
+            queryset = queryset.select_related('chatbot', 'flow').annotate(
+                messages_count=Coalesce(Subquery(messages.annotate(count=Count('pk')).values('count')), 0)
+            )
+        return queryset
     
     @extend_schema(
         summary="Listar sessões de chat",
@@ -65,6 +87,9 @@ class ChatSessionViewSet(ModelViewSet):
     )
     def finish(self, request, pk=None):
         session = self.get_object()
+        state_store = get_state_store()
+        if state_store:
+            state_store.load(session)
         
         if session.status != 'active':
             return Response(
@@ -76,6 +101,11 @@ class ChatSessionViewSet(ModelViewSet):
         session.end_time = timezone.now()
         session.save()
         
+        # O estado quente não pode sobrescrever a finalização feita no banco
+        if state_store:
+            state_store.discard(session.pk)
+        record_events([(session.chatbot_id, SESSION_COMPLETED, session.user_id, 1, None)])
+        
         serializer = self.get_serializer(session)
         return Response({
             'message': 'Sessão finalizada com sucesso.',
@@ -85,76 +115,97 @@ class ChatSessionViewSet(ModelViewSet):
     @action(detail=False, methods=['get'])
     @extend_schema(
         summary="Estatísticas de sessões",
-        description="Retorna estatísticas das sessões do usuário",
+        description="Retorna estatísticas das sessões do usuário, com filtros opcionais start_date, end_date (AAAA-MM-DD) e chatbot",
     )
     def stats(self, request):
-        queryset = self.get_queryset()
+        start_date = request.query_params.get('start_date')
+        end_date = request.query_params.get('end_date')
+        chatbot_id = request.query_params.get('chatbot')
         
-        # Estatísticas básicas
-        total_sessions = queryset.count()
-        active_sessions = queryset.filter(status='active').count()
-        completed_sessions = queryset.filter(status='completed').count()
-        abandoned_sessions = queryset.filter(status='abandoned').count()
+        filters = {}
+        try:
+            if start_date:
+                filters['start_time__date__gte'] = _parse_date_param(start_date)
+            if end_date:
+                filters['start_time__date__lte'] = _parse_date_param(end_date)
+            if chatbot_id:
+                filters['chatbot_id'] = uuid.UUID(chatbot_id)
+        except ValueError:
+            return Response(
+                {'error': 'Filtros inválidos. Use datas no formato AAAA-MM-DD e um ID de chatbot válido.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Duração média
-        completed_queryset = queryset.filter(status='completed', end_time__isnull=False)
-        avg_duration = 0
-        if completed_queryset.exists():
-            durations = [session.duration() for session in completed_queryset]
-            avg_duration = sum(durations) / len(durations)
+        cache_key = 'execution_stats:{}:{}:{}:{}'.format(
+            request.user.pk, start_date or '', end_date or '', chatbot_id or ''
+        )
+        data = cache.get(cache_key)
+        if data is None:
+            data = self._compute_stats(self.get_queryset().filter(**filters))
+            cache.set(cache_key, data, settings.EXECUTION_STATS_CACHE_TIMEOUT)
         
-        # Sessões por período
-        today = timezone.now().date()
-        sessions_today = queryset.filter(start_time__date=today).count()
-        sessions_week = queryset.filter(
-            start_time__gte=today - timedelta(days=7)
-        ).count()
+        return Response(data)
+    
+    def _compute_stats(self, queryset):
+        """Calcula todas as estatísticas em uma única consulta agregada"""
+        today = timezone.localdate()
+        week_start = timezone.make_aware(datetime.combine(today - timedelta(days=7), time.min))
+        completed = Q(status='completed', end_time__isnull=False)
         
-        return Response({
-            'total_sessions': total_sessions,
-            'active_sessions': active_sessions,
-            'completed_sessions': completed_sessions,
-            'abandoned_sessions': abandoned_sessions,
-            'avg_duration_seconds': avg_duration,
-            'sessions_today': sessions_today,
-            'sessions_this_week': sessions_week,
-        })
+        stats = queryset.order_by().aggregate(
+            total_sessions=Count('id'),
+            active_sessions=Count('id', filter=Q(status='active')),
+            completed_sessions=Count('id', filter=Q(status='completed')),
+            abandoned_sessions=Count('id', filter=Q(status='abandoned')),
+            avg_duration=Avg(
+                ExpressionWrapper(F('end_time') - F('start_time'), output_field=DurationField()),
+                filter=completed,
+            ),
+            sessions_today=Count('id', filter=Q(start_time__date=today)),
+            sessions_this_week=Count('id', filter=Q(start_time__gte=week_start)),
+        )
+        
+        avg_duration = stats.pop('avg_duration')
+        stats['avg_duration_seconds'] = avg_duration.total_seconds() if avg_duration else 0
+        return stats
 
 
 class ChatMessageViewSet(ModelViewSet):
     """ViewSet para mensagens de chat"""
     serializer_class = ChatMessageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TimestampCursorPagination
     
     def get_queryset(self):
         session_id = self.request.query_params.get('session_id')
         if session_id:
             return ChatMessage.objects.filter(
                 session_id=session_id,
-                session__chatbot__owner=self.request.user
-            ).order_by('sent_at')
+                owner=self.request.user
+            ).select_related('session').order_by('sent_at')
         
         return ChatMessage.objects.filter(
-            session__chatbot__owner=self.request.user
-        ).order_by('-sent_at')
+            owner=self.request.user
+        ).select_related('session').order_by('-sent_at')
 
 
 class ExecutionLogViewSet(ModelViewSet):
     """ViewSet para logs de execução"""
     serializer_class = ExecutionLogSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TimestampCursorPagination
     
     def get_queryset(self):
         session_id = self.request.query_params.get('session_id')
         if session_id:
             return ExecutionLog.objects.filter(
                 session_id=session_id,
-                session__chatbot__owner=self.request.user
-            ).order_by('started_at')
+                owner=self.request.user
+            ).select_related('session').order_by('started_at')
         
         return ExecutionLog.objects.filter(
-            session__chatbot__owner=self.request.user
-        ).order_by('-started_at')
+            owner=self.request.user
+        ).select_related('session').order_by('-started_at')
 
 
 class WebhookEventViewSet(ModelViewSet):
@@ -164,8 +215,8 @@ class WebhookEventViewSet(ModelViewSet):
     
     def get_queryset(self):
         return WebhookEvent.objects.filter(
-            session__chatbot__owner=self.request.user
-        ).order_by('-created_at')
+            owner=self.request.user
+        ).select_related('session').order_by('-created_at')
     
     @action(detail=True, methods=['post'])
     @extend_schema(
@@ -187,11 +238,10 @@ class WebhookEventViewSet(ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Aqui você implementaria a lógica de reenvio do webhook
+        # O worker deliver_webhooks envia no próximo ciclo e contabiliza a tentativa
         webhook_event.status = 'pending'
-        webhook_event.retry_count += 1
-        webhook_event.next_retry = timezone.now() + timedelta(minutes=5)
-        webhook_event.save()
+        webhook_event.next_retry = timezone.now()
+        webhook_event.save(update_fields=['status', 'next_retry'])
         
         serializer = self.get_serializer(webhook_event)
         return Response({
@@ -210,12 +260,19 @@ class UserInputViewSet(ModelViewSet):
         if session_id:
             return UserInput.objects.filter(
                 session_id=session_id,
-                session__chatbot__owner=self.request.user
-            ).order_by('collected_at')
+                owner=self.request.user
+            ).select_related('session', 'message').order_by('collected_at')
         
         return UserInput.objects.filter(
-            session__chatbot__owner=self.request.user
-        ).order_by('-collected_at')
+            owner=self.request.user
+        ).select_related('session', 'message').order_by('-collected_at')
+
+
+def _parse_date_param(value):
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
 
 
 @api_view(['GET'])
@@ -227,42 +284,113 @@ class UserInputViewSet(ModelViewSet):
 def execution_dashboard(request):
     """View para dashboard de execuções"""
     user = request.user
+    thirty_days_ago = timezone.localdate() - timedelta(days=30)
     
-    # Sessões do usuário
-    sessions = ChatSession.objects.filter(chatbot__owner=user)
-    
-    # Estatísticas básicas
-    total_sessions = sessions.count()
-    active_sessions = sessions.filter(status='active').count()
-    completed_sessions = sessions.filter(status='completed').count()
-    
-    # Sessões por chatbot
-    sessions_by_chatbot = sessions.values('chatbot__name').annotate(
-        count=Count('id')
-    ).order_by('-count')[:10]
-    
-    # Atividade recente (últimos 30 dias)
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    recent_activity = sessions.filter(
-        start_time__gte=thirty_days_ago
-    ).extra(
-        select={'day': 'date(start_time)'}
-    ).values('day').annotate(
-        count=Count('id')
-    ).order_by('day')
+    # Duas queries sobre os agregados diários (ver refresh_execution_rollups):
+    # totais por chatbot de todo o período e as linhas dos últimos 30 dias
+    rollups = ExecutionDailyRollup.objects.filter(owner=user).order_by()
+    by_chatbot = list(
+        rollups.values('chatbot__name').annotate(
+            count=Sum('sessions_started'),
+            completed=Sum('sessions_completed'),
+            closed=Sum(F('sessions_completed') + F('sessions_abandoned') + F('sessions_error')),
+        )
+    )
+    total_sessions = sum(row['count'] for row in by_chatbot)
+    completed_sessions = sum(row['completed'] for row in by_chatbot)
+    active_sessions = total_sessions - sum(row['closed'] for row in by_chatbot)
+    sessions_by_chatbot = [
+        {'chatbot__name': row['chatbot__name'], 'count': row['count']}
+        for row in sorted(by_chatbot, key=lambda row: -row['count'])[:10]
+    ]
     
-    # Tipos de entrada mais comuns
-    common_inputs = UserInput.objects.filter(
-        session__chatbot__owner=user
-    ).values('input_type').annotate(
-        count=Count('id')
-    ).order_by('-count')[:5]
+    # input_types é um JSON por linha: somado aqui, só nos últimos 30 dias
+    activity = defaultdict(int)
+    common_inputs = defaultdict(int)
+    recent = rollups.filter(day__gte=thirty_days_ago).values_list('day', 'sessions_started', 'input_types')
+    for day, started, input_types in recent:
+        activity[day] += started
+        for input_type, count in input_types.items():
+            common_inputs[input_type] += count
+    recent_activity = [{'day': day, 'count': count} for day, count in sorted(activity.items())]
     
     return Response({
         'total_sessions': total_sessions,
         'active_sessions': active_sessions,
         'completed_sessions': completed_sessions,
-        'sessions_by_chatbot': list(sessions_by_chatbot),
-        'recent_activity': list(recent_activity),
-        'common_input_types': list(common_inputs),
-    }) 
\ No newline at end of file
+        'sessions_by_chatbot': sessions_by_chatbot,
+        'recent_activity': recent_activity,
+        'common_input_types': [
+            {'input_type': input_type, 'count': count}
+            for input_type, count in sorted(common_inputs.items(), key=lambda item: -item[1])[:5]
+        ],
+    }) 
+
+
+class PublicChatSessionStartView(generics.GenericAPIView):
+    """View pública para iniciar uma sessão de chat executada no servidor"""
+    serializer_class = PublicChatSessionStartSerializer
+    permission_classes = [permissions.AllowAny]
+    
+    @extend_schema(
+        summary="Iniciar sessão de chat",
+        description="Cria uma sessão para o fluxo principal e retorna as primeiras mensagens do bot",
+    )
+    def post(self, request, chatbot_id):
+        chatbot = get_object_or_404(
+            Chatbot,
+            id=chatbot_id,
+            is_published=True,
+            is_active=True
+        )
+        
+        main_flow = chatbot.flows.filter(is_main_flow=True, is_active=True).first()
+        if not main_flow:
+            return Response(
+                {'error': 'Chatbot não possui fluxo principal ativo.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        result = start_session(
+            chatbot,
+            main_flow,
+            serializer.validated_data.get('user_id') or f'anonymous_{timezone.now().timestamp()}',
+            user_data=serializer.validated_data['user_data'],
+            variables=serializer.validated_data['variables'],
+            ip_address=request.META.get('REMOTE_ADDR'),
+            user_agent=request.META.get('HTTP_USER_AGENT', ''),
+        )
+        return Response(result.to_dict(), status=status.HTTP_201_CREATED)
+
+
+class PublicChatSessionStepView(generics.GenericAPIView):
+    """View pública para enviar a resposta do usuário e avançar a sessão"""
+    serializer_class = ChatStepSerializer
+    permission_classes = [permissions.AllowAny]
+    
+    @extend_schema(
+        summary="Avançar sessão de chat",
+        description="Consome a resposta do usuário e retorna o lote de mensagens seguintes do bot",
+    )
+    def post(self, request, session_id):
+        session = get_object_or_404(
+            ChatSession.objects.select_related('flow'),
+            id=session_id,
+            chatbot__is_published=True,
+            chatbot__is_active=True
+        )
+        
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        # Sem 'value' não há resposta a consumir: apenas reenvia o estado atual
+        user_event = serializer.validated_data if 'value' in serializer.validated_data else None
+        try:
+            result = step(session, user_event)
+        except EngineError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(result.to_dict())
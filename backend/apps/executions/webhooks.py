@@ -0,0 +1,187 @@
+"""
+Entrega assíncrona dos eventos de webhook
+"""
+import asyncio
+from datetime import timedelta
+import logging
+import random
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.integrations import http
+from .models import WebhookEvent
+
+
+logger = logging.getLogger(__name__)
+
+DELIVERABLE_STATUSES = ('pending', 'retrying')
+
+# Respostas 4xx que ainda valem nova tentativa
+RETRYABLE_CLIENT_ERRORS = frozenset({408, 425, 429})
+
+MAX_RESPONSE_BODY = 2000
+
+RESULT_FIELDS = ['status', 'response_status', 'response_data', 'error_message', 'retry_count', 'sent_at', 'next_retry']
+
+
+def claim_due_events(batch_size, claim_timeout, now=None):
+    """
+    Reserva até `batch_size` eventos vencidos para este worker.
+
+    Os registros são travados com SKIP LOCKED, então workers concorrentes
+    pegam lotes disjuntos; a reserva empurra o next_retry para frente, e um
+    worker que morrer no meio do envio libera os eventos após `claim_timeout`.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        events = list(
+            WebhookEvent.objects.select_for_update(skip_locked=True)
+            .filter(status__in=DELIVERABLE_STATUSES)
+            .filter(Q(next_retry__isnull=True) | Q(next_retry__lte=now))
+            .order_by('next_retry')[:batch_size]
+        )
+        if events:
+            WebhookEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+                next_retry=now + timedelta(seconds=claim_timeout)
+            )
+    return events
+
+
+def backoff_delay(retry_count, base, maximum):
+    """Backoff exponencial com jitter: metade fixa, metade aleatória"""
+    ceiling = min(maximum, base * 2 ** max(retry_count - 1, 0))
+    return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+
+def _response_data(response):
+    try:
+        return response.json()
+    except ValueError:
+        body = response.text[:MAX_RESPONSE_BODY]
+        return {'body': body} if body else None
+
+
+class WebhookDeliveryWorker:
+    """
+    Envia os WebhookEvent vencidos em paralelo pelo cliente HTTP das integrações.
+
+    Cada ciclo reserva um lote, envia até `concurrency` requisições ao mesmo
+    tempo e grava os resultados com um único bulk_update.
+    """
+
+    def __init__(self, concurrency=50, batch_size=200, timeout=10.0, poll_interval=1.0,
+                 claim_timeout=300, backoff_base=30, backoff_max=3600):
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.claim_timeout = claim_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._stopped = False
+
+    @classmethod
+    def from_settings(cls, **overrides):
+        config = getattr(settings, 'WEBHOOK_DELIVERY', {})
+        options = {
+            'concurrency': config.get('CONCURRENCY', 50),
+            'batch_size': config.get('BATCH_SIZE', 200),
+            'timeout': config.get('TIMEOUT', 10.0),
+            'poll_interval': config.get('POLL_INTERVAL', 1.0),
+            'claim_timeout': config.get('CLAIM_TIMEOUT', 300),
+            'backoff_base': config.get('BACKOFF_BASE', 30),
+            'backoff_max': config.get('BACKOFF_MAX', 3600),
+        }
+        options.update({key: value for key, value in overrides.items() if value is not None})
+        return cls(**options)
+
+    def stop(self):
+        self._stopped = True
+
+    async def run(self, once=False):
+        """
+        Processa lotes até ser parado; com `once`, até não haver eventos vencidos.
+        Retorna quantos eventos foram processados.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        processed = 0
+        try:
+            while not self._stopped:
+                events = await sync_to_async(claim_due_events)(self.batch_size, self.claim_timeout)
+                if not events:
+                    if once:
+                        break
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+
+                # deliver() não propaga erros: o lote inteiro sempre é gravado
+                await asyncio.gather(*(self.deliver(event, semaphore) for event in events), return_exceptions=True)
+                await sync_to_async(WebhookEvent.objects.bulk_update)(events, RESULT_FIELDS)
+                processed += len(events)
+        finally:
+            await http.get_client_pool().aclose()
+        return processed
+
+    async def deliver(self, event, semaphore):
+        """Envia um evento e registra o resultado na instância (sem gravar)"""
+        try:
+            await self._deliver(event, semaphore)
+        except Exception as exc:
+            # URL malformada, headers inválidos etc.: reenviar não resolveria
+            logger.exception('Erro inesperado ao enviar o webhook %s', event.pk)
+            self._record_failure(event, None, None, f'{exc.__class__.__name__}: {exc}', retryable=False)
+
+    async def _deliver(self, event, semaphore):
+        async with semaphore:
+            try:
+                # Conexões keep-alive reaproveitadas entre as entregas para o mesmo host
+                response = await http.arequest(
+                    'POST',
+                    event.webhook_url,
+                    timeout=self.timeout,
+                    max_connections=self.concurrency,
+                    json=event.payload,
+                    headers=event.headers or {},
+                )
+            except http.HTTPError as exc:
+                self._record_failure(event, None, None, str(exc) or exc.__class__.__name__)
+                return
+
+        if 200 <= response.status_code < 300:
+            event.status = 'sent'
+            event.response_status = response.status_code
+            event.response_data = _response_data(response)
+            event.error_message = ''
+            event.sent_at = timezone.now()
+            event.next_retry = None
+            return
+
+        retryable = response.status_code >= 500 or response.status_code in RETRYABLE_CLIENT_ERRORS
+        self._record_failure(
+            event,
+            response.status_code,
+            _response_data(response),
+            f'HTTP {response.status_code}',
+            retryable=retryable,
+        )
+
+    def _record_failure(self, event, response_status, response_data, error, retryable=True):
+        event.response_status = response_status
+        event.response_data = response_data
+        event.error_message = error
+
+        if not retryable or event.retry_count >= event.max_retries:
+            event.status = 'failed'
+            event.next_retry = None
+            logger.warning('Webhook %s falhou definitivamente: %s', event.pk, error)
+            return
+
+        event.retry_count += 1
+        event.status = 'retrying'
+        event.next_retry = timezone.now() + timedelta(
+            seconds=backoff_delay(event.retry_count, self.backoff_base, self.backoff_max)
+        )
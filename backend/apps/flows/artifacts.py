@@ -0,0 +1,140 @@
+"""
+Artefatos imutáveis dos fluxos publicados
+"""
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import threading
+
+from . import compiler
+from .models import PublishedFlowArtifact
+
+
+logger = logging.getLogger(__name__)
+
+# Quantidade máxima de artefatos compilados mantidos em memória por processo
+ARTIFACT_CACHE_SIZE = 256
+
+
+class ArtifactError(ValueError):
+    """Fluxo inválido para publicação"""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__('; '.join(self.errors))
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def content_hash(nodes, edges, types=None, flow_id=None):
+    """
+    Hash sha256 do grafo (e dos tipos das variáveis) serializado de forma
+    canônica. Com `flow_id`, o hash é exclusivo do fluxo: chatbots com grafos
+    idênticos não compartilham o mesmo artefato.
+    """
+    content = {'nodes': nodes, 'edges': edges}
+    if flow_id is not None:
+        content['flow'] = str(flow_id)
+    if types:
+        content['variable_types'] = types
+    payload = json.dumps(
+        content,
+        sort_keys=True,
+        separators=(',', ':'),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def build_artifact(flow):
+    """
+    Valida e congela o fluxo em um PublishedFlowArtifact.
+
+    Levanta ArtifactError se o grafo tiver erros estruturais.
+    """
+    nodes = flow.nodes or []
+    edges = flow.edges or []
+    types = compiler.variable_types(flow)
+    digest = content_hash(nodes, edges, types, flow_id=flow.pk)
+
+    compiled = compiler.CompiledFlow(flow.pk, digest, nodes, edges, types)
+    if compiled.errors:
+        raise ArtifactError(compiled.errors)
+
+    artifact, _ = PublishedFlowArtifact.objects.get_or_create(
+        content_hash=digest,
+        defaults={
+            'chatbot_id': flow.chatbot_id,
+            'flow': flow,
+            'nodes': nodes,
+            'edges': edges,
+            'variable_types': types,
+        },
+    )
+    _remember(digest, compiled)
+    return artifact
+
+
+def load_artifact(digest):
+    """
+    Retorna o CompiledFlow de um artefato pelo hash, ou None se não existir.
+
+    Artefatos nunca mudam, então o cache local dispensa invalidação.
+    """
+    with _cache_lock:
+        compiled = _cache.get(digest)
+        if compiled is not None:
+            _cache.move_to_end(digest)
+            return compiled
+
+    artifact = PublishedFlowArtifact.objects.filter(content_hash=digest).only(
+        'content_hash', 'flow_id', 'nodes', 'edges', 'variable_types'
+    ).first()
+    if artifact is None:
+        return None
+
+    compiled = compiler.CompiledFlow(artifact.flow_id, digest, artifact.nodes, artifact.edges, artifact.variable_types)
+    _remember(digest, compiled)
+    return compiled
+
+
+def _remember(digest, compiled):
+    with _cache_lock:
+        _cache[digest] = compiled
+        _cache.move_to_end(digest)
+        while len(_cache) > ARTIFACT_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def compiled_for_chatbot(chatbot, flow):
+    """
+    Retorna (hash, CompiledFlow) usados pelo runtime para o fluxo do chatbot.
+
+    Usa o artefato publicado quando ele corresponde ao fluxo. Chatbots
+    publicados sem artefato (ou com o artefato removido) ganham um na hora;
+    o rascunho compilado só é usado para chatbots não publicados ou cujo
+    fluxo não pode ser congelado.
+    """
+    digest = chatbot.published_artifact_id
+    if digest:
+        compiled = load_artifact(digest)
+        if compiled is not None and compiled.flow_id == flow.pk:
+            return digest, compiled
+        logger.warning('Artefato %s não corresponde ao fluxo %s do chatbot %s', digest, flow.pk, chatbot.pk)
+
+    if not chatbot.is_published:
+        return None, flow.compile()
+    try:
+        artifact = build_artifact(flow)
+    except ArtifactError as exc:
+        logger.warning('Fluxo %s do chatbot %s publicado com erros: %s', flow.pk, chatbot.pk, exc)
+        return None, flow.compile()
+
+    # update(): não altera updated_at, a versão do snapshot público
+    type(chatbot).objects.filter(pk=chatbot.pk).update(published_artifact=artifact)
+    chatbot.published_artifact = artifact
+    return artifact.content_hash, load_artifact(artifact.content_hash)
@@ -0,0 +1,193 @@
+"""
+Compilação dos fluxos em uma representação imutável para execução
+"""
+from collections import OrderedDict
+from types import MappingProxyType
+import threading
+
+from apps.executions.engine import conditions, templates
+
+
+# Quantidade máxima de fluxos compilados mantidos em memória por processo
+COMPILED_FLOW_CACHE_SIZE = 512
+
+# Campos dos nós que aceitam marcadores {{variavel}}
+TEMPLATE_FIELDS = ('text', 'message', 'label', 'url', 'altText', 'caption', 'placeholder', 'value', 'body')
+
+
+class CompiledFlow:
+    """
+    Representação imutável de um fluxo, indexada para consultas O(1)
+    """
+    __slots__ = (
+        'flow_id', 'version', 'nodes', 'node_types', 'nodes_by_type',
+        'adjacency', 'default_next', 'start_node', 'errors',
+        'templates', 'conditions', 'dependencies',
+    )
+
+    def __init__(self, flow_id, version, nodes, edges, variable_types=None):
+        node_map = {}
+        node_types = {}
+        nodes_by_type = {}
+        node_templates = {}
+        node_conditions = {}
+        dependencies = {}
+        start_node = None
+
+        for node in nodes:
+            node_id = node.get('id')
+            if node_id is None:
+                continue
+            node_type = node.get('type')
+            node_map[node_id] = node
+            node_types[node_id] = node_type
+            nodes_by_type.setdefault(node_type, []).append(node_id)
+            if start_node is None and node_type == 'start':
+                start_node = node
+
+            # Textos e condições são pré-processados uma única vez por versão
+            data = node.get('data') or {}
+            node_fields = [(field, data.get(field)) for field in TEMPLATE_FIELDS]
+            if node_type == 'choice':
+                node_fields.extend(
+                    (templates.choice_field(index), choice.get('label'))
+                    for index, choice in enumerate(data.get('choices') or [])
+                    if isinstance(choice, dict)
+                )
+            referenced = set()
+            for field, value in node_fields:
+                if isinstance(value, str) and value:
+                    template = node_templates[(node_id, field)] = templates.parse(value)
+                    referenced.update(template.variables)
+            if node_type == 'conditional':
+                node_conditions[node_id] = conditions.compile_condition(data, variable_types)
+                referenced.update(variable for variable, _, _ in conditions.prepare(data)[1])
+            if referenced:
+                dependencies[node_id] = frozenset(referenced)
+
+        adjacency = {}
+        default_next = {}
+        errors = []
+        if start_node is None:
+            errors.append("Fluxo deve ter um nó inicial")
+
+        for edge in edges:
+            source = edge.get('source')
+            target = edge.get('target')
+            if source not in node_map:
+                errors.append(f"Conexão inválida: nó origem {source} não existe")
+            if target not in node_map:
+                errors.append(f"Conexão inválida: nó destino {target} não existe")
+
+            # A primeira conexão encontrada vence, como no executor do frontend
+            adjacency.setdefault((source, edge.get('sourceHandle')), target)
+            default_next.setdefault(source, target)
+
+        object.__setattr__(self, 'flow_id', flow_id)
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'nodes', MappingProxyType(node_map))
+        object.__setattr__(self, 'node_types', MappingProxyType(node_types))
+        object.__setattr__(self, 'nodes_by_type', MappingProxyType({
+            node_type: tuple(ids) for node_type, ids in nodes_by_type.items()
+        }))
+        object.__setattr__(self, 'adjacency', MappingProxyType(adjacency))
+        object.__setattr__(self, 'default_next', MappingProxyType(default_next))
+        object.__setattr__(self, 'start_node', start_node)
+        object.__setattr__(self, 'errors', tuple(errors))
+        object.__setattr__(self, 'templates', MappingProxyType(node_templates))
+        object.__setattr__(self, 'conditions', MappingProxyType(node_conditions))
+        object.__setattr__(self, 'dependencies', MappingProxyType(dependencies))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CompiledFlow é imutável")
+
+    def __repr__(self):
+        return f"<CompiledFlow {self.flow_id} v{self.version} ({len(self.nodes)} nós)>"
+
+    def get_node(self, node_id):
+        """Retorna o nó pelo id"""
+        return self.nodes.get(node_id)
+
+    def get_node_type(self, node_id):
+        """Retorna o tipo do nó pelo id"""
+        return self.node_types.get(node_id)
+
+    def next_node_id(self, node_id, handle=None):
+        """
+        Retorna o id do próximo nó a partir de um handle de saída.
+        Sem handle, segue a primeira conexão do nó.
+        """
+        if handle is None:
+            return self.default_next.get(node_id)
+        return self.adjacency.get((node_id, handle))
+
+    def get_template(self, node_id, field):
+        """Retorna o Template pré-processado do campo do nó, ou None"""
+        return self.templates.get((node_id, field))
+
+    def get_condition(self, node_id):
+        """Retorna a condição compilada (`f(variables) -> bool`) de um nó `conditional`, ou None"""
+        return self.conditions.get(node_id)
+
+    def get_dependencies(self, node_id):
+        """Variáveis da sessão lidas pelos textos e pela condição do nó"""
+        return self.dependencies.get(node_id, frozenset())
+
+    def dispatch(self, handlers, node_id, default=None):
+        """Resolve o handler do nó a partir de uma tabela tipo -> handler"""
+        return handlers.get(self.node_types.get(node_id), default)
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _flow_version(flow):
+    updated_at = flow.updated_at
+    return updated_at.isoformat() if updated_at else None
+
+
+def variable_types(flow):
+    """Mapeia nome -> variable_type das variáveis declaradas no fluxo"""
+    if flow.pk is None:
+        return {}
+    if 'variables' in getattr(flow, '_prefetched_objects_cache', {}):
+        # Listagens fazem prefetch_related('variables'): sem uma consulta por fluxo
+        return {variable.name: variable.variable_type for variable in flow.variables.all()}
+    return dict(flow.variables.values_list('name', 'variable_type'))
+
+
+def compile_flow(flow):
+    """
+    Retorna o CompiledFlow do fluxo, compilando-o uma única vez por updated_at
+    """
+    version = _flow_version(flow)
+    if flow.pk is None or version is None:
+        # Fluxo ainda não salvo: não há versão estável para cachear
+        return CompiledFlow(flow.pk, version, flow.nodes or [], flow.edges or [], variable_types(flow))
+
+    key = (flow.pk, version)
+    with _cache_lock:
+        compiled = _cache.get(key)
+        if compiled is not None:
+            _cache.move_to_end(key)
+            return compiled
+
+    compiled = CompiledFlow(flow.pk, version, flow.nodes or [], flow.edges or [], variable_types(flow))
+
+    with _cache_lock:
+        # Versões anteriores do mesmo fluxo não serão mais usadas
+        for stale_key in [k for k in _cache if k[0] == flow.pk and k != key]:
+            del _cache[stale_key]
+        _cache[key] = compiled
+        _cache.move_to_end(key)
+        while len(_cache) > COMPILED_FLOW_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return compiled
+
+
+def invalidate_compiled_flow(flow_id):
+    """Remove todas as versões compiladas de um fluxo do cache local"""
+    with _cache_lock:
+        for key in [key for key in _cache if key[0] == flow_id]:
+            del _cache[key]
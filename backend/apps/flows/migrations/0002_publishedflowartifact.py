@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbots', '0002_incremental_analytics'),
+        ('flows', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PublishedFlowArtifact',
+            fields=[
+                ('content_hash', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('nodes', models.JSONField(default=list)),
+                ('edges', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('chatbot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='published_artifacts', to='chatbots.chatbot')),
+                ('flow', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='published_artifacts', to='flows.flow')),
+            ],
+            options={
+                'verbose_name': 'Artefato Publicado',
+                'verbose_name_plural': 'Artefatos Publicados',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flows', '0002_publishedflowartifact'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publishedflowartifact',
+            name='variable_types',
+            field=models.JSONField(default=dict),
+        ),
+    ]
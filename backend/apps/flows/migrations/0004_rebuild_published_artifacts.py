@@ -0,0 +1,55 @@
+# Generated by Django 4.2.7 on 2026-10-17 14:05
+
+from django.db import migrations
+
+
+def rebuild_artifacts(apps, schema_editor):
+    """
+    Gera artefatos exclusivos por fluxo para os chatbots publicados: os
+    antigos eram compartilhados entre grafos idênticos e chatbots publicados
+    antes dos artefatos não tinham nenhum.
+    """
+    from apps.flows.artifacts import content_hash
+    from apps.flows.compiler import CompiledFlow
+
+    Chatbot = apps.get_model('chatbots', 'Chatbot')
+    Flow = apps.get_model('flows', 'Flow')
+    PublishedFlowArtifact = apps.get_model('flows', 'PublishedFlowArtifact')
+
+    for chatbot in Chatbot.objects.filter(is_published=True).iterator():
+        flow = Flow.objects.filter(chatbot_id=chatbot.pk, is_main_flow=True, is_active=True).first()
+        if flow is None:
+            continue
+        nodes = flow.nodes or []
+        edges = flow.edges or []
+        types = dict(flow.variables.values_list('name', 'variable_type'))
+        digest = content_hash(nodes, edges, types, flow_id=flow.pk)
+        if chatbot.published_artifact_id == digest:
+            continue
+        if CompiledFlow(flow.pk, digest, nodes, edges, types).errors:
+            # Continua no rascunho, como antes; a próxima publicação valida o fluxo
+            continue
+        PublishedFlowArtifact.objects.get_or_create(
+            content_hash=digest,
+            defaults={
+                'chatbot_id': chatbot.pk,
+                'flow_id': flow.pk,
+                'nodes': nodes,
+                'edges': edges,
+                'variable_types': types,
+            },
+        )
+        Chatbot.objects.filter(pk=chatbot.pk).update(published_artifact_id=digest)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbots', '0005_chatbot_abandon_after_minutes'),
+        ('components', '0001_initial'),
+        ('flows', '0003_publishedflowartifact_variable_types'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_artifacts, migrations.RunPython.noop),
+    ]
@@ -40,31 +40,58 @@ class Flow(models.Model):
     def __str__(self):
         return f"{self.chatbot.name} - {self.name}"
     
+    def compile(self):
+        """Retorna a representação compilada (e cacheada) do fluxo"""
+        from .compiler import compile_flow
+        return compile_flow(self)
+    
     def get_start_node(self):
         """Retorna o nó inicial do fluxo"""
-        for node in self.nodes:
-            if node.get('type') == 'start':
-                return node
-        return None
+        return self.compile().start_node
     
     def validate_flow(self):
         """Valida se o fluxo está correto"""
-        errors = []
-        
-        # Verificar se tem nó inicial
-        start_node = self.get_start_node()
-        if not start_node:
-            errors.append("Fluxo deve ter um nó inicial")
-        
-        # Verificar se todos os nós têm conexões válidas
-        node_ids = {node['id'] for node in self.nodes}
-        for edge in self.edges:
-            if edge['source'] not in node_ids:
-                errors.append(f"Conexão inválida: nó origem {edge['source']} não existe")
-            if edge['target'] not in node_ids:
-                errors.append(f"Conexão inválida: nó destino {edge['target']} não existe")
-        
-        return errors
+        # Os erros estruturais são calculados uma única vez na compilação
+        return list(self.compile().errors)
+
+
+class PublishedFlowArtifact(models.Model):
+    """
+    Snapshot imutável do fluxo principal gerado na publicação do chatbot.
+
+    Identificado pelo hash do conteúdo: republicar um fluxo idêntico reutiliza
+    o mesmo artefato, e salvar rascunhos no editor nunca altera o que as
+    sessões em andamento executam.
+    """
+    content_hash = models.CharField(max_length=64, primary_key=True)
+    chatbot = models.ForeignKey('chatbots.Chatbot', on_delete=models.CASCADE, related_name='published_artifacts')
+    flow = models.ForeignKey(Flow, on_delete=models.SET_NULL, null=True, related_name='published_artifacts')
+    
+    # Grafo congelado no momento da publicação
+    nodes = models.JSONField(default=list)
+    edges = models.JSONField(default=list)
+    # Tipos das variáveis declaradas, usados nas condições tipadas
+    variable_types = models.JSONField(default=dict)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Artefato Publicado"
+        verbose_name_plural = "Artefatos Publicados"
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.chatbot_id} - {self.content_hash[:12]}"
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Artefatos publicados são imutáveis")
+        super().save(*args, **kwargs)
+    
+    def compile(self):
+        """Retorna o CompiledFlow do artefato (cacheado pelo hash)"""
+        from .artifacts import load_artifact
+        return load_artifact(self.content_hash)
 
 
 class FlowTemplate(models.Model):
@@ -136,6 +136,8 @@ class FlowExecutionSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'started_at', 'last_activity')
     
     def get_messages_count(self, obj):
+        if hasattr(obj, 'messages_count'):
+            return obj.messages_count
         return obj.messages.count()
     
     def get_duration(self, obj):
@@ -0,0 +1,116 @@
+"""
+Testes dos artefatos imutáveis dos fluxos publicados
+"""
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from apps.chatbots.models import Chatbot
+from .. import artifacts
+from ..models import Flow, PublishedFlowArtifact
+
+
+NODES = [
+    {'id': 'start', 'type': 'start', 'data': {}},
+    {'id': 'hello', 'type': 'text', 'data': {'text': 'Olá, {{nome}}'}},
+]
+EDGES = [{'id': 'e1', 'source': 'start', 'target': 'hello'}]
+
+
+class ArtifactTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='artifacts')
+        self.chatbot, self.flow = self.create_flow('Bot')
+        # O cache é do processo: cada teste começa lendo do banco
+        artifacts._cache.clear()
+
+    def create_flow(self, name, nodes=NODES, edges=EDGES):
+        chatbot = Chatbot.objects.create(name=name, owner=self.user)
+        flow = Flow.objects.create(
+            chatbot=chatbot, name='Principal', is_main_flow=True, nodes=nodes, edges=edges, created_by=self.user
+        )
+        return chatbot, flow
+
+    def test_build_is_idempotent(self):
+        first = artifacts.build_artifact(self.flow)
+        second = artifacts.build_artifact(self.flow)
+
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(PublishedFlowArtifact.objects.count(), 1)
+        self.assertEqual(first.flow_id, self.flow.pk)
+        self.assertEqual(first.nodes, NODES)
+
+    def test_identical_graphs_get_one_artifact_per_flow(self):
+        _, other_flow = self.create_flow('Cópia')
+
+        artifact = artifacts.build_artifact(self.flow)
+        other = artifacts.build_artifact(other_flow)
+
+        self.assertNotEqual(artifact.pk, other.pk)
+        self.assertEqual(other.flow_id, other_flow.pk)
+
+    def test_content_change_creates_new_artifact(self):
+        artifact = artifacts.build_artifact(self.flow)
+        self.flow.nodes = NODES + [{'id': 'end', 'type': 'end', 'data': {}}]
+        self.flow.save()
+
+        self.assertNotEqual(artifacts.build_artifact(self.flow).pk, artifact.pk)
+        # O artefato anterior continua disponível para as sessões presas a ele
+        self.assertEqual(len(artifacts.load_artifact(artifact.pk).nodes), 2)
+
+    def test_invalid_flow_is_rejected(self):
+        _, flow = self.create_flow('Inválido', nodes=NODES[1:], edges=EDGES)
+
+        with self.assertRaises(artifacts.ArtifactError) as raised:
+            artifacts.build_artifact(flow)
+
+        self.assertIn('Fluxo deve ter um nó inicial', raised.exception.errors)
+        self.assertFalse(PublishedFlowArtifact.objects.exists())
+
+    def test_load_from_database_and_cache(self):
+        digest = artifacts.build_artifact(self.flow).pk
+        artifacts._cache.clear()
+
+        with self.assertNumQueries(1):
+            compiled = artifacts.load_artifact(digest)
+        with self.assertNumQueries(0):
+            self.assertIs(artifacts.load_artifact(digest), compiled)
+
+        self.assertEqual(compiled.flow_id, self.flow.pk)
+        self.assertEqual(compiled.next_node_id('start'), 'hello')
+        self.assertIsNone(artifacts.load_artifact('0' * 64))
+
+    def test_unpublished_chatbot_uses_draft(self):
+        digest, compiled = artifacts.compiled_for_chatbot(self.chatbot, self.flow)
+
+        self.assertIsNone(digest)
+        self.assertEqual(compiled.flow_id, self.flow.pk)
+
+    def test_publish_freezes_main_flow(self):
+        self.chatbot.publish()
+
+        digest, compiled = artifacts.compiled_for_chatbot(self.chatbot, self.flow)
+
+        self.assertEqual(digest, self.chatbot.published_artifact_id)
+        self.assertEqual(compiled.flow_id, self.flow.pk)
+
+    def test_published_chatbot_without_artifact_gets_one(self):
+        Chatbot.objects.filter(pk=self.chatbot.pk).update(is_published=True)
+        self.chatbot.refresh_from_db()
+
+        digest, _ = artifacts.compiled_for_chatbot(self.chatbot, self.flow)
+
+        self.assertIsNotNone(digest)
+        self.assertEqual(Chatbot.objects.get(pk=self.chatbot.pk).published_artifact_id, digest)
+
+    def test_artifact_of_another_flow_is_not_used(self):
+        _, other_flow = self.create_flow('Outro')
+        self.chatbot.publish()
+        Chatbot.objects.filter(pk=self.chatbot.pk).update(published_artifact=artifacts.build_artifact(other_flow))
+        self.chatbot.refresh_from_db()
+
+        with self.assertLogs('apps.flows.artifacts', 'WARNING'):
+            digest, compiled = artifacts.compiled_for_chatbot(self.chatbot, self.flow)
+
+        self.assertEqual(compiled.flow_id, self.flow.pk)
+        self.assertEqual(PublishedFlowArtifact.objects.get(pk=digest).flow_id, self.flow.pk)
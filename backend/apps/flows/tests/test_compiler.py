@@ -0,0 +1,70 @@
+"""
+Testes da compilação dos fluxos
+"""
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from apps.chatbots.models import Chatbot
+from apps.components.models import ComponentVariable
+from .. import compiler
+from ..models import Flow
+
+
+NODES = [
+    {'id': 'start', 'type': 'start', 'data': {}},
+    {'id': 'choice', 'type': 'choice', 'data': {'choices': [{'label': 'Sim'}, {'label': 'Não'}]}},
+    {'id': 'yes', 'type': 'text', 'data': {'text': 'Olá, {{nome}}'}},
+    {'id': 'no', 'type': 'end', 'data': {}},
+]
+EDGES = [
+    {'id': 'e1', 'source': 'start', 'target': 'choice'},
+    {'id': 'e2', 'source': 'choice', 'sourceHandle': 'choice-0', 'target': 'yes'},
+    {'id': 'e3', 'source': 'choice', 'sourceHandle': 'choice-1', 'target': 'no'},
+]
+
+
+class CompileFlowTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='compiler')
+        chatbot = Chatbot.objects.create(name='Bot', owner=self.user)
+        self.flow = Flow.objects.create(chatbot=chatbot, name='Principal', nodes=NODES, edges=EDGES, created_by=self.user)
+        compiler._cache.clear()
+
+    def test_indexes_graph(self):
+        compiled = self.flow.compile()
+
+        self.assertEqual(compiled.start_node['id'], 'start')
+        self.assertEqual(compiled.next_node_id('start'), 'choice')
+        self.assertEqual(compiled.next_node_id('choice', 'choice-1'), 'no')
+        self.assertIsNone(compiled.next_node_id('choice', 'choice-9'))
+        self.assertEqual(compiled.get_node_type('yes'), 'text')
+        self.assertEqual(compiled.get_dependencies('yes'), frozenset({'nome'}))
+        self.assertEqual(compiled.errors, ())
+        with self.assertRaises(AttributeError):
+            compiled.start_node = None
+
+    def test_structural_errors(self):
+        self.flow.nodes = NODES[1:]
+        self.flow.edges = EDGES + [{'id': 'e4', 'source': 'yes', 'target': 'missing'}]
+
+        errors = compiler.CompiledFlow(self.flow.pk, None, self.flow.nodes, self.flow.edges).errors
+
+        self.assertIn('Fluxo deve ter um nó inicial', errors)
+        self.assertIn('Conexão inválida: nó destino missing não existe', errors)
+
+    def test_cached_per_version(self):
+        compiled = self.flow.compile()
+        with self.assertNumQueries(0):
+            self.assertIs(self.flow.compile(), compiled)
+
+        self.flow.save()
+        self.assertIsNot(self.flow.compile(), compiled)
+
+    def test_variable_types_from_prefetch(self):
+        ComponentVariable.objects.create(flow=self.flow, name='idade', variable_type='number', created_by=self.user)
+        flow = Flow.objects.prefetch_related('variables').get(pk=self.flow.pk)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(compiler.variable_types(flow), {'idade': 'number'})
+            flow.compile()
@@ -3,12 +3,15 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 from django.db import transaction, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from drf_spectacular.utils import extend_schema
 
 from apps.chatbots.models import Chatbot
 from .models import Flow, FlowTemplate, FlowExecution, FlowMessage
+from .artifacts import compiled_for_chatbot
 from .serializers import (
     FlowSerializer,
     FlowCreateSerializer,
@@ -31,7 +34,7 @@ class FlowViewSet(ModelViewSet):
         return Flow.objects.filter(
             chatbot_id=chatbot_id,
             chatbot__owner=self.request.user
-        ).order_by('-updated_at')
+        ).select_related('chatbot', 'created_by').prefetch_related('variables').order_by('-updated_at')
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -185,6 +188,31 @@ class FlowViewSet(ModelViewSet):
             'is_valid': len(errors) == 0,
             'errors': errors
         })
+    
+    @action(detail=True, methods=['get'])
+    @extend_schema(
+        summary="Dependências de variáveis",
+        description="Lista as variáveis lidas pelos textos e condições de cada nó e as que não são declaradas nem coletadas no fluxo",
+    )
+    def dependencies(self, request, pk=None, chatbot_pk=None):
+        flow = self.get_object()
+        compiled = flow.compile()
+        
+        # Variáveis declaradas ou preenchidas por nós de entrada, variável e requisição
+        provided = set(flow.variables.values_list('name', flat=True))
+        for node in compiled.nodes.values():
+            data = node.get('data') or {}
+            for key in ('variableName', 'variable', 'storeResponseIn'):
+                if node.get('type') != 'conditional' and data.get(key):
+                    provided.add(data[key])
+        
+        nodes = {node_id: sorted(names) for node_id, names in compiled.dependencies.items()}
+        referenced = set().union(*compiled.dependencies.values())
+        return Response({
+            'nodes': nodes,
+            'variables': sorted(referenced),
+            'undeclared': sorted(referenced - provided),
+        })
 
 
 class FlowTemplateViewSet(ModelViewSet):
@@ -195,7 +223,7 @@ class FlowTemplateViewSet(ModelViewSet):
     def get_queryset(self):
         return FlowTemplate.objects.filter(
             models.Q(is_public=True) | models.Q(created_by=self.request.user)
-        ).order_by('-usage_count', 'name')
+        ).select_related('created_by').order_by('-usage_count', 'name')
     
     @extend_schema(
         summary="Listar templates de fluxos",
@@ -251,10 +279,17 @@ class FlowExecutionViewSet(ModelViewSet):
     
     def get_queryset(self):
         flow_id = self.kwargs.get('flow_pk')
-        return FlowExecution.objects.filter(
+        queryset = FlowExecution.objects.filter(
             flow_id=flow_id,
             flow__chatbot__owner=self.request.user
-        ).order_by('-started_at')
+        ).select_related('flow').order_by('-started_at')
+        if self.action == 'list':
+            # Subconsulta correlacionada: conta só as linhas da página
+            messages = FlowMessage.objects.filter(execution=OuterRef('pk')).order_by().values('execution')
+            queryset = queryset.annotate(
+                messages_count=Coalesce(Subquery(messages.annotate(count=Count('pk')).values('count')), 0)
+            )
+        return queryset
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -303,11 +338,14 @@ class PublicFlowExecutionView(generics.CreateAPIView):
             )
         
         # Criar execução
+        # Sessões públicas usam o artefato publicado, não o rascunho do editor
+        _, compiled = compiled_for_chatbot(chatbot, main_flow)
+        start_node = compiled.start_node
         execution = FlowExecution.objects.create(
             flow=main_flow,
             user_id=request.data.get('user_id', f'anonymous_{timezone.now().timestamp()}'),
             user_data=request.data.get('user_data', {}),
-            current_node_id=main_flow.get_start_node()['id'] if main_flow.get_start_node() else None
+            current_node_id=start_node['id'] if start_node else None
         )
         
         serializer = FlowExecutionDetailSerializer(execution, context={'request': request})
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Integration, Webhook, ApiConnection, IntegrationLog, IntegrationTemplate
+from .models import Integration, Webhook, ApiConnection, IntegrationLog, IntegrationLogSummary, IntegrationTemplate
 
 
 @admin.register(Integration)
@@ -80,7 +80,7 @@ class IntegrationLogAdmin(admin.ModelAdmin):
             'fields': ('integration', 'execution_id', 'action', 'level', 'message')
         }),
         ('Dados Técnicos', {
-            'fields': ('status_code', 'duration'),
+            'fields': ('status_code', 'duration', 'cache_status', 'sample_rate'),
         }),
         ('Dados da Requisição', {
             'fields': ('request_data', 'response_data'),
@@ -93,6 +93,14 @@ class IntegrationLogAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(IntegrationLogSummary)
+class IntegrationLogSummaryAdmin(admin.ModelAdmin):
+    list_display = ('integration', 'action', 'hour', 'count', 'error_count', 'duration_p50', 'duration_p95')
+    list_filter = ('action', 'hour')
+    search_fields = ('integration__name', 'action')
+
+
+
 @admin.register(IntegrationTemplate)
 class IntegrationTemplateAdmin(admin.ModelAdmin):
     list_display = ('name', 'type', 'category', 'is_public', 'usage_count', 'created_by', 'created_at')
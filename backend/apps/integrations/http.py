@@ -0,0 +1,227 @@
+"""
+Cliente HTTP compartilhado das integrações
+
+Mantém pools keep-alive por integração (e, dentro deles, por host), com
+HTTP/2 quando o pacote `h2` está instalado. Oferece as fachadas `request`
+(síncrona, para views e motor de fluxos) e `arequest` (assíncrona, para os
+workers), ambas respeitando o timeout e o limite de conexões configurados
+na ApiConnection/Webhook.
+"""
+import asyncio
+import threading
+import time
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+import httpx
+
+from . import oauth, resilience
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+DEFAULTS = {
+    'HTTP2': True,
+    'TIMEOUT': 10.0,
+    'MAX_CONNECTIONS': 20,
+    'MAX_KEEPALIVE_CONNECTIONS': 10,
+    'KEEPALIVE_EXPIRY': 30.0,
+}
+
+DEFAULT_POOL = 'default'
+
+HTTPError = httpx.HTTPError
+IntegrationUnavailable = resilience.IntegrationUnavailable
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'INTEGRATIONS_HTTP', {})}
+
+
+def _related(instance, name):
+    """Relação one-to-one opcional, sem levantar DoesNotExist"""
+    try:
+        return getattr(instance, name)
+    except ObjectDoesNotExist:
+        return None
+
+
+def integration_options(integration=None):
+    """Retorna (timeout, max_connections, verify) configurados na integração"""
+    config = _config()
+    timeout = config['TIMEOUT']
+    max_connections = config['MAX_CONNECTIONS']
+    verify = True
+
+    if integration is not None:
+        api = _related(integration, 'api_connection')
+        webhook = _related(integration, 'webhook')
+        if api is not None:
+            timeout = api.timeout
+            max_connections = api.max_concurrency
+        if webhook is not None:
+            timeout = webhook.timeout
+            verify = webhook.verify_ssl
+    return float(timeout), max_connections, verify
+
+
+def auth_headers(api):
+    """Headers padrão da ApiConnection acrescidos da autenticação configurada"""
+    headers = dict(api.default_headers or {})
+    if api.auth_type == 'bearer' and api.access_token:
+        headers['Authorization'] = f'Bearer {api.access_token}'
+    elif api.auth_type == 'oauth2':
+        # Token em cache, renovado antes de expirar (levanta TokenError se falhar)
+        headers['Authorization'] = f'Bearer {oauth.get_access_token(api)}'
+    elif api.auth_type == 'api_key' and api.api_key:
+        headers['X-API-Key'] = api.api_key
+    return headers
+
+
+class HttpClientPool:
+    """
+    Registro dos clientes httpx reutilizados entre requisições.
+
+    Clientes síncronos são compartilhados pelo processo; os assíncronos são
+    presos ao event loop em que foram criados, então há um conjunto por loop.
+    Alterar timeout/limite/SSL da integração cria um cliente novo; o antigo é
+    aposentado sem ser fechado, porque outras threads/tarefas podem estar no
+    meio de uma requisição com ele, e só é fechado junto com o pool.
+    """
+
+    def __init__(self):
+        self._clients = {}
+        self._retired = []
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._async_retired = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _client_kwargs(self, options):
+        config = _config()
+        timeout, max_connections, verify = options
+        return {
+            'http2': bool(config['HTTP2']) and HTTP2_AVAILABLE,
+            'verify': verify,
+            'timeout': httpx.Timeout(timeout, pool=timeout),
+            'limits': httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=min(config['MAX_KEEPALIVE_CONNECTIONS'], max_connections),
+                keepalive_expiry=config['KEEPALIVE_EXPIRY'],
+            ),
+        }
+
+    def get(self, key, options):
+        with self._lock:
+            current = self._clients.get(key)
+            if current is not None and current[0] == options:
+                return current[1]
+            client = httpx.Client(**self._client_kwargs(options))
+            self._clients[key] = (options, client)
+            if current is not None:
+                self._retired.append(current[1])
+        return client
+
+    def get_async(self, key, options):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {})
+            current = clients.get(key)
+            if current is not None and current[0] == options:
+                return current[1]
+            client = httpx.AsyncClient(**self._client_kwargs(options))
+            clients[key] = (options, client)
+            if current is not None:
+                self._async_retired.setdefault(loop, []).append(current[1])
+        return client
+
+    def close(self):
+        with self._lock:
+            clients, self._clients = self._clients, {}
+            retired, self._retired = self._retired, []
+        for client in [client for _, client in clients.values()] + retired:
+            client.close()
+
+    async def aclose(self):
+        """Fecha os clientes assíncronos do loop atual"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._async_clients.pop(loop, {})
+            retired = self._async_retired.pop(loop, [])
+        for client in [client for _, client in clients.values()] + retired:
+            await client.aclose()
+
+
+_pool = HttpClientPool()
+
+
+def get_client_pool():
+    return _pool
+
+
+def _pool_key(integration, options):
+    # Integrações têm um pool próprio; chamadas avulsas compartilham um por configuração
+    if integration is not None:
+        return integration.pk
+    return (DEFAULT_POOL,) + options
+
+
+def request(method, url, integration=None, timeout=None, max_connections=None, **kwargs):
+    """
+    Executa uma requisição síncrona pelo pool da integração.
+
+    Levanta httpx.HTTPError (exportado como HTTPError) em falhas de rede e
+    IntegrationUnavailable quando o circuito ou o bulkhead recusam a chamada.
+    """
+    options = _resolve_options(integration, timeout, max_connections)
+    client = _pool.get(_pool_key(integration, options), options)
+    if integration is None:
+        return client.request(method, url, **kwargs)
+
+    breaker = resilience.get_breaker(integration, options[1])
+    breaker.acquire()
+    started = time.monotonic()
+    ok = False
+    try:
+        response = client.request(method, url, **kwargs)
+        ok = response.status_code < 500
+    finally:
+        transition = breaker.release(ok, time.monotonic() - started)
+        if transition:
+            resilience.persist_status(integration.pk, transition)
+    return response
+
+
+async def arequest(method, url, integration=None, timeout=None, max_connections=None, **kwargs):
+    """Versão assíncrona de `request`, sem ocupar threads durante a espera"""
+    options = _resolve_options(integration, timeout, max_connections)
+    client = _pool.get_async(_pool_key(integration, options), options)
+    if integration is None:
+        return await client.request(method, url, **kwargs)
+
+    breaker = resilience.get_breaker(integration, options[1])
+    breaker.acquire()
+    started = time.monotonic()
+    ok = False
+    try:
+        response = await client.request(method, url, **kwargs)
+        ok = response.status_code < 500
+    finally:
+        transition = breaker.release(ok, time.monotonic() - started)
+        if transition:
+            await sync_to_async(resilience.persist_status)(integration.pk, transition)
+    return response
+
+
+def _resolve_options(integration, timeout, max_connections):
+    default_timeout, default_max, verify = integration_options(integration)
+    return (
+        float(timeout if timeout is not None else default_timeout),
+        max_connections or default_max,
+        verify,
+    )
@@ -0,0 +1,323 @@
+"""
+Pipeline de gravação dos IntegrationLog
+
+Os logs entram numa fila em memória e são gravados em lote (bulk_create)
+por uma thread de fundo. Se o banco falhar o lote volta para a fila (até
+MAX_PENDING logs), e logs que violam a integridade (ex.: integração
+removida) são descartados um a um sem levar o lote junto. Cada nível tem uma taxa de amostragem, e payloads
+grandes são comprimidos ou truncados antes de ir para o banco. Logs antigos
+são compactados em IntegrationLogSummary por `compact_logs`.
+"""
+import atexit
+import base64
+from collections import defaultdict
+from datetime import timedelta
+import json
+import logging
+import random
+import threading
+import zlib
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import IntegrationLog, IntegrationLogSummary
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'MAX_SIZE': 500,
+    'FLUSH_INTERVAL': 2.0,
+    # Limite da fila enquanto o banco está falhando; os mais antigos são descartados
+    'MAX_PENDING': 10000,
+    # Fração gravada por nível; níveis ausentes são sempre gravados
+    'SAMPLING': {'debug': 0.0},
+    # Payloads maiores que isso (bytes de JSON) são comprimidos; se ainda
+    # ficarem maiores, são truncados
+    'MAX_PAYLOAD_BYTES': 4096,
+    'RETENTION_HOURS': 72,
+}
+
+COMPRESSED = 'zlib+base64'
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'INTEGRATION_LOGS', {})}
+
+
+def pack_payload(payload, max_bytes):
+    """Mantém o payload como está, comprimido ou truncado, conforme o tamanho"""
+    if payload is None:
+        return None
+    raw = json.dumps(payload, default=str, ensure_ascii=False).encode('utf-8')
+    if len(raw) <= max_bytes:
+        return payload
+
+    compressed = base64.b64encode(zlib.compress(raw, 6)).decode('ascii')
+    if len(compressed) <= max_bytes:
+        return {'_encoding': COMPRESSED, 'size': len(raw), 'data': compressed}
+    return {'_truncated': True, 'size': len(raw), 'preview': raw[:max_bytes].decode('utf-8', 'ignore')}
+
+
+def unpack_payload(payload):
+    """Desfaz a compressão de `pack_payload` (payloads truncados ficam como estão)"""
+    if isinstance(payload, dict) and payload.get('_encoding') == COMPRESSED:
+        return json.loads(zlib.decompress(base64.b64decode(payload['data'])))
+    return payload
+
+
+class IntegrationLogWriter:
+    """
+    Fila de IntegrationLog gravada em lotes por uma thread de fundo
+    """
+
+    def __init__(self, max_size=500, flush_interval=2.0, sampling=None, max_payload_bytes=4096, max_pending=10000):
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.max_pending = max(max_pending, max_size)
+        self.sampling = sampling or {}
+        self.max_payload_bytes = max_payload_bytes
+
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def log(self, integration_id, action, level='info', message='', request_data=None,
+            response_data=None, sample=True, **fields):
+        """
+        Enfileira um log. Com `sample`, aplica a taxa de amostragem do nível;
+        retorna False se o log foi descartado pela amostragem.
+        """
+        rate = self.sampling.get(level, 1.0) if sample else 1.0
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return False
+
+        entry = IntegrationLog(
+            integration_id=integration_id,
+            action=action,
+            level=level,
+            message=message,
+            request_data=pack_payload(request_data, self.max_payload_bytes),
+            response_data=pack_payload(response_data, self.max_payload_bytes),
+            sample_rate=rate,
+            timestamp=timezone.now(),
+            **fields
+        )
+        with self._lock:
+            self._pending.append(entry)
+            full = len(self._pending) >= self.max_size
+            self._ensure_thread()
+
+        if full:
+            self._wakeup.set()
+        return True
+
+    def __len__(self):
+        return len(self._pending)
+
+    def flush(self):
+        """Grava imediatamente tudo o que está na fila"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+            try:
+                self._write(batch)
+            except Exception:
+                # Falha transitória (conexão, deadlock): o lote volta para a fila
+                self._requeue(batch)
+                raise
+
+    def close(self):
+        """Para a thread de flush e grava o restante (chamado no atexit)"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.flush_interval * 2)
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Falha ao gravar logs de integração no desligamento')
+
+    def _write(self, batch):
+        try:
+            with transaction.atomic():
+                IntegrationLog.objects.bulk_create(batch, batch_size=self.max_size)
+        except IntegrityError:
+            rejected = 0
+            # Um registro por transação: as FKs só são verificadas no commit
+            for entry in batch:
+                try:
+                    with transaction.atomic():
+                        IntegrationLog.objects.bulk_create([entry])
+                except IntegrityError:
+                    rejected += 1
+            if rejected:
+                logger.warning('%d logs de integração descartados por violar a integridade', rejected)
+
+    def _requeue(self, batch):
+        with self._lock:
+            pending = batch + self._pending
+            dropped = max(len(pending) - self.max_pending, 0)
+            self._pending = pending[dropped:]
+        if dropped:
+            logger.warning('%d logs de integração descartados: fila cheia com o banco falhando', dropped)
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='integration-logs', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if not self._pending:
+                continue
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Falha ao gravar lote de logs de integração')
+                # Espera o intervalo antes de tentar de novo, mesmo com a fila cheia
+                self._stopped.wait(self.flush_interval)
+            finally:
+                close_old_connections()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_log_writer():
+    """Writer compartilhado do processo, ou None se desabilitado nas settings"""
+    global _writer
+    config = _config()
+    if not config['ENABLED']:
+        return None
+
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = IntegrationLogWriter(
+                    max_size=config['MAX_SIZE'],
+                    flush_interval=config['FLUSH_INTERVAL'],
+                    sampling=config['SAMPLING'],
+                    max_payload_bytes=config['MAX_PAYLOAD_BYTES'],
+                    max_pending=config['MAX_PENDING'],
+                )
+                atexit.register(_writer.close)
+    return _writer
+
+
+def log_integration(integration_id, action, level='info', message='', **fields):
+    """
+    Registra um IntegrationLog pelo pipeline; com o pipeline desabilitado,
+    grava na hora (ainda com compressão/truncamento dos payloads).
+    """
+    writer = get_log_writer()
+    if writer is not None:
+        return writer.log(integration_id, action, level, message, **fields)
+
+    max_bytes = _config()['MAX_PAYLOAD_BYTES']
+    fields.pop('sample', None)
+    for name in ('request_data', 'response_data'):
+        if name in fields:
+            fields[name] = pack_payload(fields[name], max_bytes)
+    IntegrationLog.objects.create(integration_id=integration_id, action=action, level=level, message=message, **fields)
+    return True
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    index = min(int(round(fraction * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+def compact_logs(older_than=None, now=None):
+    """
+    Resume em IntegrationLogSummary as horas completas mais antigas que a
+    retenção e apaga os logs resumidos. Retorna (resumos gravados, logs apagados).
+    """
+    now = now or timezone.now()
+    if older_than is None:
+        older_than = timedelta(hours=_config()['RETENTION_HOURS'])
+    cutoff = (now - older_than).replace(minute=0, second=0, microsecond=0)
+
+    old_logs = IntegrationLog.objects.filter(timestamp__lt=cutoff)
+    hours = old_logs.annotate(hour=TruncHour('timestamp')).values_list('hour', flat=True).distinct()
+
+    summaries = 0
+    deleted = 0
+    for hour in sorted(set(hours)):
+        with transaction.atomic():
+            rows = IntegrationLog.objects.filter(
+                timestamp__gte=hour, timestamp__lt=hour + timedelta(hours=1)
+            ).values_list('integration_id', 'action', 'level', 'status_code', 'duration', 'cache_status', 'sample_rate')
+
+            groups = defaultdict(list)
+            for integration_id, action, *row in rows.iterator():
+                groups[(integration_id, action)].append(row)
+
+            for (integration_id, action), group in groups.items():
+                _merge_summary(integration_id, hour, action, group)
+                summaries += 1
+
+            deleted += IntegrationLog.objects.filter(
+                timestamp__gte=hour, timestamp__lt=hour + timedelta(hours=1)
+            ).delete()[0]
+    return summaries, deleted
+
+
+def _merge_summary(integration_id, hour, action, rows):
+    count = error_count = hits = misses = 0
+    status_codes = defaultdict(int)
+    durations = []
+    for level, status_code, duration, cache_status, sample_rate in rows:
+        # Cada linha amostrada representa 1/sample_rate eventos
+        weight = round(1 / sample_rate) if sample_rate else 1
+        count += weight
+        if level in ('error', 'critical'):
+            error_count += weight
+        if cache_status in ('hit', 'stale'):
+            hits += weight
+        elif cache_status == 'miss':
+            misses += weight
+        if status_code is not None:
+            status_codes[str(status_code)] += weight
+        if duration is not None:
+            durations.append(duration)
+    durations.sort()
+
+    p50 = _percentile(durations, 0.5)
+    p95 = _percentile(durations, 0.95)
+
+    summary, created = IntegrationLogSummary.objects.select_for_update().get_or_create(
+        integration_id=integration_id, hour=hour, action=action
+    )
+    if not created:
+        # Logs que chegaram depois da compactação da hora: percentis aproximados
+        for code, value in summary.status_codes.items():
+            status_codes[code] += value
+        if summary.duration_p50 is not None and p50 is not None:
+            p50 = (summary.duration_p50 * summary.count + p50 * count) / (summary.count + count)
+            p95 = max(summary.duration_p95, p95)
+        elif p50 is None:
+            p50, p95 = summary.duration_p50, summary.duration_p95
+
+    summary.count += count
+    summary.error_count += error_count
+    summary.cache_hits += hits
+    summary.cache_misses += misses
+    summary.status_codes = dict(status_codes)
+    summary.duration_p50 = p50
+    summary.duration_p95 = p95
+    summary.save()
@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.integrations.log_pipeline import compact_logs
+
+
+class Command(BaseCommand):
+    help = 'Resume por hora os logs de integração mais antigos que a retenção e apaga os detalhados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, help='Retenção em horas (padrão: INTEGRATION_LOGS["RETENTION_HOURS"])')
+
+    def handle(self, *args, **options):
+        older_than = timedelta(hours=options['hours']) if options['hours'] is not None else None
+        summaries, deleted = compact_logs(older_than=older_than)
+        self.stdout.write(self.style.SUCCESS(
+            f'{summaries} resumos gravados, {deleted} logs compactados.'
+        ))
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apiconnection',
+            name='max_concurrency',
+            field=models.PositiveIntegerField(default=10, verbose_name='Máximo de Requisições Simultâneas'),
+        ),
+        migrations.AddField(
+            model_name='webhook',
+            name='timeout',
+            field=models.PositiveIntegerField(default=10, verbose_name='Timeout (segundos)'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0002_apiconnection_max_concurrency_webhook_timeout'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apiconnection',
+            name='scope',
+            field=models.CharField(blank=True, max_length=500, verbose_name='Escopo'),
+        ),
+        migrations.AddField(
+            model_name='apiconnection',
+            name='token_expires_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Expiração do Token'),
+        ),
+        migrations.AddField(
+            model_name='apiconnection',
+            name='token_url',
+            field=models.URLField(blank=True, verbose_name='URL do Token'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0003_apiconnection_scope_apiconnection_token_expires_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apiconnection',
+            name='cache_enabled',
+            field=models.BooleanField(default=False, verbose_name='Cache de Respostas'),
+        ),
+        migrations.AddField(
+            model_name='apiconnection',
+            name='cache_max_entries',
+            field=models.PositiveIntegerField(default=1000, verbose_name='Máximo de Respostas em Cache'),
+        ),
+        migrations.AddField(
+            model_name='apiconnection',
+            name='cache_negative_ttl',
+            field=models.PositiveIntegerField(default=0, verbose_name='TTL de Respostas 404/410 (segundos)'),
+        ),
+        migrations.AddField(
+            model_name='apiconnection',
+            name='cache_stale_ttl',
+            field=models.PositiveIntegerField(default=0, verbose_name='Janela Stale-While-Revalidate (segundos)'),
+        ),
+        migrations.AddField(
+            model_name='apiconnection',
+            name='cache_ttl',
+            field=models.PositiveIntegerField(default=300, verbose_name='TTL do Cache (segundos)'),
+        ),
+        migrations.AddField(
+            model_name='apiconnection',
+            name='cache_vary_headers',
+            field=models.JSONField(blank=True, default=list, verbose_name='Headers na Chave do Cache'),
+        ),
+        migrations.AddField(
+            model_name='integrationlog',
+            name='cache_status',
+            field=models.CharField(blank=True, choices=[('hit', 'Hit'), ('stale', 'Stale'), ('miss', 'Miss'), ('bypass', 'Bypass')], max_length=10, verbose_name='Status do Cache'),
+        ),
+    ]
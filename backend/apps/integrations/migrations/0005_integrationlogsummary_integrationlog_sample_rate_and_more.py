@@ -0,0 +1,62 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0004_apiconnection_cache_enabled_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IntegrationLogSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(verbose_name='Hora')),
+                ('action', models.CharField(max_length=100, verbose_name='Ação')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('error_count', models.PositiveIntegerField(default=0)),
+                ('cache_hits', models.PositiveIntegerField(default=0)),
+                ('cache_misses', models.PositiveIntegerField(default=0)),
+                ('duration_p50', models.FloatField(blank=True, null=True)),
+                ('duration_p95', models.FloatField(blank=True, null=True)),
+                ('status_codes', models.JSONField(default=dict)),
+            ],
+            options={
+                'verbose_name': 'Resumo de Logs de Integração',
+                'verbose_name_plural': 'Resumos de Logs de Integrações',
+                'ordering': ['-hour'],
+            },
+        ),
+        migrations.AddField(
+            model_name='integrationlog',
+            name='sample_rate',
+            field=models.FloatField(default=1.0, verbose_name='Taxa de Amostragem'),
+        ),
+        migrations.AlterField(
+            model_name='integrationlog',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='integrationlog',
+            index=models.Index(fields=['integration', '-timestamp'], name='integration_integra_00bd0e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='integrationlog',
+            index=models.Index(fields=['timestamp'], name='integration_timesta_b8c6eb_idx'),
+        ),
+        migrations.AddField(
+            model_name='integrationlogsummary',
+            name='integration',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='log_summaries', to='integrations.integration'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='integrationlogsummary',
+            unique_together={('integration', 'hour', 'action')},
+        ),
+    ]
@@ -3,6 +3,7 @@ Modelos para integrações externas
 """
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 import uuid
 
 
@@ -80,6 +81,7 @@ class Webhook(models.Model):
     # Configurações de segurança
     secret_token = models.CharField(max_length=255, blank=True, verbose_name="Token Secreto")
     verify_ssl = models.BooleanField(default=True, verbose_name="Verificar SSL")
+    timeout = models.PositiveIntegerField(default=10, verbose_name="Timeout (segundos)")
     
     # Configurações de retry
     max_retries = models.PositiveIntegerField(default=3, verbose_name="Máximo de Tentativas")
@@ -116,11 +118,25 @@ class ApiConnection(models.Model):
     access_token = models.TextField(blank=True, verbose_name="Access Token")
     refresh_token = models.TextField(blank=True, verbose_name="Refresh Token")
     
+    # OAuth 2.0 (api_key/api_secret são o client_id/client_secret)
+    token_url = models.URLField(blank=True, verbose_name="URL do Token")
+    scope = models.CharField(max_length=500, blank=True, verbose_name="Escopo")
+    token_expires_at = models.DateTimeField(null=True, blank=True, verbose_name="Expiração do Token")
+    
     # Headers padrão
     default_headers = models.JSONField(default=dict, verbose_name="Headers Padrão")
     
     # Configurações de timeout
     timeout = models.PositiveIntegerField(default=30, verbose_name="Timeout (segundos)")
+    max_concurrency = models.PositiveIntegerField(default=10, verbose_name="Máximo de Requisições Simultâneas")
+    
+    # Cache das respostas GET (opcional)
+    cache_enabled = models.BooleanField(default=False, verbose_name="Cache de Respostas")
+    cache_ttl = models.PositiveIntegerField(default=300, verbose_name="TTL do Cache (segundos)")
+    cache_stale_ttl = models.PositiveIntegerField(default=0, verbose_name="Janela Stale-While-Revalidate (segundos)")
+    cache_negative_ttl = models.PositiveIntegerField(default=0, verbose_name="TTL de Respostas 404/410 (segundos)")
+    cache_vary_headers = models.JSONField(default=list, blank=True, verbose_name="Headers na Chave do Cache")
+    cache_max_entries = models.PositiveIntegerField(default=1000, verbose_name="Máximo de Respostas em Cache")
     
     class Meta:
         verbose_name = "Conexão API"
@@ -156,19 +172,68 @@ class IntegrationLog(models.Model):
     response_data = models.JSONField(null=True, blank=True, verbose_name="Dados da Resposta")
     status_code = models.PositiveIntegerField(null=True, blank=True, verbose_name="Código de Status")
     duration = models.FloatField(null=True, blank=True, verbose_name="Duração (segundos)")
+    cache_status = models.CharField(
+        max_length=10,
+        blank=True,
+        choices=[
+            ('hit', 'Hit'),
+            ('stale', 'Stale'),
+            ('miss', 'Miss'),
+            ('bypass', 'Bypass'),
+        ],
+        verbose_name="Status do Cache"
+    )
+    # Fração dos logs deste nível que é gravada (cada linha representa 1/sample_rate eventos)
+    sample_rate = models.FloatField(default=1.0, verbose_name="Taxa de Amostragem")
     
     # Timestamp
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Horário do evento, preservado quando o insert é feito em lote pelo pipeline
+    timestamp = models.DateTimeField(default=timezone.now)
     
     class Meta:
         verbose_name = "Log de Integração"
         verbose_name_plural = "Logs de Integrações"
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['integration', '-timestamp']),
+            models.Index(fields=['timestamp']),
+        ]
     
     def __str__(self):
         return f"{self.integration.name} - {self.action} ({self.level})"
 
 
+class IntegrationLogSummary(models.Model):
+    """
+    Resumo por hora dos logs de integração já compactados
+    """
+    integration = models.ForeignKey(Integration, on_delete=models.CASCADE, related_name='log_summaries')
+    hour = models.DateTimeField(verbose_name="Hora")
+    action = models.CharField(max_length=100, verbose_name="Ação")
+    
+    # Contagens (já corrigidas pela amostragem)
+    count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    cache_hits = models.PositiveIntegerField(default=0)
+    cache_misses = models.PositiveIntegerField(default=0)
+    
+    # Duração (segundos)
+    duration_p50 = models.FloatField(null=True, blank=True)
+    duration_p95 = models.FloatField(null=True, blank=True)
+    
+    # Histograma {status_code: quantidade}
+    status_codes = models.JSONField(default=dict)
+    
+    class Meta:
+        verbose_name = "Resumo de Logs de Integração"
+        verbose_name_plural = "Resumos de Logs de Integrações"
+        ordering = ['-hour']
+        unique_together = ['integration', 'hour', 'action']
+    
+    def __str__(self):
+        return f"{self.integration_id} - {self.action} @ {self.hour:%Y-%m-%d %H:00}"
+
+
 class IntegrationTemplate(models.Model):
     """
     Templates pré-configurados para integrações
@@ -0,0 +1,232 @@
+"""
+Gerenciamento dos tokens OAuth 2.0 das ApiConnection
+
+Os tokens ficam em memória no processo e no cache compartilhado (Redis por
+padrão, via CACHES) com a expiração. A renovação é feita antes de expirar
+por uma única thread no processo e um único processo no cluster; enquanto
+isso os demais continuam usando o token atual, ou aguardam o novo quando o
+atual já expirou. Tokens rotacionados são gravados na ApiConnection.
+
+O lock entre processos só existe com um cache compartilhado: se CACHES for
+trocado pelo LocMemCache cada processo renova por conta própria, o que é
+avisado no log ao criar o gerenciador.
+"""
+from collections import namedtuple
+from datetime import datetime, timezone as dt_timezone
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+import httpx
+
+from . import http
+from .models import ApiConnection
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # Renova o token quando faltar menos que isso para expirar
+    'REFRESH_MARGIN': 60,
+    # Tempo máximo de posse do lock de renovação entre processos
+    'LOCK_TIMEOUT': 30,
+    'DEFAULT_EXPIRES_IN': 3600,
+}
+
+WAIT_INTERVAL = 0.1
+
+Token = namedtuple('Token', ['access_token', 'expires_at'])
+
+
+class TokenError(httpx.HTTPError):
+    """Falha ao obter ou renovar o token OAuth 2.0"""
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'INTEGRATIONS_OAUTH', {})}
+
+
+def _token_key(api_id):
+    return f'oauth_token:{api_id}'
+
+
+def _lock_key(api_id):
+    return f'oauth_token_lock:{api_id}'
+
+
+class TokenManager:
+    """
+    Cache e renovação single-flight dos access tokens
+    """
+
+    def __init__(self, refresh_margin=60, lock_timeout=30, default_expires_in=3600):
+        self.refresh_margin = refresh_margin
+        self.lock_timeout = lock_timeout
+        self.default_expires_in = default_expires_in
+        self._tokens = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def get_token(self, api):
+        """Retorna um access token válido para a conexão, renovando se preciso"""
+        now = time.time()
+        token = self._current(api)
+        if token is not None and token.expires_at - now > self.refresh_margin:
+            return token.access_token
+
+        lock = self._lock_for(api.pk)
+        if token is not None and token.expires_at > now:
+            # Ainda válido: só quem pegar o lock renova, os demais seguem com o atual
+            if not lock.acquire(blocking=False):
+                return token.access_token
+            try:
+                return self._refresh(api, token).access_token
+            except TokenError as exc:
+                logger.warning('Falha ao renovar token da conexão %s: %s', api.pk, exc)
+                return token.access_token
+            finally:
+                lock.release()
+
+        with lock:
+            token = self._current(api)
+            if token is not None and token.expires_at - time.time() > self.refresh_margin:
+                return token.access_token
+            return self._refresh(api, token).access_token
+
+    def invalidate(self, api):
+        """Descarta o token atual (ex.: após um 401 do provedor)"""
+        self._tokens.pop(api.pk, None)
+        cache.delete(_token_key(api.pk))
+        api.token_expires_at = None
+        ApiConnection.objects.filter(pk=api.pk).update(token_expires_at=None)
+
+    def _lock_for(self, api_id):
+        with self._guard:
+            return self._locks.setdefault(api_id, threading.Lock())
+
+    def _current(self, api):
+        """Token mais recente entre memória, cache compartilhado e banco"""
+        token = self._tokens.get(api.pk)
+        shared = self._shared(api.pk)
+        if shared is not None and (token is None or shared.expires_at > token.expires_at):
+            token = self._tokens[api.pk] = shared
+        if token is None and api.access_token and api.token_expires_at:
+            token = Token(api.access_token, api.token_expires_at.timestamp())
+        return token
+
+    def _shared(self, api_id):
+        data = cache.get(_token_key(api_id))
+        return Token(*data) if data else None
+
+    def _refresh(self, api, current):
+        """Renova o token sob o lock distribuído; outro processo pode já tê-lo feito"""
+        lock_key = _lock_key(api.pk)
+        owner = uuid.uuid4().hex
+        deadline = time.time() + self.lock_timeout
+        while not cache.add(lock_key, owner, self.lock_timeout):
+            shared = self._shared(api.pk)
+            if shared is not None and shared != current and shared.expires_at > time.time():
+                self._tokens[api.pk] = shared
+                return shared
+            if time.time() > deadline:
+                # Lock preso além do próprio timeout: renova sem ele
+                owner = None
+                break
+            time.sleep(WAIT_INTERVAL)
+
+        try:
+            shared = self._shared(api.pk)
+            if shared is not None and shared.expires_at - time.time() > self.refresh_margin:
+                self._tokens[api.pk] = shared
+                return shared
+            token = self._request_token(api)
+        finally:
+            # Só libera o próprio lock; o de outro processo expira sozinho
+            if owner is not None and cache.get(lock_key) == owner:
+                cache.delete(lock_key)
+        return token
+
+    def _request_token(self, api):
+        if not api.token_url:
+            if api.access_token:
+                # Sem endpoint de token não há como renovar: usa o token estático
+                return Token(api.access_token, time.time() + self.default_expires_in)
+            raise TokenError('URL do token não configurada na conexão')
+
+        # O refresh token pode ter sido rotacionado por outro processo
+        refresh_token = ApiConnection.objects.filter(pk=api.pk).values_list(
+            'refresh_token', flat=True
+        ).first() or api.refresh_token
+        if refresh_token:
+            data = {'grant_type': 'refresh_token', 'refresh_token': refresh_token}
+        else:
+            data = {'grant_type': 'client_credentials'}
+        if api.scope:
+            data['scope'] = api.scope
+
+        response = http.request(
+            'POST',
+            api.token_url,
+            timeout=api.timeout,
+            data=data,
+            auth=(api.api_key, api.api_secret) if api.api_key else None,
+        )
+        if response.status_code >= 400:
+            raise TokenError(f'Endpoint de token respondeu {response.status_code}')
+        try:
+            payload = response.json()
+            access_token = payload['access_token']
+        except (ValueError, KeyError):
+            raise TokenError('Resposta do endpoint de token sem access_token')
+
+        expires_at = time.time() + int(payload.get('expires_in') or self.default_expires_in)
+        token = Token(access_token, expires_at)
+        self._store(api, token, payload.get('refresh_token'))
+        return token
+
+    def _store(self, api, token, refresh_token=None):
+        self._tokens[api.pk] = token
+        cache.set(_token_key(api.pk), tuple(token), max(int(token.expires_at - time.time()), 1))
+
+        fields = {
+            'access_token': token.access_token,
+            'token_expires_at': datetime.fromtimestamp(token.expires_at, tz=dt_timezone.utc),
+        }
+        if refresh_token:
+            fields['refresh_token'] = refresh_token
+        ApiConnection.objects.filter(pk=api.pk).update(**fields)
+        for field, value in fields.items():
+            setattr(api, field, value)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_token_manager():
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            config = _config()
+            if isinstance(caches['default'], LocMemCache):
+                logger.warning(
+                    'CACHES usa LocMemCache: a renovação dos tokens OAuth é única só dentro de cada processo'
+                )
+            _manager = TokenManager(
+                refresh_margin=config['REFRESH_MARGIN'],
+                lock_timeout=config['LOCK_TIMEOUT'],
+                default_expires_in=config['DEFAULT_EXPIRES_IN'],
+            )
+    return _manager
+
+
+def get_access_token(api):
+    return get_token_manager().get_token(api)
+
+
+def invalidate_access_token(api):
+    get_token_manager().invalidate(api)
@@ -0,0 +1,229 @@
+"""
+Circuit breaker e bulkhead por integração
+
+Cada integração tem estatísticas em memória (janela deslizante de taxa de
+erro e de chamadas lentas) que abrem o circuito quando o parceiro degrada.
+Com o circuito aberto as chamadas falham na hora, sem ocupar workers até o
+timeout; depois de OPEN_SECONDS algumas chamadas de sonda (half-open)
+decidem se o circuito fecha ou volta a abrir. O bulkhead limita as
+chamadas simultâneas de cada integração e também falha na hora quando cheio.
+"""
+from collections import deque
+import logging
+import threading
+import time
+
+from django.conf import settings
+import httpx
+
+from .models import Integration
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+DEFAULTS = {
+    'WINDOW': 60,
+    'MIN_CALLS': 10,
+    'ERROR_RATE': 0.5,
+    'SLOW_CALL_SECONDS': 5.0,
+    'SLOW_CALL_RATE': 0.8,
+    'OPEN_SECONDS': 30,
+    'HALF_OPEN_PROBES': 1,
+}
+
+
+class IntegrationUnavailable(httpx.HTTPError):
+    """Chamada recusada localmente, sem chegar ao parceiro"""
+
+
+class CircuitOpenError(IntegrationUnavailable):
+    pass
+
+
+class BulkheadFullError(IntegrationUnavailable):
+    pass
+
+
+def _config(integration):
+    """Configuração global sobrescrita por integration.config['circuit_breaker']"""
+    config = {**DEFAULTS, **getattr(settings, 'INTEGRATION_RESILIENCE', {})}
+    overrides = (integration.config or {}).get('circuit_breaker') or {}
+    config.update({key.upper(): value for key, value in overrides.items() if key.upper() in DEFAULTS})
+    return config
+
+
+class RollingStats:
+    """
+    Contadores por segundo das últimas `window` segundos de chamadas
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self._buckets = deque()
+
+    def record(self, ok, latency, slow, now):
+        second = int(now)
+        if not self._buckets or self._buckets[-1][0] != second:
+            self._buckets.append([second, 0, 0, 0, 0.0])
+        bucket = self._buckets[-1]
+        bucket[1] += 1
+        bucket[2] += 0 if ok else 1
+        bucket[3] += 1 if slow else 0
+        bucket[4] += latency
+        self._expire(now)
+
+    def _expire(self, now):
+        limit = int(now) - self.window
+        while self._buckets and self._buckets[0][0] <= limit:
+            self._buckets.popleft()
+
+    def snapshot(self, now):
+        """Retorna (chamadas, falhas, lentas, latência média)"""
+        self._expire(now)
+        calls = failures = slow = 0
+        latency = 0.0
+        for _, bucket_calls, bucket_failures, bucket_slow, bucket_latency in self._buckets:
+            calls += bucket_calls
+            failures += bucket_failures
+            slow += bucket_slow
+            latency += bucket_latency
+        return calls, failures, slow, (latency / calls if calls else 0.0)
+
+    def reset(self):
+        self._buckets.clear()
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker com bulkhead de uma integração
+    """
+
+    def __init__(self, integration_id, config, max_in_flight):
+        self.integration_id = integration_id
+        self.state = CLOSED
+        self.opened_at = None
+        self.stats = RollingStats(config['WINDOW'])
+        self._lock = threading.Lock()
+        self._probes = 0
+        self._probe_successes = 0
+        self._in_flight = 0
+        self.configure(config, max_in_flight)
+
+    def configure(self, config, max_in_flight):
+        self.config = config
+        self.stats.window = config['WINDOW']
+        self.max_in_flight = max_in_flight
+
+    def acquire(self, now=None):
+        """
+        Reserva uma chamada. Levanta CircuitOpenError com o circuito aberto
+        (ou sem vagas de sonda) e BulkheadFullError sem vagas no bulkhead.
+        """
+        now = now or time.monotonic()
+        with self._lock:
+            if self.state == OPEN and now - self.opened_at >= self.config['OPEN_SECONDS']:
+                self.state = HALF_OPEN
+                self._probes = 0
+                self._probe_successes = 0
+
+            if self.state == OPEN:
+                raise CircuitOpenError(f'Circuito aberto para a integração {self.integration_id}')
+            if self.state == HALF_OPEN:
+                if self._probes >= self.config['HALF_OPEN_PROBES']:
+                    raise CircuitOpenError(f'Circuito em teste para a integração {self.integration_id}')
+                self._probes += 1
+
+            if self._in_flight >= self.max_in_flight:
+                if self.state == HALF_OPEN:
+                    self._probes -= 1
+                raise BulkheadFullError(f'Limite de chamadas simultâneas atingido para a integração {self.integration_id}')
+            self._in_flight += 1
+
+    def release(self, ok, latency, now=None):
+        """
+        Libera a vaga e registra o resultado da chamada.
+
+        Retorna o novo estado se o circuito abriu ou fechou (para ser
+        refletido com `persist_status`), ou None.
+        """
+        now = now or time.monotonic()
+        transition = None
+        with self._lock:
+            self._in_flight -= 1
+            slow = latency >= self.config['SLOW_CALL_SECONDS']
+            self.stats.record(ok, latency, slow, now)
+
+            if self.state == HALF_OPEN:
+                if ok and not slow:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.config['HALF_OPEN_PROBES']:
+                        transition = self._close()
+                else:
+                    transition = self._open(now)
+            elif self.state == CLOSED:
+                calls, failures, slow_calls, _ = self.stats.snapshot(now)
+                if calls >= self.config['MIN_CALLS'] and (
+                    failures / calls >= self.config['ERROR_RATE']
+                    or slow_calls / calls >= self.config['SLOW_CALL_RATE']
+                ):
+                    transition = self._open(now)
+        return transition
+
+    def _open(self, now):
+        self.state = OPEN
+        self.opened_at = now
+        logger.warning('Circuito aberto para a integração %s', self.integration_id)
+        return OPEN
+
+    def _close(self):
+        self.state = CLOSED
+        self.opened_at = None
+        self.stats.reset()
+        logger.info('Circuito fechado para a integração %s', self.integration_id)
+        return CLOSED
+
+    def snapshot(self):
+        with self._lock:
+            calls, failures, slow, latency = self.stats.snapshot(time.monotonic())
+            return {
+                'state': self.state,
+                'calls': calls,
+                'failures': failures,
+                'slow_calls': slow,
+                'avg_latency': latency,
+                'in_flight': self._in_flight,
+                'max_in_flight': self.max_in_flight,
+            }
+
+
+def persist_status(integration_id, state):
+    """Reflete a abertura/fechamento do circuito em Integration.status"""
+    if state == OPEN:
+        Integration.objects.filter(pk=integration_id).exclude(status='inactive').update(status='error')
+    else:
+        Integration.objects.filter(pk=integration_id, status='error').update(status='active')
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(integration, max_in_flight):
+    """Circuit breaker da integração no processo, com a configuração atual"""
+    config = _config(integration)
+    with _breakers_lock:
+        breaker = _breakers.get(integration.pk)
+        if breaker is None:
+            breaker = _breakers[integration.pk] = CircuitBreaker(integration.pk, config, max_in_flight)
+        else:
+            breaker.configure(config, max_in_flight)
+    return breaker
+
+
+def breaker_snapshot(integration_id):
+    """Estado do circuito da integração neste processo, ou None se nunca usado"""
+    breaker = _breakers.get(integration_id)
+    return breaker.snapshot() if breaker else None
@@ -0,0 +1,228 @@
+"""
+Cache das respostas GET das ApiConnection
+
+Opcional por conexão (cache_enabled). Respostas 2xx ficam em cache por
+cache_ttl; 404/410 por cache_negative_ttl. Passado o TTL, a resposta ainda
+é servida por cache_stale_ttl segundos enquanto uma única revalidação roda
+em segundo plano. Cada conexão tem seu LRU limitado a cache_max_entries,
+e o processo todo um orçamento de bytes (MAX_BYTES) que descarta as
+respostas menos usadas entre todas as conexões; corpos maiores que
+MAX_ENTRY_BYTES não entram no cache.
+"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models.signals import post_delete, post_save
+import httpx
+
+from . import http
+
+
+logger = logging.getLogger(__name__)
+
+CACHEABLE_METHODS = frozenset({'GET', 'HEAD'})
+NEGATIVE_STATUSES = frozenset({404, 410})
+
+DEFAULTS = {
+    'MAX_BYTES': 64 * 1024 * 1024,
+    'MAX_ENTRY_BYTES': 1024 * 1024,
+    'REVALIDATE_WORKERS': 4,
+}
+
+HIT = 'hit'
+STALE = 'stale'
+MISS = 'miss'
+BYPASS = 'bypass'
+
+
+class CachedResponse:
+    """Resposta guardada no cache, com os prazos de frescor e de stale"""
+    __slots__ = ('status_code', 'headers', 'content', 'fresh_until', 'stale_until')
+
+    # Estimativa do que a entrada ocupa além do corpo (objeto, headers, chave)
+    OVERHEAD = 512
+
+    def __init__(self, response, ttl, stale_ttl, now):
+        self.status_code = response.status_code
+        self.headers = {'content-type': response.headers.get('content-type', '')}
+        self.content = response.content
+        self.fresh_until = now + ttl
+        self.stale_until = self.fresh_until + stale_ttl
+
+    @property
+    def size(self):
+        return len(self.content) + self.OVERHEAD
+
+    def to_response(self):
+        return httpx.Response(self.status_code, headers=self.headers, content=self.content)
+
+
+class ResponseCache:
+    """
+    LRUs por conexão, orçamento de bytes do processo e revalidações em
+    segundo plano (uma por chave)
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entry_bytes=1024 * 1024, revalidate_workers=4):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries = {}
+        # Ordem de uso entre todas as conexões, para o orçamento de bytes
+        self._usage = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._revalidating = set()
+        self._executor = ThreadPoolExecutor(max_workers=revalidate_workers, thread_name_prefix='response-cache')
+
+    def request(self, api, method, url, integration=None, **kwargs):
+        """
+        Executa a requisição passando pelo cache da conexão.
+        Retorna (resposta, status do cache).
+        """
+        method = method.upper()
+        if not api.cache_enabled or method not in CACHEABLE_METHODS:
+            return http.request(method, url, integration=integration, **kwargs), BYPASS
+
+        key = cache_key(api, method, url, kwargs)
+        now = time.monotonic()
+        entry = self._get(api.pk, key)
+        if entry is not None:
+            if now < entry.fresh_until:
+                return entry.to_response(), HIT
+            if now < entry.stale_until:
+                self._revalidate(api, key, method, url, integration, kwargs)
+                return entry.to_response(), STALE
+
+        response = http.request(method, url, integration=integration, **kwargs)
+        self._store(api, key, response)
+        return response, MISS
+
+    def _get(self, api_id, key):
+        with self._lock:
+            entries = self._entries.get(api_id)
+            if not entries or key not in entries:
+                return None
+            entries.move_to_end(key)
+            self._usage.move_to_end((api_id, key))
+            return entries[key]
+
+    def _store(self, api, key, response, now=None):
+        if response.is_success:
+            ttl = api.cache_ttl
+        elif response.status_code in NEGATIVE_STATUSES:
+            ttl = api.cache_negative_ttl
+        else:
+            ttl = 0
+        if ttl <= 0:
+            return
+
+        if len(response.content) > self.max_entry_bytes:
+            # Grande demais: também descarta a versão anterior, que ficou velha
+            with self._lock:
+                self._discard(api.pk, key)
+            return
+
+        entry = CachedResponse(response, ttl, api.cache_stale_ttl, now or time.monotonic())
+        with self._lock:
+            self._discard(api.pk, key)
+            entries = self._entries.setdefault(api.pk, OrderedDict())
+            entries[key] = entry
+            self._usage[(api.pk, key)] = entry.size
+            self._bytes += entry.size
+            while len(entries) > max(api.cache_max_entries, 1):
+                self._discard(api.pk, next(iter(entries)))
+            while self._bytes > self.max_bytes and self._usage:
+                self._discard(*next(iter(self._usage)))
+
+    def _discard(self, api_id, key):
+        """Remove uma entrada (chamado com o lock)"""
+        size = self._usage.pop((api_id, key), None)
+        if size is None:
+            return
+        self._bytes -= size
+        entries = self._entries[api_id]
+        del entries[key]
+        if not entries:
+            del self._entries[api_id]
+
+    def _revalidate(self, api, key, method, url, integration, kwargs):
+        with self._lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+        self._executor.submit(self._refresh, api, key, method, url, integration, kwargs)
+
+    def _refresh(self, api, key, method, url, integration, kwargs):
+        try:
+            response = http.request(method, url, integration=integration, **kwargs)
+            self._store(api, key, response)
+        except httpx.HTTPError as exc:
+            # Mantém a resposta stale até o fim da janela
+            logger.info('Falha ao revalidar cache da conexão %s: %s', api.pk, exc)
+        finally:
+            with self._lock:
+                self._revalidating.discard(key)
+            close_old_connections()
+
+    def invalidate(self, api_id):
+        """Descarta todas as respostas em cache da conexão"""
+        with self._lock:
+            for key in list(self._entries.get(api_id, ())):
+                self._discard(api_id, key)
+
+
+def cache_key(api, method, url, kwargs):
+    """Hash de método, URL, headers selecionados e corpo da requisição"""
+    digest = hashlib.sha256()
+    digest.update(f'{method} {url}'.encode('utf-8'))
+    headers = {name.lower(): value for name, value in (kwargs.get('headers') or {}).items()}
+    for name in sorted(header.lower() for header in api.cache_vary_headers or []):
+        digest.update(f'\n{name}:{headers.get(name, "")}'.encode('utf-8'))
+    params = kwargs.get('params')
+    if params:
+        digest.update(b'\n' + str(sorted(dict(params).items())).encode('utf-8'))
+    body = kwargs.get('content')
+    if body is None and kwargs.get('json') is not None:
+        body = json.dumps(kwargs['json'], sort_keys=True, default=str).encode('utf-8')
+    if body:
+        digest.update(b'\n' + hashlib.sha256(body).digest())
+    return digest.hexdigest()
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'INTEGRATIONS_RESPONSE_CACHE', {})}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                config = _config()
+                _cache = ResponseCache(
+                    max_bytes=config['MAX_BYTES'],
+                    max_entry_bytes=config['MAX_ENTRY_BYTES'],
+                    revalidate_workers=config['REVALIDATE_WORKERS'],
+                )
+    return _cache
+
+
+def _invalidate_connection(sender, instance, **kwargs):
+    if _cache is not None:
+        _cache.invalidate(instance.pk)
+
+
+# Alterar a conexão (URL, TTLs, autenticação) descarta as respostas em cache
+post_save.connect(_invalidate_connection, sender='integrations.ApiConnection', dispatch_uid='response_cache_api_save')
+post_delete.connect(_invalidate_connection, sender='integrations.ApiConnection', dispatch_uid='response_cache_api_delete')
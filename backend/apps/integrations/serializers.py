@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Integration, Webhook, ApiConnection, IntegrationLog, IntegrationTemplate
+from .log_pipeline import unpack_payload
+from .models import Integration, Webhook, ApiConnection, IntegrationLog, IntegrationLogSummary, IntegrationTemplate
 
 
 class WebhookSerializer(serializers.ModelSerializer):
@@ -10,7 +11,7 @@ class WebhookSerializer(serializers.ModelSerializer):
         model = Webhook
         fields = [
             'url', 'method', 'headers', 'secret_token',
-            'verify_ssl', 'max_retries', 'retry_delay'
+            'verify_ssl', 'timeout', 'max_retries', 'retry_delay'
         ]
 
 
@@ -21,8 +22,12 @@ class ApiConnectionSerializer(serializers.ModelSerializer):
         model = ApiConnection
         fields = [
             'base_url', 'auth_type', 'api_key', 'api_secret',
-            'access_token', 'refresh_token', 'default_headers', 'timeout'
+            'access_token', 'refresh_token', 'token_url', 'scope',
+            'token_expires_at', 'default_headers', 'timeout', 'max_concurrency',
+            'cache_enabled', 'cache_ttl', 'cache_stale_ttl', 'cache_negative_ttl',
+            'cache_vary_headers', 'cache_max_entries'
         ]
+        read_only_fields = ('token_expires_at',)
         extra_kwargs = {
             'api_secret': {'write_only': True},
             'access_token': {'write_only': True},
@@ -52,9 +57,14 @@ class IntegrationSerializer(serializers.ModelSerializer):
         }
     
     def get_logs_count(self, obj):
+        # Anotados no queryset da listagem; demais ações fazem a contagem
+        if hasattr(obj, 'logs_count'):
+            return obj.logs_count
         return obj.logs.count()
     
     def get_chatbots_count(self, obj):
+        if hasattr(obj, 'chatbots_count'):
+            return obj.chatbots_count
         return obj.chatbots.count()
     
     def create(self, validated_data):
@@ -161,9 +171,28 @@ class IntegrationLogSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'integration', 'integration_name', 'execution_id',
             'action', 'level', 'message', 'request_data',
-            'response_data', 'status_code', 'duration', 'timestamp'
+            'response_data', 'status_code', 'duration', 'cache_status',
+            'sample_rate', 'timestamp'
+        ]
+        read_only_fields = ('id', 'sample_rate', 'timestamp')
+    
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Payloads grandes são gravados comprimidos pelo pipeline de logs
+        data['request_data'] = unpack_payload(data['request_data'])
+        data['response_data'] = unpack_payload(data['response_data'])
+        return data
+
+
+class IntegrationLogSummarySerializer(serializers.ModelSerializer):
+    """Serializer para resumos horários dos logs"""
+    
+    class Meta:
+        model = IntegrationLogSummary
+        fields = [
+            'hour', 'action', 'count', 'error_count', 'cache_hits',
+            'cache_misses', 'duration_p50', 'duration_p95', 'status_codes'
         ]
-        read_only_fields = ('id', 'timestamp')
 
 
 class IntegrationTemplateSerializer(serializers.ModelSerializer):
@@ -0,0 +1,70 @@
+"""
+Testes do pool de clientes HTTP das integrações
+"""
+import asyncio
+from unittest import mock
+
+from django.test import SimpleTestCase
+import httpx
+
+from .. import http
+
+
+OPTIONS = (10.0, 20, True)
+
+
+class HttpClientPoolTests(SimpleTestCase):
+
+    def setUp(self):
+        self.pool = http.HttpClientPool()
+        self.addCleanup(self.pool.close)
+
+    def test_client_is_reused_per_key_and_options(self):
+        client = self.pool.get('a', OPTIONS)
+
+        self.assertIs(self.pool.get('a', OPTIONS), client)
+        self.assertIsNot(self.pool.get('b', OPTIONS), client)
+
+    def test_changed_options_retire_client_without_closing(self):
+        client = self.pool.get('a', OPTIONS)
+
+        replacement = self.pool.get('a', (5.0, 20, True))
+
+        self.assertIsNot(replacement, client)
+        # Outra thread pode estar no meio de uma requisição com o cliente antigo
+        self.assertFalse(client.is_closed)
+        self.pool.close()
+        self.assertTrue(client.is_closed)
+        self.assertTrue(replacement.is_closed)
+
+    def test_async_clients_are_retired_per_loop(self):
+        async def scenario():
+            client = self.pool.get_async('a', OPTIONS)
+            self.assertIs(self.pool.get_async('a', OPTIONS), client)
+            replacement = self.pool.get_async('a', (5.0, 20, True))
+            await asyncio.sleep(0)
+            self.assertFalse(client.is_closed)
+            await self.pool.aclose()
+            return client, replacement
+
+        client, replacement = asyncio.run(scenario())
+
+        self.assertTrue(client.is_closed)
+        self.assertTrue(replacement.is_closed)
+
+    def test_request_uses_pooled_client(self):
+        seen = []
+
+        def handler(request):
+            seen.append(request.url.host)
+            return httpx.Response(204)
+
+        client_kwargs = self.pool._client_kwargs
+        with mock.patch.object(http, '_pool', self.pool), mock.patch.object(
+            self.pool, '_client_kwargs', lambda options: {**client_kwargs(options), 'transport': httpx.MockTransport(handler)}
+        ), self.assertLogs('httpx', 'INFO'):
+            for _ in range(2):
+                self.assertEqual(http.request('GET', 'https://api.example.com/x', timeout=3).status_code, 204)
+
+        self.assertEqual(seen, ['api.example.com'] * 2)
+        self.assertEqual(len(self.pool._clients), 1)
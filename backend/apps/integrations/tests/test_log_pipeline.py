@@ -0,0 +1,88 @@
+"""
+Testes da gravação em lote dos IntegrationLog
+"""
+import uuid
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import OperationalError
+from django.test import SimpleTestCase, TransactionTestCase
+
+from ..log_pipeline import IntegrationLogWriter, pack_payload, unpack_payload
+from ..models import Integration, IntegrationLog
+
+
+class PayloadPackingTests(SimpleTestCase):
+
+    def test_small_payload_is_kept(self):
+        self.assertEqual(pack_payload({'a': 1}, 100), {'a': 1})
+
+    def test_large_payload_is_compressed_or_truncated(self):
+        payload = {'items': ['valor'] * 500}
+
+        packed = pack_payload(payload, 200)
+        self.assertEqual(unpack_payload(packed), payload)
+
+        truncated = pack_payload({'data': ''.join(uuid.uuid4().hex for _ in range(100))}, 200)
+        self.assertTrue(truncated['_truncated'])
+        self.assertEqual(len(truncated['preview']), 200)
+
+
+@mock.patch.object(IntegrationLogWriter, '_ensure_thread')
+class IntegrationLogWriterTests(TransactionTestCase):
+
+    def setUp(self):
+        owner = User.objects.create(username='logs')
+        self.integration = Integration.objects.create(name='API', type='api', owner=owner)
+
+    def test_flush_writes_batch_and_applies_sampling(self, ensure_thread):
+        writer = IntegrationLogWriter(sampling={'debug': 0.0})
+
+        self.assertTrue(writer.log(self.integration.pk, 'request', message='ok'))
+        self.assertFalse(writer.log(self.integration.pk, 'request', level='debug'))
+        self.assertTrue(writer.log(self.integration.pk, 'request', level='debug', sample=False))
+        writer.flush()
+
+        self.assertEqual(len(writer), 0)
+        self.assertEqual(IntegrationLog.objects.count(), 2)
+
+    def test_invalid_rows_do_not_drop_the_batch(self, ensure_thread):
+        writer = IntegrationLogWriter()
+        writer.log(self.integration.pk, 'request', message='antes')
+        # Integração removida enquanto o log estava na fila
+        writer.log(uuid.uuid4(), 'request', message='órfão')
+        writer.log(self.integration.pk, 'request', message='depois')
+
+        with self.assertLogs('apps.integrations.log_pipeline', 'WARNING'):
+            writer.flush()
+
+        self.assertEqual(
+            sorted(IntegrationLog.objects.values_list('message', flat=True)), ['antes', 'depois']
+        )
+
+    def test_transient_failure_requeues_batch(self, ensure_thread):
+        writer = IntegrationLogWriter()
+        writer.log(self.integration.pk, 'request', message='primeiro')
+
+        with mock.patch.object(IntegrationLog.objects, 'bulk_create', side_effect=OperationalError('fora do ar')):
+            with self.assertRaises(OperationalError):
+                writer.flush()
+        writer.log(self.integration.pk, 'request', message='segundo')
+
+        self.assertEqual(len(writer), 2)
+        writer.flush()
+        self.assertEqual(
+            list(IntegrationLog.objects.order_by('timestamp').values_list('message', flat=True)),
+            ['primeiro', 'segundo'],
+        )
+
+    def test_requeue_is_bounded(self, ensure_thread):
+        writer = IntegrationLogWriter(max_size=2, max_pending=3)
+        for number in range(4):
+            writer.log(self.integration.pk, 'request', message=str(number))
+
+        with mock.patch.object(IntegrationLog.objects, 'bulk_create', side_effect=OperationalError('fora do ar')):
+            with self.assertLogs('apps.integrations.log_pipeline', 'WARNING'), self.assertRaises(OperationalError):
+                writer.flush()
+
+        self.assertEqual([entry.message for entry in writer._pending], ['1', '2', '3'])
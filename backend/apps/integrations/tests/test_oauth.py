@@ -0,0 +1,102 @@
+"""
+Testes da renovação single-flight dos tokens OAuth 2.0
+"""
+from datetime import datetime, timezone as dt_timezone
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.test import TransactionTestCase, override_settings
+import httpx
+
+from ..models import ApiConnection, Integration
+from ..oauth import TokenError, TokenManager
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TokenManagerTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        owner = User.objects.create(username='oauth')
+        integration = Integration.objects.create(name='API', type='api', owner=owner)
+        self.api = ApiConnection.objects.create(
+            integration=integration, base_url='https://api.example.com', auth_type='oauth2',
+            token_url='https://auth.example.com/token', api_key='cliente', api_secret='segredo',
+            refresh_token='r1',
+        )
+        self.manager = TokenManager(refresh_margin=60)
+        self.requests = []
+
+    def token_endpoint(self, delay=0.0, status=200):
+        def request(method, url, **kwargs):
+            self.requests.append(kwargs['data'])
+            time.sleep(delay)
+            number = len(self.requests)
+            return httpx.Response(status, json={
+                'access_token': f'token-{number}', 'expires_in': 3600, 'refresh_token': f'r{number + 1}',
+            })
+        return mock.patch('apps.integrations.oauth.http.request', side_effect=request)
+
+    def expire(self, seconds_left):
+        expires_at = datetime.fromtimestamp(time.time() + seconds_left, tz=dt_timezone.utc)
+        ApiConnection.objects.filter(pk=self.api.pk).update(access_token='antigo', token_expires_at=expires_at)
+        self.api.refresh_from_db()
+
+    def concurrently(self, count, manager=None):
+        results = []
+
+        def worker():
+            try:
+                results.append((manager or self.manager).get_token(ApiConnection.objects.get(pk=self.api.pk)))
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=worker) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_expired_token_is_refreshed_once(self):
+        with self.token_endpoint(delay=0.2):
+            results = self.concurrently(8)
+
+        self.assertEqual(results, ['token-1'] * 8)
+        self.assertEqual(self.requests, [{'grant_type': 'refresh_token', 'refresh_token': 'r1'}])
+        api = ApiConnection.objects.get(pk=self.api.pk)
+        self.assertEqual((api.access_token, api.refresh_token), ('token-1', 'r2'))
+
+    def test_token_near_expiry_keeps_serving_during_refresh(self):
+        self.expire(30)
+
+        with self.token_endpoint(delay=0.3):
+            started = time.monotonic()
+            results = self.concurrently(5)
+
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(sorted(results), ['antigo'] * 4 + ['token-1'])
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(self.manager.get_token(self.api), 'token-1')
+
+    def test_other_process_reuses_shared_token(self):
+        with self.token_endpoint():
+            self.assertEqual(self.manager.get_token(self.api), 'token-1')
+            # Outro processo: memória vazia, mesmo cache compartilhado
+            self.assertEqual(TokenManager().get_token(ApiConnection.objects.get(pk=self.api.pk)), 'token-1')
+
+        self.assertEqual(len(self.requests), 1)
+
+    def test_failed_refresh(self):
+        with self.token_endpoint(status=401):
+            with self.assertRaises(TokenError):
+                self.manager.get_token(self.api)
+
+            self.expire(30)
+            with self.assertLogs('apps.integrations.oauth', 'WARNING'):
+                # Ainda válido: falha na renovação não derruba a chamada
+                self.assertEqual(self.manager.get_token(self.api), 'antigo')
@@ -0,0 +1,106 @@
+"""
+Testes do circuit breaker e do bulkhead das integrações
+"""
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+
+from ..models import Integration
+from ..resilience import (
+    CLOSED, DEFAULTS, HALF_OPEN, OPEN, BulkheadFullError, CircuitBreaker, CircuitOpenError, persist_status,
+)
+
+
+CONFIG = {**DEFAULTS, 'MIN_CALLS': 4, 'ERROR_RATE': 0.5, 'OPEN_SECONDS': 30, 'SLOW_CALL_SECONDS': 2.0}
+
+
+class CircuitBreakerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.breaker = CircuitBreaker('api', CONFIG, max_in_flight=2)
+
+    def call(self, ok, now, latency=0.1):
+        self.breaker.acquire(now=now)
+        return self.breaker.release(ok, latency, now=now)
+
+    def trip(self, now=100.0):
+        with self.assertLogs('apps.integrations.resilience', 'WARNING'):
+            for ok in (True, True, False, False):
+                transition = self.call(ok, now)
+        return transition
+
+    def test_opens_on_error_rate_after_min_calls(self):
+        self.assertIsNone(self.call(False, 100.0))
+        self.assertIsNone(self.call(False, 100.0))
+        self.assertEqual(self.breaker.state, CLOSED)
+
+        self.breaker = CircuitBreaker('api', CONFIG, max_in_flight=2)
+        self.assertEqual(self.trip(), OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.acquire(now=110.0)
+
+    def test_opens_on_slow_calls(self):
+        with self.assertLogs('apps.integrations.resilience', 'WARNING'):
+            for _ in range(4):
+                transition = self.call(True, 100.0, latency=3.0)
+
+        self.assertEqual(transition, OPEN)
+
+    def test_half_open_probe_closes_circuit(self):
+        self.trip()
+
+        self.breaker.acquire(now=131.0)
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        # Só uma sonda por vez
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.acquire(now=131.0)
+        with self.assertLogs('apps.integrations.resilience', 'INFO'):
+            self.assertEqual(self.breaker.release(True, 0.1, now=131.0), CLOSED)
+
+        self.assertEqual(self.breaker.snapshot()['calls'], 0)
+
+    def test_failed_probe_reopens_circuit(self):
+        self.trip()
+
+        self.breaker.acquire(now=131.0)
+        with self.assertLogs('apps.integrations.resilience', 'WARNING'):
+            self.assertEqual(self.breaker.release(False, 0.1, now=131.0), OPEN)
+
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.acquire(now=140.0)
+
+    def test_old_failures_leave_the_window(self):
+        for _ in range(3):
+            self.call(False, 100.0)
+
+        self.assertIsNone(self.call(True, 100.0 + CONFIG['WINDOW'] + 1))
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_bulkhead_limits_concurrent_calls(self):
+        self.breaker.acquire(now=100.0)
+        self.breaker.acquire(now=100.0)
+
+        with self.assertRaises(BulkheadFullError):
+            self.breaker.acquire(now=100.0)
+
+        self.breaker.release(True, 0.1, now=100.0)
+        self.breaker.acquire(now=100.0)
+
+
+class PersistStatusTests(TestCase):
+
+    def test_reflects_transitions_in_integration_status(self):
+        owner = User.objects.create(username='resilience')
+        integration = Integration.objects.create(name='API', type='webhook', owner=owner, status='active')
+
+        persist_status(integration.pk, OPEN)
+        integration.refresh_from_db()
+        self.assertEqual(integration.status, 'error')
+
+        persist_status(integration.pk, CLOSED)
+        integration.refresh_from_db()
+        self.assertEqual(integration.status, 'active')
+
+        Integration.objects.filter(pk=integration.pk).update(status='inactive')
+        persist_status(integration.pk, OPEN)
+        integration.refresh_from_db()
+        self.assertEqual(integration.status, 'inactive')
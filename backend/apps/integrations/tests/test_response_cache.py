@@ -0,0 +1,115 @@
+"""
+Testes do cache das respostas GET das ApiConnection
+"""
+from types import SimpleNamespace
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+import httpx
+
+from ..response_cache import BYPASS, HIT, MISS, STALE, CachedResponse, ResponseCache
+
+
+def connection(pk='api', **fields):
+    defaults = {
+        'cache_enabled': True, 'cache_ttl': 60, 'cache_stale_ttl': 0, 'cache_negative_ttl': 0,
+        'cache_vary_headers': [], 'cache_max_entries': 100,
+    }
+    return SimpleNamespace(pk=pk, **{**defaults, **fields})
+
+
+class ResponseCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.cache = ResponseCache(max_bytes=10_000, max_entry_bytes=2_000, revalidate_workers=1)
+        self.addCleanup(self.cache._executor.shutdown)
+        self.bodies = {}
+        patcher = mock.patch('apps.integrations.response_cache.http.request', side_effect=self.respond)
+        self.request = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def respond(self, method, url, **kwargs):
+        return httpx.Response(200, content=self.bodies.get(url, b'ok'))
+
+    def get(self, api, url='https://api.example.com/a'):
+        response, status = self.cache.request(api, 'GET', url)
+        return response.content, status
+
+    def test_hit_after_miss(self):
+        api = connection()
+
+        self.assertEqual(self.get(api), (b'ok', MISS))
+        self.assertEqual(self.get(api), (b'ok', HIT))
+        self.assertEqual(self.request.call_count, 1)
+        self.assertEqual(self.cache.request(api, 'POST', 'https://api.example.com/a')[1], BYPASS)
+
+    def test_stale_entry_is_served_while_revalidating(self):
+        api = connection(cache_ttl=1, cache_stale_ttl=60)
+        self.get(api)
+        self.bodies['https://api.example.com/a'] = b'novo'
+
+        later = time.monotonic() + 5
+        with mock.patch('apps.integrations.response_cache.time.monotonic', return_value=later):
+            self.assertEqual(self.get(api), (b'ok', STALE))
+            self.cache._executor.shutdown(wait=True)
+
+        self.assertEqual(self.request.call_count, 2)
+        entry = self.cache._get(api.pk, next(iter(self.cache._entries[api.pk])))
+        self.assertEqual(entry.content, b'novo')
+
+    def test_large_body_is_not_cached(self):
+        api = connection()
+        self.get(api)
+        self.bodies['https://api.example.com/a'] = b'x' * 2_001
+        self.cache.invalidate(api.pk)
+
+        self.assertEqual(self.get(api)[1], MISS)
+        self.assertEqual(self.get(api)[1], MISS)
+        self.assertEqual(self.cache._bytes, 0)
+
+    def test_large_revalidation_drops_previous_entry(self):
+        api = connection()
+        self.get(api)
+        key = next(iter(self.cache._entries[api.pk]))
+
+        self.cache._store(api, key, httpx.Response(200, content=b'x' * 2_001))
+
+        self.assertNotIn(api.pk, self.cache._entries)
+        self.assertEqual(self.cache._bytes, 0)
+
+    def test_byte_budget_evicts_least_recently_used(self):
+        first, second = connection('a'), connection('b')
+        body = b'x' * (2_000 - CachedResponse.OVERHEAD)
+        for number in range(4):
+            self.bodies[f'https://api.example.com/{number}'] = body
+            self.get(first if number % 2 else second, f'https://api.example.com/{number}')
+        # Uso recente protege a primeira resposta da conexão b
+        self.get(second, 'https://api.example.com/0')
+        self.assertEqual(self.cache._bytes, 4 * 2_000)
+
+        for number in (4, 5):
+            self.bodies[f'https://api.example.com/{number}'] = body
+            self.get(first, f'https://api.example.com/{number}')
+
+        self.assertLessEqual(self.cache._bytes, self.cache.max_bytes)
+        self.assertEqual(self.get(second, 'https://api.example.com/0')[1], HIT)
+        self.assertEqual(self.get(first, 'https://api.example.com/1')[1], MISS)
+
+    def test_per_connection_entry_limit(self):
+        api = connection(cache_max_entries=2)
+        for number in range(3):
+            self.get(api, f'https://api.example.com/{number}')
+
+        self.assertEqual(len(self.cache._entries[api.pk]), 2)
+        self.assertEqual(self.cache._bytes, 2 * (2 + CachedResponse.OVERHEAD))
+        self.assertEqual(self.get(api, 'https://api.example.com/0')[1], MISS)
+
+    def test_invalidate_releases_bytes(self):
+        api = connection()
+        self.get(api)
+
+        self.cache.invalidate(api.pk)
+
+        self.assertEqual(self.cache._bytes, 0)
+        self.assertEqual(self.get(api)[1], MISS)
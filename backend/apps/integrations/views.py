@@ -2,18 +2,21 @@ from rest_framework import generics, permissions, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
-from django.db.models import Count, Q
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from drf_spectacular.utils import extend_schema
-import requests
 import time
 
+from apps.executions.pagination import TimestampCursorPagination
+from . import http, log_pipeline, resilience
 from .models import Integration, IntegrationLog, IntegrationTemplate
 from .serializers import (
     IntegrationSerializer,
     IntegrationCreateSerializer,
     IntegrationUpdateSerializer,
     IntegrationLogSerializer,
+    IntegrationLogSummarySerializer,
     IntegrationTemplateSerializer,
     IntegrationFromTemplateSerializer,
     IntegrationTestSerializer,
@@ -27,7 +30,17 @@ class IntegrationViewSet(ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Integration.objects.filter(owner=self.request.user).order_by('-updated_at')
+        queryset = Integration.objects.filter(owner=self.request.user).order_by('-updated_at')
+        if self.action == 'list':
+            # Subconsulta correlacionada: conta só as linhas da página
+            logs = IntegrationLog.objects.filter(integration=OuterRef('pk')).order_by().values('integration')
+            queryset = queryset.select_related(
+                'owner', 'webhook', 'api_connection'
+            ).prefetch_related('chatbots').annotate(
+                logs_count=Coalesce(Subquery(logs.annotate(count=Count('pk')).values('count')), 0),
+                chatbots_count=Count('chatbots'),
+            )
+        return queryset
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -160,16 +173,17 @@ class IntegrationViewSet(ModelViewSet):
                 
                 duration = time.time() - start_time
                 
-                # Criar log do teste
-                IntegrationLog.objects.create(
-                    integration=integration,
+                # Criar log do teste (testes manuais nunca são amostrados)
+                log_pipeline.log_integration(
+                    integration.pk,
                     action='test',
                     level='info' if result['success'] else 'error',
                     message=result['message'],
                     request_data=test_data,
                     response_data=result.get('response_data'),
                     status_code=result.get('status_code'),
-                    duration=duration
+                    duration=duration,
+                    sample=False
                 )
                 
                 # Atualizar status da integração
@@ -191,12 +205,13 @@ class IntegrationViewSet(ModelViewSet):
                 
             except Exception as e:
                 # Criar log de erro
-                IntegrationLog.objects.create(
-                    integration=integration,
+                log_pipeline.log_integration(
+                    integration.pk,
                     action='test',
                     level='error',
                     message=f'Erro durante teste: {str(e)}',
-                    request_data=test_data
+                    request_data=test_data,
+                    sample=False
                 )
                 
                 integration.status = 'error'
@@ -214,13 +229,12 @@ class IntegrationViewSet(ModelViewSet):
         webhook = integration.webhook
         
         try:
-            response = requests.request(
-                method=webhook.method,
-                url=webhook.url,
+            response = http.request(
+                webhook.method,
+                webhook.url,
+                integration=integration,
                 json=test_data or {'test': True, 'timestamp': timezone.now().isoformat()},
                 headers=webhook.headers,
-                verify=webhook.verify_ssl,
-                timeout=30
             )
             
             return {
@@ -230,7 +244,7 @@ class IntegrationViewSet(ModelViewSet):
                 'response_data': response.text[:1000]  # Limitar tamanho
             }
             
-        except requests.exceptions.RequestException as e:
+        except http.HTTPError as e:
             return {
                 'success': False,
                 'message': f'Erro na requisição: {str(e)}'
@@ -241,19 +255,12 @@ class IntegrationViewSet(ModelViewSet):
         api = integration.api_connection
         
         try:
-            headers = api.default_headers.copy()
-            
-            # Adicionar autenticação
-            if api.auth_type == 'bearer' and api.access_token:
-                headers['Authorization'] = f'Bearer {api.access_token}'
-            elif api.auth_type == 'api_key' and api.api_key:
-                headers['X-API-Key'] = api.api_key
-            
             # Fazer requisição de teste (GET para endpoint base)
-            response = requests.get(
+            response = http.request(
+                'GET',
                 api.base_url,
-                headers=headers,
-                timeout=api.timeout
+                integration=integration,
+                headers=http.auth_headers(api),
             )
             
             return {
@@ -263,12 +270,45 @@ class IntegrationViewSet(ModelViewSet):
                 'response_data': response.text[:1000]  # Limitar tamanho
             }
             
-        except requests.exceptions.RequestException as e:
+        except http.HTTPError as e:
             return {
                 'success': False,
                 'message': f'Erro na conexão: {str(e)}'
             }
     
+    @action(detail=True, methods=['get'])
+    @extend_schema(
+        summary="Estado do circuit breaker",
+        description="Retorna o estado do circuit breaker e do bulkhead da integração neste processo",
+    )
+    def circuit(self, request, pk=None):
+        integration = self.get_object()
+        snapshot = resilience.breaker_snapshot(integration.pk) or {
+            'state': resilience.CLOSED,
+            'calls': 0,
+            'failures': 0,
+            'slow_calls': 0,
+            'avg_latency': 0.0,
+            'in_flight': 0,
+            'max_in_flight': http.integration_options(integration)[1],
+        }
+        return Response(snapshot)
+    
+    @action(detail=True, methods=['get'], url_path='log-summaries')
+    @extend_schema(
+        summary="Resumos horários dos logs",
+        description="Retorna os resumos por hora dos logs já compactados da integração",
+    )
+    def log_summaries(self, request, pk=None):
+        integration = self.get_object()
+        summaries = integration.log_summaries.all()
+        if request.query_params.get('action'):
+            summaries = summaries.filter(action=request.query_params['action'])
+        page = self.paginate_queryset(summaries)
+        if page is not None:
+            return self.get_paginated_response(IntegrationLogSummarySerializer(page, many=True).data)
+        return Response(IntegrationLogSummarySerializer(summaries, many=True).data)
+    
     @action(detail=False, methods=['post'])
     @extend_schema(
         summary="Ações em lote",
@@ -362,7 +402,7 @@ class IntegrationTemplateViewSet(ModelViewSet):
     def get_queryset(self):
         return IntegrationTemplate.objects.filter(
             Q(is_public=True) | Q(created_by=self.request.user)
-        ).order_by('-usage_count', 'name')
+        ).select_related('created_by').order_by('-usage_count', 'name')
     
     @extend_schema(
         summary="Listar templates",
@@ -422,6 +462,7 @@ class IntegrationLogViewSet(ModelViewSet):
     """ViewSet para logs de integração"""
     serializer_class = IntegrationLogSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TimestampCursorPagination
     http_method_names = ['get', 'head', 'options']  # Apenas leitura
     
     def get_queryset(self):
@@ -429,7 +470,7 @@ class IntegrationLogViewSet(ModelViewSet):
         return IntegrationLog.objects.filter(
             integration_id=integration_id,
             integration__owner=self.request.user
-        ).order_by('-timestamp')
+        ).select_related('integration').order_by('-timestamp')
     
     @extend_schema(
         summary="Listar logs da integração",
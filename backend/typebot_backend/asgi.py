@@ -18,13 +18,16 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'typebot_backend.settings')
 django_asgi_app = get_asgi_application()
 
 # Import websocket routing after Django is set up
+from apps.executions.middleware import JWTAuthMiddleware
 from apps.executions.routing import websocket_urlpatterns
 
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
     "websocket": AllowedHostsOriginValidator(
         AuthMiddlewareStack(
-            URLRouter(websocket_urlpatterns)
+            JWTAuthMiddleware(
+                URLRouter(websocket_urlpatterns)
+            )
         )
     ),
 }) 
\ No newline at end of file
@@ -187,6 +187,158 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Cache compartilhado entre os processos (snapshots, estatísticas e tokens OAuth)
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.redis.RedisCache'),
+        'LOCATION': config('CACHE_LOCATION', default=config('REDIS_URL', default='redis://localhost:6379/0')),
+        'KEY_PREFIX': 'pydevbot',
+    }
+}
+
+# Tempo (s) em cache das estatísticas de sessões por usuário
+EXECUTION_STATS_CACHE_TIMEOUT = config('EXECUTION_STATS_CACHE_TIMEOUT', default=30, cast=int)
+
+# Tempo (s) em cache do snapshot público dos chatbots publicados
+PUBLIC_CHATBOT_CACHE_TIMEOUT = config('PUBLIC_CHATBOT_CACHE_TIMEOUT', default=300, cast=int)
+
+# Arquivos gerados em execução (spool do buffer), fora da árvore do código
+RUNTIME_DIR = Path(config('RUNTIME_DIR', default='/var/tmp/pydevbot'))
+
+# Buffer write-behind das mensagens/logs das sessões de chat
+EXECUTION_WRITE_BUFFER = {
+    'ENABLED': config('EXECUTION_WRITE_BUFFER_ENABLED', default=True, cast=bool),
+    'MAX_SIZE': config('EXECUTION_WRITE_BUFFER_MAX_SIZE', default=500, cast=int),
+    'FLUSH_INTERVAL': config('EXECUTION_WRITE_BUFFER_FLUSH_INTERVAL', default=1.0, cast=float),
+    'BATCH_SIZE': 500,
+    'SPOOL_PATH': config('EXECUTION_WRITE_BUFFER_SPOOL_PATH', default=str(RUNTIME_DIR / 'execution_buffer.spool')),
+}
+
+# Estado quente das sessões de chat (checkpoint periódico na ChatSession)
+EXECUTION_SESSION_STATE = {
+    'ENABLED': config('SESSION_STATE_ENABLED', default=True, cast=bool),
+    'BACKEND': config('SESSION_STATE_BACKEND', default='apps.executions.state.RedisSessionStateBackend'),
+    'OPTIONS': {
+        'url': config('REDIS_URL', default='redis://localhost:6379/0'),
+    },
+    'CHECKPOINT_EVERY': config('SESSION_STATE_CHECKPOINT_EVERY', default=10, cast=int),
+    'IDLE_TIMEOUT': config('SESSION_STATE_IDLE_TIMEOUT', default=300, cast=int),
+    'TTL': 24 * 60 * 60,
+}
+
+# Agregação incremental dos analytics dos chatbots
+CHATBOT_ANALYTICS = {
+    'ENABLED': config('CHATBOT_ANALYTICS_ENABLED', default=True, cast=bool),
+    'MAX_EVENTS': config('CHATBOT_ANALYTICS_MAX_EVENTS', default=1000, cast=int),
+    'FLUSH_INTERVAL': config('CHATBOT_ANALYTICS_FLUSH_INTERVAL', default=5.0, cast=float),
+}
+
+# Cliente HTTP compartilhado das integrações (pools keep-alive por integração)
+INTEGRATIONS_HTTP = {
+    'HTTP2': config('INTEGRATIONS_HTTP2', default=True, cast=bool),
+    'TIMEOUT': config('INTEGRATIONS_HTTP_TIMEOUT', default=10.0, cast=float),
+    'MAX_CONNECTIONS': 20,
+    'MAX_KEEPALIVE_CONNECTIONS': 10,
+    'KEEPALIVE_EXPIRY': 30.0,
+}
+
+# Tokens OAuth 2.0 das conexões API (cache compartilhado em CACHES)
+INTEGRATIONS_OAUTH = {
+    'REFRESH_MARGIN': config('INTEGRATIONS_OAUTH_REFRESH_MARGIN', default=60, cast=int),
+    'LOCK_TIMEOUT': 30,
+    'DEFAULT_EXPIRES_IN': 3600,
+}
+
+# Cache em memória das respostas GET das ApiConnection (limites do processo)
+INTEGRATIONS_RESPONSE_CACHE = {
+    'MAX_BYTES': config('INTEGRATIONS_RESPONSE_CACHE_MAX_BYTES', default=64 * 1024 * 1024, cast=int),
+    'MAX_ENTRY_BYTES': config('INTEGRATIONS_RESPONSE_CACHE_MAX_ENTRY_BYTES', default=1024 * 1024, cast=int),
+    'REVALIDATE_WORKERS': 4,
+}
+
+# Circuit breaker por integração (sobrescrito por integration.config['circuit_breaker'])
+INTEGRATION_RESILIENCE = {
+    'WINDOW': 60,
+    'MIN_CALLS': 10,
+    'ERROR_RATE': 0.5,
+    'SLOW_CALL_SECONDS': 5.0,
+    'SLOW_CALL_RATE': 0.8,
+    'OPEN_SECONDS': 30,
+    'HALF_OPEN_PROBES': 1,
+}
+
+# Gravação em lote dos IntegrationLog (apps.integrations.log_pipeline)
+INTEGRATION_LOGS = {
+    'ENABLED': config('INTEGRATION_LOGS_BATCHED', default=True, cast=bool),
+    'MAX_SIZE': 500,
+    'FLUSH_INTERVAL': 2.0,
+    'MAX_PENDING': 10000,
+    # Fração gravada por nível (níveis ausentes: 1.0)
+    'SAMPLING': {
+        'debug': config('INTEGRATION_LOGS_DEBUG_SAMPLE', default=0.0, cast=float),
+        'info': config('INTEGRATION_LOGS_INFO_SAMPLE', default=1.0, cast=float),
+    },
+    'MAX_PAYLOAD_BYTES': 4096,
+    # Logs mais antigos são resumidos por hora (comando compact_integration_logs)
+    'RETENTION_HOURS': config('INTEGRATION_LOGS_RETENTION_HOURS', default=72, cast=int),
+}
+
+# Retenção das sessões e tabelas de execução (comando apply_retention)
+EXECUTION_RETENTION = {
+    # Dias após a última atividade; Chatbot.retention_days sobrescreve
+    'DEFAULT_DAYS': config('EXECUTION_RETENTION_DAYS', default=90, cast=int),
+    'CHUNK_SIZE': config('EXECUTION_RETENTION_CHUNK_SIZE', default=1000, cast=int),
+    # Só no PostgreSQL, para as tabelas particionadas por data
+    'PARTITIONS_AHEAD': 2,
+    'ARCHIVE_PARTITIONS': config('EXECUTION_RETENTION_ARCHIVE_PARTITIONS', default=False, cast=bool),
+}
+
+# Pool de processos isolados dos nós `script` (apps.executions.scripts)
+SCRIPT_POOL = {
+    'WORKERS': config('SCRIPT_POOL_WORKERS', default=2, cast=int),
+    'QUEUE_SIZE': config('SCRIPT_POOL_QUEUE_SIZE', default=8, cast=int),
+    'QUEUE_TIMEOUT': 0.5,
+    # Tempo total por script (segundos); o timeout do nó é limitado a MAX_TIMEOUT
+    'TIMEOUT': config('SCRIPT_POOL_TIMEOUT', default=2.0, cast=float),
+    'MAX_TIMEOUT': 10.0,
+    'CPU_SECONDS': 1,
+    'MEMORY_MB': config('SCRIPT_POOL_MEMORY_MB', default=256, cast=int),
+    'MAX_JOBS': 1000,
+}
+
+# Timers duráveis dos nós delay (comando run_timers); pausas menores que
+# SERVER_DELAY_MS continuam sendo feitas pelo cliente
+SESSION_TIMERS = {
+    'SERVER_DELAY_MS': config('SESSION_TIMERS_SERVER_DELAY_MS', default=5000, cast=int),
+    'TICK': 0.5,
+    'HORIZON': 60,
+    'LOAD_INTERVAL': 5,
+    'BATCH_SIZE': 1000,
+    'LEASE': 60,
+    'WORKERS': config('SESSION_TIMERS_WORKERS', default=8, cast=int),
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': 30,
+}
+
+# Marcação das sessões inativas como abandonadas (comando sweep_abandoned_sessions);
+# Chatbot.abandon_after_minutes sobrescreve o padrão
+SESSION_ABANDONMENT = {
+    'DEFAULT_MINUTES': config('SESSION_ABANDONMENT_DEFAULT_MINUTES', default=30, cast=int),
+    'CHUNK_SIZE': 1000,
+}
+
+# Entrega assíncrona dos WebhookEvent (comando deliver_webhooks)
+WEBHOOK_DELIVERY = {
+    'CONCURRENCY': config('WEBHOOK_DELIVERY_CONCURRENCY', default=50, cast=int),
+    'BATCH_SIZE': config('WEBHOOK_DELIVERY_BATCH_SIZE', default=200, cast=int),
+    'TIMEOUT': config('WEBHOOK_DELIVERY_TIMEOUT', default=10.0, cast=float),
+    'POLL_INTERVAL': config('WEBHOOK_DELIVERY_POLL_INTERVAL', default=1.0, cast=float),
+    # Tempo que um evento fica reservado para o worker que o pegou
+    'CLAIM_TIMEOUT': 300,
+    'BACKOFF_BASE': 30,
+    'BACKOFF_MAX': 60 * 60,
+}
+
 # API Documentation
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Typebot Clone API',
@@ -219,6 +371,8 @@ if not DEBUG:
     X_FRAME_OPTIONS = 'DENY'
 
 # Logging
+# logs/ não é versionado: o FileHandler precisa do diretório ao configurar o logging
+(BASE_DIR / 'logs').mkdir(exist_ok=True)
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,